@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Margin Removal Benchmark
+Compare the vectorized engine.remove_margins against the original per-tile
+crop and paste loop on synthetic tilesheets.
+Features:
+- Generate random sheets from a few hundred to tens of thousands of tiles
+- Check that both paths produce byte-identical output
+- Report the best time of several runs for each path
+
+Usage:
+    python benchmarks/bench_remove_margins.py [--repeat N] [--max-tiles N]
+"""
+
+from PIL import Image
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import tilesheet_engine as engine  # noqa: E402
+
+
+def legacy_remove_margins(image, config):
+    """The crop-and-paste loop TilesheetMarginRemover.process_tilesheet used before the engine"""
+    img_width, img_height = image.size
+    tiles_per_row, tiles_per_col = engine.grid_dimensions(img_width, img_height, config)
+    processed = Image.new('RGBA', (tiles_per_row * config.tile_width, tiles_per_col * config.tile_height), (0, 0, 0, 0))
+
+    for row in range(tiles_per_col):
+        for col in range(tiles_per_row):
+            src_x = col * (config.tile_width + config.margin_x)
+            src_y = row * (config.tile_height + config.margin_y)
+            if src_x + config.tile_width <= img_width and src_y + config.tile_height <= img_height:
+                tile = image.crop((src_x, src_y, src_x + config.tile_width, src_y + config.tile_height))
+                processed.paste(tile, (col * config.tile_width, row * config.tile_height))
+
+    return processed
+
+
+def make_sheet(columns, rows, config, mode, seed=0):
+    """Create a random sheet of columns x rows tiles with the configured gutters"""
+    rng = np.random.default_rng(seed)
+    width = columns * config.pitch_x - config.margin_x
+    height = rows * config.pitch_y - config.margin_y
+    pixels = rng.integers(0, 256, size=(height, width, 4), dtype=np.uint8)
+    return Image.fromarray(pixels, 'RGBA').convert(mode)
+
+
+def best_time(func, repeat):
+    """Return the fastest wall-clock time of several calls in seconds"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv=None):
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Benchmark vectorized vs. looped margin removal.")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per measurement (best is reported)")
+    parser.add_argument("--max-tiles", type=int, default=40000, help="largest sheet size in tiles")
+    args = parser.parse_args(argv)
+
+    cases = [
+        (20, 20, engine.GridConfig(16, 16, 1, 1), 'RGBA'),
+        (57, 65, engine.GridConfig(16, 16, 1, 1), 'RGBA'),
+        (49, 24, engine.GridConfig(16, 16, 1, 1), 'P'),
+        (100, 100, engine.GridConfig(16, 16, 2, 2), 'RGBA'),
+        (200, 200, engine.GridConfig(8, 8, 1, 1), 'RGBA'),
+        (100, 100, engine.GridConfig(32, 32, 1, 1), 'RGB'),
+    ]
+
+    print(f"{'tiles':>7} {'tile':>6} {'margin':>6} {'mode':>4} {'loop ms':>10} {'vector ms':>10} {'speedup':>8}")
+    for columns, rows, config, mode in cases:
+        if columns * rows > args.max_tiles:
+            continue
+
+        image = make_sheet(columns, rows, config, mode)
+        image.load()
+
+        expected = legacy_remove_margins(image, config)
+        actual = engine.remove_margins(image, config)
+        if expected.tobytes() != actual.tobytes() or expected.size != actual.size:
+            print(f"MISMATCH for {columns}x{rows} tiles {config}", file=sys.stderr)
+            return 1
+
+        loop_time = best_time(lambda: legacy_remove_margins(image, config), args.repeat)
+        vector_time = best_time(lambda: engine.remove_margins(image, config), args.repeat)
+        print(f"{columns * rows:>7} {config.tile_width:>3}x{config.tile_height:<2} "
+              f"{config.margin_x:>3}x{config.margin_y:<2} {mode:>4} "
+              f"{loop_time * 1000:>10.2f} {vector_time * 1000:>10.2f} {loop_time / vector_time:>7.1f}x")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
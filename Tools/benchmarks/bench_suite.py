@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Tilesheet Benchmark Suite
+Headless, reproducible timings of the engine paths behind the tilesheet tools.
+Features:
+- Synthetic sheets from 100 to 100k tiles across modes, tile sizes and margins
+- Times splitting, margin removal, content/feature indexing and grid rendering
+- Runs every case in a fresh process so peak memory is measured per case
+- Writes throughput and peak memory to a JSON results file
+- Compares against an earlier results file and flags regressions
+
+Usage:
+    python benchmarks/bench_suite.py [--quick] [--paths split demargin ...] [--output results.json]
+    python benchmarks/bench_suite.py --compare benchmarks/results/baseline.json --fail-on-regression
+"""
+
+from PIL import Image
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import tilesheet_engine as engine  # noqa: E402
+import tilesheet_stream as stream  # noqa: E402
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+TILE_COUNTS = (100, 1000, 10000, 100000)
+
+# (tile size, margin, image mode) variants run at every tile count
+VARIANTS = (
+    (16, 0, 'RGBA'),
+    (16, 1, 'RGBA'),
+    (8, 1, 'P'),
+    (32, 2, 'RGB'),
+)
+
+# Grid shown by the splitter's first paint: 64px tiles in a 1200x800 canvas
+VIEWPORT_COLUMNS = 19
+VIEWPORT_ROWS = 13
+DISPLAY_SIZE = 64
+
+
+def make_sheet(tile_count, tile_size, margin, mode, seed=0):
+    """Create a roughly square sheet of tile_count tiles drawn from a small pool.
+
+    About a fifth of the tiles are blank and the rest repeat 256 random tiles, so
+    the content index sees realistic blank and duplicate ratios.
+    """
+    rng = np.random.default_rng(seed)
+    columns = max(int(round(tile_count ** 0.5)), 1)
+    rows = -(-tile_count // columns)
+    pitch = tile_size + margin
+
+    pool = rng.integers(0, 256, size=(257, tile_size, tile_size, 4), dtype=np.uint8)
+    pool[0] = 0
+    picks = rng.integers(1, len(pool), size=rows * columns)
+    picks[rng.random(rows * columns) < 0.2] = 0
+    picks[tile_count:] = 0
+
+    sheet = np.zeros((rows * pitch - margin, columns * pitch - margin, 4), dtype=np.uint8)
+    cells = np.lib.stride_tricks.as_strided(
+        sheet, shape=(rows, columns, tile_size, tile_size, 4),
+        strides=(pitch * sheet.strides[0], pitch * sheet.strides[1]) + sheet.strides)
+    cells[...] = pool[picks].reshape(rows, columns, tile_size, tile_size, 4)
+    return Image.fromarray(sheet, 'RGBA').convert(mode), engine.GridConfig(tile_size, tile_size, margin, margin)
+
+
+def render_viewport(atlas):
+    """Scale and slice the tiles of the first screenful, as display_tiles does"""
+    zoom_cache = engine.ZoomCache()
+    zoom_cache.set_atlas(atlas)
+    for row in range(min(VIEWPORT_ROWS, atlas.tiles_per_col)):
+        for col in range(min(VIEWPORT_COLUMNS, atlas.tiles_per_row)):
+            zoom_cache.tile_image(row * atlas.tiles_per_row + col, DISPLAY_SIZE, DISPLAY_SIZE)
+
+
+def render_scroll(atlas, palette=None):
+    """Scale every row of the grid once, as scrolling through the whole sheet does"""
+    zoom_cache = engine.ZoomCache()
+    zoom_cache.set_atlas(atlas, palette)
+    for row in range(atlas.tiles_per_col):
+        zoom_cache.get_strip(row, DISPLAY_SIZE, DISPLAY_SIZE)
+
+
+def stream_demargin(image, config):
+    """Save the sheet, then remove margins band by band from disk to disk"""
+    with tempfile.TemporaryDirectory() as folder:
+        src_path = os.path.join(folder, "sheet.png")
+        image.save(src_path, compress_level=1)
+        stream.stream_remove_margins(src_path, os.path.join(folder, "out.png"), config, band_bytes=8 << 20)
+
+
+# Path name -> (setup(image, config) -> state, run(state))
+PATHS = {
+    'split': (lambda image, config: (image, config),
+              lambda state: engine.split_tilesheet(*state)),
+    'demargin': (lambda image, config: (image, config),
+                 lambda state: engine.remove_margins(*state)),
+    'content_index': (lambda image, config: engine.split_tilesheet(image, config),
+                      lambda atlas: engine.ContentIndex(atlas)),
+    'feature_index': (lambda image, config: engine.split_tilesheet(image, config),
+                      lambda atlas: engine.FeatureIndex(atlas)),
+    'render_viewport': (lambda image, config: engine.split_tilesheet(image, config), render_viewport),
+    'render_scroll': (lambda image, config: engine.split_tilesheet(image, config), render_scroll),
+    # Bit-packed palette strips, palette detection included; sheets with more than 256 colours fall back to RGBA
+    'render_scroll_palette': (lambda image, config: engine.split_tilesheet(image, config),
+                              lambda atlas: render_scroll(atlas, engine.PalettePixels.from_pixels(atlas.pixels))),
+    'stream_demargin': (lambda image, config: (image, config),
+                        lambda state: stream_demargin(*state)),
+}
+
+DEFAULT_PATHS = ('split', 'demargin', 'content_index', 'feature_index', 'render_viewport', 'render_scroll')
+
+
+def peak_rss_bytes():
+    """Return the peak resident memory of this process, or None where unavailable"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def run_case(case):
+    """Time one (path, sheet) case; runs in a fresh worker process"""
+    path, tile_count, tile_size, margin, mode, repeat = case
+    image, config = make_sheet(tile_count, tile_size, margin, mode)
+    image.load()
+    setup, run = PATHS[path]
+    state = setup(image, config)
+    baseline_rss = peak_rss_bytes()
+
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run(state)
+        times.append(time.perf_counter() - start)
+
+    # One extra traced run for allocation peaks, kept out of the timings
+    tracemalloc.start()
+    run(state)
+    traced_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    best = min(times)
+    pixels = image.width * image.height
+    return {
+        'path': path,
+        'tiles': tile_count,
+        'tile_size': tile_size,
+        'margin': margin,
+        'mode': mode,
+        'sheet': f"{image.width}x{image.height}",
+        'best_s': best,
+        'median_s': statistics.median(times),
+        'tiles_per_s': tile_count / best if best > 0 else None,
+        'megapixels_per_s': pixels / best / 1e6 if best > 0 else None,
+        'traced_peak_bytes': traced_peak,
+        'peak_rss_bytes': peak_rss_bytes(),
+        'setup_rss_bytes': baseline_rss,
+    }
+
+
+def case_key(result):
+    """Identify a case across results files"""
+    return (result['path'], result['tiles'], result['tile_size'], result['margin'], result['mode'])
+
+
+def git_revision():
+    """Return the current commit of the repository, or None outside a git checkout"""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment_info():
+    """Describe the machine and library versions the results were taken with"""
+    return {
+        'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pillow': Image.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def compare(results, baseline_path, threshold):
+    """Print speed ratios against a baseline results file; return the number of regressions"""
+    with open(baseline_path) as f:
+        baseline = {case_key(r): r for r in json.load(f)['results']}
+
+    regressions = 0
+    print(f"\nCompared with {baseline_path} (ratio > 1 is faster now)")
+    for result in results:
+        old = baseline.get(case_key(result))
+        if old is None:
+            continue
+        ratio = old['best_s'] / result['best_s'] if result['best_s'] > 0 else float('inf')
+        flag = ""
+        if ratio < 1.0 / threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        print(f"{result['path']:>16} {result['tiles']:>7} {result['tile_size']:>3}px m{result['margin']} "
+              f"{result['mode']:>4} {ratio:>7.2f}x{flag}")
+    return regressions
+
+
+def main(argv=None):
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Benchmark the tilesheet engine paths headlessly.")
+    parser.add_argument("--paths", nargs="+", choices=sorted(PATHS), default=list(DEFAULT_PATHS),
+                        help="engine paths to time")
+    parser.add_argument("--quick", action="store_true", help="stop at 10k tiles and run each case once")
+    parser.add_argument("--max-tiles", type=int, default=max(TILE_COUNTS), help="largest sheet size in tiles")
+    parser.add_argument("--max-pixels", type=int, default=64_000_000, help="skip sheets larger than this")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per case (best and median are reported)")
+    parser.add_argument("--output", help="results file (default: benchmarks/results/bench-<time>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=1.25,
+                        help="slowdown factor reported as a regression (default: 1.25)")
+    parser.add_argument("--fail-on-regression", action="store_true", help="exit with status 1 on regressions")
+    args = parser.parse_args(argv)
+
+    max_tiles = min(args.max_tiles, 10000) if args.quick else args.max_tiles
+    repeat = 1 if args.quick else max(args.repeat, 1)
+
+    cases = []
+    for tile_count in TILE_COUNTS:
+        if tile_count > max_tiles:
+            continue
+        for tile_size, margin, mode in VARIANTS:
+            if tile_count * (tile_size + margin) ** 2 > args.max_pixels:
+                continue
+            cases.extend((path, tile_count, tile_size, margin, mode, repeat) for path in args.paths)
+
+    print(f"{'path':>16} {'tiles':>7} {'tile':>5} {'mode':>4} {'best ms':>10} {'tiles/s':>12} "
+          f"{'traced MB':>10} {'rss MB':>8}")
+
+    # A fresh process per case keeps one case's peak memory out of the next
+    results = []
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(processes=1, maxtasksperchild=1) as pool:
+        for result in pool.imap(run_case, cases):
+            results.append(result)
+            rss = f"{result['peak_rss_bytes'] / 2**20:>8.0f}" if result['peak_rss_bytes'] else f"{'--':>8}"
+            print(f"{result['path']:>16} {result['tiles']:>7} {result['tile_size']:>3}m{result['margin']} "
+                  f"{result['mode']:>4} {result['best_s'] * 1000:>10.2f} {result['tiles_per_s']:>12.0f} "
+                  f"{result['traced_peak_bytes'] / 2**20:>10.1f} {rss}")
+
+    output = args.output or os.path.join(os.path.dirname(os.path.abspath(__file__)), "results",
+                                         time.strftime("bench-%Y%m%d-%H%M%S.json"))
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({'environment': environment_info(), 'results': results}, f, indent=2)
+    print(f"\nWrote {len(results)} results to {output}")
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.threshold)
+        if regressions and args.fail_on_regression:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
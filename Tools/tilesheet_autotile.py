@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Tilesheet Autotile Preview
+A window that lays out a test map with the 16 tiles of a BitMaskTile set.
+Features:
+- Generate cave-like test maps or load one from an image or text file
+- Compute the neighbour mask of every cell in one vectorized pass
+- Render only the visible part of the map, so large maps stay responsive
+- Re-render as soon as the selected tiles or their order change
+- Flag masks used by the map that have no tile yet
+"""
+
+import tkinter as tk
+from tkinter import ttk, filedialog, messagebox
+from PIL import Image, ImageTk
+
+import numpy as np
+
+import tilesheet_engine as engine
+
+
+# Marker rows appended to the tile lookup table after the 16 mask tiles
+EMPTY_SLOT = 16
+MISSING_SLOT = 17
+
+
+def load_test_map(path):
+    """Load a boolean map from an image (dark or opaque pixels are filled) or a text file ('#' is filled)"""
+    if path.lower().endswith(engine.IMAGE_EXTENSIONS):
+        with Image.open(path) as image:
+            pixels = engine.image_to_array(image)
+        luminance = pixels[..., :3].astype(np.uint16).sum(axis=2)
+        return (pixels[..., 3] > 127) & (luminance < 3 * 128)
+
+    with open(path) as f:
+        lines = [line.rstrip("\n") for line in f]
+    width = max((len(line) for line in lines), default=0)
+    cells = np.zeros((len(lines), width), dtype=bool)
+    for y, line in enumerate(lines):
+        cells[y, :len(line)] = [char == '#' for char in line]
+    return cells
+
+
+class AutotilePreview:
+    """Toplevel window previewing a BitMaskTile set on a test map"""
+
+    def __init__(self, parent, background="black"):
+        self.window = tk.Toplevel(parent)
+        self.window.title("Autotile Preview")
+        self.window.geometry("800x700")
+
+        # Map configuration
+        self.map_width = tk.IntVar(value=512)
+        self.map_height = tk.IntVar(value=512)
+        self.fill = tk.DoubleVar(value=0.45)
+        self.zoom = tk.IntVar(value=2)
+        self.reversed_order = tk.BooleanVar(value=False)
+        self.background = background
+
+        # Map data: occupancy, the mask of every cell, and the lookup slot drawn in every cell
+        self.occupied = None
+        self.masks = None
+        self.cell_slots = None
+        self.seed = 0
+
+        # Tiles of the set, scaled to the cell size and composited over the background
+        self.atlas = None
+        self.tile_indices = []
+        self.tile_lut = None
+
+        self.photo = None
+        self.image_item = None
+        self.render_pending = None
+
+        self.setup_ui()
+        self.generate_map()
+
+    def setup_ui(self):
+        """Set up the user interface"""
+        control_frame = ttk.Frame(self.window, padding=5)
+        control_frame.pack(fill=tk.X)
+
+        ttk.Label(control_frame, text="Map:").pack(side=tk.LEFT)
+        ttk.Spinbox(control_frame, from_=4, to=4096, width=6, textvariable=self.map_width).pack(side=tk.LEFT)
+        ttk.Label(control_frame, text="x").pack(side=tk.LEFT)
+        ttk.Spinbox(control_frame, from_=4, to=4096, width=6, textvariable=self.map_height).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Label(control_frame, text="Fill:").pack(side=tk.LEFT)
+        ttk.Spinbox(control_frame, from_=0.1, to=0.9, increment=0.05, width=5, textvariable=self.fill).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Button(control_frame, text="Generate", command=self.generate_map).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Button(control_frame, text="Load Map...", command=self.load_map).pack(side=tk.LEFT, padx=(0, 10))
+
+        ttk.Label(control_frame, text="Zoom:").pack(side=tk.LEFT)
+        zoom_spin = ttk.Spinbox(control_frame, from_=1, to=8, width=3, textvariable=self.zoom, command=self.on_zoom_change)
+        zoom_spin.pack(side=tk.LEFT, padx=(0, 10))
+        zoom_spin.bind('<Return>', lambda e: self.on_zoom_change())
+
+        # The game draws remembered cells with the reversed sprite array
+        ttk.Checkbutton(control_frame, text="Reversed (remembered cells)", variable=self.reversed_order,
+                        command=self.refresh).pack(side=tk.LEFT)
+
+        canvas_frame = ttk.Frame(self.window)
+        canvas_frame.pack(fill=tk.BOTH, expand=True)
+
+        self.canvas = tk.Canvas(canvas_frame, bg=self.background)
+        v_scrollbar = ttk.Scrollbar(canvas_frame, orient=tk.VERTICAL, command=self.canvas.yview)
+        h_scrollbar = ttk.Scrollbar(canvas_frame, orient=tk.HORIZONTAL, command=self.canvas.xview)
+
+        def on_yscroll(first, last):
+            v_scrollbar.set(first, last)
+            self.schedule_render()
+
+        def on_xscroll(first, last):
+            h_scrollbar.set(first, last)
+            self.schedule_render()
+
+        self.canvas.configure(yscrollcommand=on_yscroll, xscrollcommand=on_xscroll)
+        self.canvas.bind("<Configure>", lambda e: self.schedule_render())
+        self.canvas.bind("<MouseWheel>", lambda e: self.canvas.yview_scroll(int(-1 * (e.delta / 120)), "units"))
+        self.canvas.bind("<Shift-MouseWheel>", lambda e: self.canvas.xview_scroll(int(-1 * (e.delta / 120)), "units"))
+        self.canvas.bind("<Button-4>", lambda e: self.canvas.yview_scroll(-1, "units"))
+        self.canvas.bind("<Button-5>", lambda e: self.canvas.yview_scroll(1, "units"))
+
+        self.canvas.grid(row=0, column=0, sticky="nsew")
+        v_scrollbar.grid(row=0, column=1, sticky="ns")
+        h_scrollbar.grid(row=1, column=0, sticky="ew")
+        canvas_frame.grid_rowconfigure(0, weight=1)
+        canvas_frame.grid_columnconfigure(0, weight=1)
+
+        self.status_var = tk.StringVar(value="Select tiles in the splitter to preview them")
+        ttk.Label(self.window, textvariable=self.status_var, relief=tk.SUNKEN, anchor=tk.W).pack(side=tk.BOTTOM, fill=tk.X)
+
+    def exists(self):
+        """Return True while the preview window is open"""
+        try:
+            return bool(self.window.winfo_exists())
+        except tk.TclError:
+            return False
+
+    def generate_map(self):
+        """Generate a new random test map"""
+        try:
+            width = max(self.map_width.get(), 1)
+            height = max(self.map_height.get(), 1)
+            fill = self.fill.get()
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to generate map: {str(e)}", parent=self.window)
+            return
+
+        self.seed += 1
+        self.set_map(engine.generate_test_map(width, height, fill, seed=self.seed))
+
+    def load_map(self):
+        """Load a test map from an image or text file"""
+        file_path = filedialog.askopenfilename(
+            parent=self.window,
+            title="Select Test Map",
+            filetypes=[
+                ("Map files", " ".join("*" + ext for ext in engine.IMAGE_EXTENSIONS + ('.txt',))),
+                ("All files", "*.*")
+            ]
+        )
+
+        if file_path:
+            try:
+                self.set_map(load_test_map(file_path))
+                self.map_height.set(self.occupied.shape[0])
+                self.map_width.set(self.occupied.shape[1])
+            except Exception as e:
+                messagebox.showerror("Error", f"Failed to load map: {str(e)}", parent=self.window)
+
+    def set_map(self, occupied):
+        """Use a new occupancy map and compute every cell's mask at once"""
+        self.occupied = occupied
+        self.masks = engine.neighbour_masks(occupied)
+        self.layout()
+        self.refresh()
+
+    def set_tiles(self, atlas, tile_indices):
+        """Use the given tiles, in mask order, and re-render"""
+        self.atlas = atlas
+        self.tile_indices = list(tile_indices)
+        self.refresh()
+
+    def get_cell_size(self):
+        """Return the on-screen (width, height) of one map cell"""
+        if self.atlas is None:
+            tile_width = tile_height = 16
+        else:
+            tile_width, tile_height = self.atlas.config.tile_width, self.atlas.config.tile_height
+        try:
+            zoom = max(self.zoom.get(), 1)
+        except Exception:
+            zoom = 1
+        return tile_width * zoom, tile_height * zoom
+
+    def layout(self):
+        """Size the scroll region to the whole map"""
+        if self.occupied is None:
+            return
+        cell_width, cell_height = self.get_cell_size()
+        height, width = self.occupied.shape
+        self.canvas.configure(scrollregion=(0, 0, width * cell_width, height * cell_height))
+
+    def on_zoom_change(self):
+        """Rebuild the scaled tiles for the new zoom"""
+        self.layout()
+        self.refresh()
+
+    def build_tile_lut(self):
+        """Scale the set's tiles to the cell size and stack them with the empty and missing markers.
+
+        Returns the stack and, per mask, whether the set has a usable tile for it.
+        """
+        cell_width, cell_height = self.get_cell_size()
+        background = np.array(self.window.winfo_rgb(self.background), dtype=np.uint32) // 257
+
+        lut = np.empty((MISSING_SLOT + 1, cell_height, cell_width, 3), dtype=np.uint8)
+        lut[:] = background.astype(np.uint8)
+
+        # Missing tiles are drawn as a magenta checkerboard so gaps in the set stand out
+        checker = (np.add.outer(np.arange(cell_height) // 4, np.arange(cell_width) // 4) % 2).astype(bool)
+        lut[MISSING_SLOT][checker] = (255, 0, 255)
+
+        indices = self.tile_indices[:16]
+        if self.reversed_order.get():
+            indices = indices[::-1]
+
+        rows = engine.nearest_indices(self.atlas.config.tile_height, cell_height) if self.atlas else None
+        cols = engine.nearest_indices(self.atlas.config.tile_width, cell_width) if self.atlas else None
+        present = np.zeros(16, dtype=bool)
+        for slot, tile_index in enumerate(indices):
+            # Tiles selected under another grid configuration may be past the last tile; their mask counts as missing
+            if self.atlas is None or not 0 <= tile_index < len(self.atlas):
+                continue
+            tile = self.atlas.tile_array(tile_index)[np.ix_(rows, cols)].astype(np.uint16)
+            alpha = tile[..., 3:]
+            lut[slot] = ((tile[..., :3] * alpha + lut[slot].astype(np.uint16) * (255 - alpha)) // 255).astype(np.uint8)
+            present[slot] = True
+        return lut, present
+
+    def refresh(self):
+        """Recompute the slot drawn in every cell and re-render the visible part of the map"""
+        if self.masks is None or not self.exists():
+            return
+
+        self.tile_lut, present = self.build_tile_lut()
+
+        # Masks without a tile in the set fall back to the missing marker
+        slot_of_mask = np.arange(16, dtype=np.uint8)
+        slot_of_mask[~present] = MISSING_SLOT
+        self.cell_slots = np.where(self.occupied, slot_of_mask[self.masks], EMPTY_SLOT).astype(np.uint8)
+
+        counts = np.bincount(self.masks[self.occupied], minlength=16)
+        missing = [mask for mask in range(16) if counts[mask] and not present[mask]]
+        height, width = self.occupied.shape
+        status = f"{width}x{height} map, {int(self.occupied.sum())} filled cells, {int(present.sum())}/16 tiles"
+        if missing:
+            status += f" - no tile for masks {', '.join(map(str, missing))}"
+        self.status_var.set(status)
+
+        self.render()
+
+    def schedule_render(self):
+        """Coalesce scroll and resize events into one render"""
+        if self.render_pending is None:
+            self.render_pending = self.window.after_idle(self.render)
+
+    def render(self):
+        """Compose the visible cells into one image from the tile lookup table"""
+        self.render_pending = None
+        if self.cell_slots is None or self.tile_lut is None:
+            return
+
+        cell_width, cell_height = self.get_cell_size()
+        left = int(self.canvas.canvasx(0))
+        top = int(self.canvas.canvasy(0))
+        view_width = max(self.canvas.winfo_width(), 1)
+        view_height = max(self.canvas.winfo_height(), 1)
+
+        map_height, map_width = self.cell_slots.shape
+        first_col = min(max(left // cell_width, 0), map_width)
+        first_row = min(max(top // cell_height, 0), map_height)
+        last_col = min((left + view_width) // cell_width + 1, map_width)
+        last_row = min((top + view_height) // cell_height + 1, map_height)
+        if last_col <= first_col or last_row <= first_row:
+            return
+
+        # One gather builds (rows, cols, cell_h, cell_w, 3); interleave into an image
+        cells = self.tile_lut[self.cell_slots[first_row:last_row, first_col:last_col]]
+        rows, cols = cells.shape[:2]
+        pixels = cells.transpose(0, 2, 1, 3, 4).reshape(rows * cell_height, cols * cell_width, 3)
+
+        self.photo = ImageTk.PhotoImage(Image.fromarray(pixels, 'RGB'))
+        x, y = first_col * cell_width, first_row * cell_height
+        if self.image_item is None:
+            self.image_item = self.canvas.create_image(x, y, anchor=tk.NW, image=self.photo)
+        else:
+            self.canvas.coords(self.image_item, x, y)
+            self.canvas.itemconfigure(self.image_item, image=self.photo)
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Tilesheet Batch Processor
+Command-line front end to the tilesheet engine for asset pipelines.
+Features:
+- Accept directories, glob patterns or individual files as input
+- Split tilesheets into individual tile images
+- Remove margins between tiles
+- Process many sheets in parallel across a process pool
+- Mirror input folders in the output so same-named sheets never overwrite each other
+- Stream huge PNG sheets band by band with bounded memory
+- Write de-margined sheets as the smallest lossless PNG
+
+Examples:
+    python tilesheet_batch.py split ../assets/fonts -o build/tiles
+    python tilesheet_batch.py demargin "sheets/*.png" -o build/clean --margin-x 1 --margin-y 1 -j 8
+    python tilesheet_batch.py demargin huge_sheet.png -o build/clean --margin-x 1 --margin-y 1 --stream --band-mb 32
+    python tilesheet_batch.py demargin ../assets/fonts -o build/clean --auto --optimize
+"""
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import partial
+from PIL import Image
+import argparse
+import glob
+import os
+import sys
+import time
+
+import tilesheet_engine as engine
+import tilesheet_export as export
+import tilesheet_stream as stream
+
+
+def collect_inputs(patterns):
+    """Expand directories and glob patterns into a sorted list of image files"""
+    files = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            candidates = [os.path.join(pattern, name) for name in os.listdir(pattern)]
+        else:
+            candidates = glob.glob(pattern) or [pattern]
+
+        for path in candidates:
+            if os.path.isfile(path) and path.lower().endswith(engine.IMAGE_EXTENSIONS):
+                files.add(os.path.abspath(path))
+
+    return sorted(files)
+
+
+def output_stems(files):
+    """Map every input file to its output path without extension, relative to the output directory.
+
+    Outputs keep each file's path below the deepest folder shared by all inputs, so
+    a/tiles.png and b/tiles.png write to a/tiles and b/tiles instead of replacing
+    each other. Files that still collide, such as tiles.png and tiles.bmp, raise ValueError.
+    """
+    root = os.path.commonpath([os.path.dirname(path) for path in files]) if files else ""
+    stems = {path: os.path.splitext(os.path.relpath(path, root))[0] for path in files}
+
+    seen = {}
+    for path, stem in stems.items():
+        other = seen.setdefault(os.path.normcase(stem), path)
+        if other != path:
+            raise ValueError(f"{other} and {path} would both be written to {stem}")
+    return stems
+
+
+def load_sheet(path, config):
+    """Load a sheet as an RGBA array, detecting its grid when config is None"""
+    with Image.open(path) as image:
+        pixels = engine.image_to_array(image)
+    return pixels, config or engine.detect_grid(pixels)
+
+
+def split_job(path, output_base, config):
+    """Split one sheet into the directory output_base"""
+    pixels, config = load_sheet(path, config)
+    atlas = engine.TileAtlas(pixels, config)
+    engine.save_tiles(atlas, output_base)
+    return f"{len(atlas)} tiles ({atlas.tiles_per_row}x{atlas.tiles_per_col})"
+
+
+def demargin_job(path, output_base, config, optimize=False, drop_hidden_colors=False):
+    """Remove margins from one sheet and save it as output_base.png, optionally as the smallest lossless PNG"""
+    pixels, config = load_sheet(path, config)
+    processed = engine.remove_margins(pixels, config)
+    if optimize:
+        report = export.save_optimized(processed, f"{output_base}.png", drop_hidden_colors)
+        return f"{processed.width}x{processed.height}, {report.summary()}"
+    processed.save(f"{output_base}.png")
+    return f"{processed.width}x{processed.height}"
+
+
+def stream_split_job(path, output_base, config, band_bytes=stream.DEFAULT_BAND_BYTES):
+    """Split one sheet band by band, falling back to split_job for files that cannot be streamed"""
+    if not stream.can_stream(path):
+        return split_job(path, output_base, config) + " (not streamable, loaded whole)"
+    count = stream.stream_split(path, output_base, config, band_bytes=band_bytes)
+    return f"{count} tiles (streamed)"
+
+
+def stream_demargin_job(path, output_base, config, band_bytes=stream.DEFAULT_BAND_BYTES):
+    """Remove margins from one sheet band by band, falling back to demargin_job for files that cannot be streamed"""
+    if not stream.can_stream(path):
+        return demargin_job(path, output_base, config) + " (not streamable, loaded whole)"
+    width, height = stream.stream_remove_margins(path, f"{output_base}.png", config, band_bytes=band_bytes)
+    return f"{width}x{height} (streamed)"
+
+
+JOBS = {
+    'split': split_job,
+    'demargin': demargin_job,
+}
+
+STREAM_JOBS = {
+    'split': stream_split_job,
+    'demargin': stream_demargin_job,
+}
+
+
+def build_parser():
+    """Create the command-line argument parser"""
+    parser = argparse.ArgumentParser(description="Split or de-margin tilesheets in bulk.")
+    parser.add_argument("mode", choices=sorted(JOBS), help="operation to run on every sheet")
+    parser.add_argument("inputs", nargs="+", help="image files, directories or glob patterns")
+    parser.add_argument("-o", "--output", required=True, help="output directory")
+    parser.add_argument("--tile-width", type=int, default=16)
+    parser.add_argument("--tile-height", type=int, default=16)
+    parser.add_argument("--margin-x", type=int, default=0)
+    parser.add_argument("--margin-y", type=int, default=0)
+    parser.add_argument("--offset-x", type=int, default=0)
+    parser.add_argument("--offset-y", type=int, default=0)
+    parser.add_argument("--auto", action="store_true",
+                        help="detect tile size, margins and offset of each sheet instead of using the options")
+    parser.add_argument("--stream", action="store_true",
+                        help="decode and write PNG sheets in bands so memory does not grow with sheet size")
+    parser.add_argument("--band-mb", type=int, default=64,
+                        help="decoded pixels held per band in streaming mode, in MiB (default: 64)")
+    parser.add_argument("--optimize", action="store_true",
+                        help="write de-margined sheets in the smallest color mode and compression that keeps every pixel")
+    parser.add_argument("--drop-hidden-colors", action="store_true",
+                        help="with --optimize, zero the color of fully transparent pixels so they compress better "
+                             "(not lossless for tools that sample or bleed transparent pixels)")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(),
+                        help="number of worker processes (default: CPU count)")
+    return parser
+
+
+def main(argv=None):
+    """Main function"""
+    args = build_parser().parse_args(argv)
+
+    try:
+        config = engine.GridConfig(args.tile_width, args.tile_height, args.margin_x, args.margin_y,
+                                   args.offset_x, args.offset_y).validate()
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+
+    if args.stream and args.auto:
+        print("Error: --auto needs the whole sheet and cannot be combined with --stream", file=sys.stderr)
+        return 2
+
+    if args.optimize and args.mode != 'demargin':
+        print("Error: --optimize only applies to demargin", file=sys.stderr)
+        return 2
+
+    if args.drop_hidden_colors and not args.optimize:
+        print("Error: --drop-hidden-colors only applies together with --optimize", file=sys.stderr)
+        return 2
+
+    if args.optimize and args.stream:
+        print("Error: --optimize needs the whole sheet and cannot be combined with --stream", file=sys.stderr)
+        return 2
+
+    files = collect_inputs(args.inputs)
+    if not files:
+        print("Error: no tilesheet images found", file=sys.stderr)
+        return 2
+
+    try:
+        stems = output_stems(files)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+
+    outputs = {path: os.path.join(args.output, stem) for path, stem in stems.items()}
+    for output_base in outputs.values():
+        os.makedirs(os.path.dirname(output_base), exist_ok=True)
+    if args.stream:
+        job = partial(STREAM_JOBS[args.mode], band_bytes=max(args.band_mb, 1) * 1024 * 1024)
+    elif args.optimize:
+        job = partial(JOBS[args.mode], optimize=True, drop_hidden_colors=args.drop_hidden_colors)
+    else:
+        job = JOBS[args.mode]
+    failures = 0
+    start = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+        futures = {pool.submit(job, path, outputs[path], None if args.auto else config): path for path in files}
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                print(f"{stems[path]}: {future.result()}")
+            except Exception as e:
+                failures += 1
+                print(f"{stems[path]}: failed ({e})", file=sys.stderr)
+
+    elapsed = time.perf_counter() - start
+    print(f"Processed {len(files) - failures}/{len(files)} sheets in {elapsed:.2f}s")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
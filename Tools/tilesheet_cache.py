@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Tilesheet Split Cache
+Two-tier cache of decoded tilesheets and split results.
+Features:
+- Decoded sheet pixels stored on disk as memory-mappable .npy files keyed by file content hash
+- Tile metadata, blank/duplicate index and similarity features stored per grid configuration
+- In-memory LRU of recent split results per grid configuration
+- Disk usage bounded by evicting the least recently used sheets
+"""
+
+from collections import OrderedDict
+import hashlib
+import os
+import shutil
+import threading
+
+import numpy as np
+
+import tilesheet_engine as engine
+import tilesheet_stream as stream
+
+
+# Bump when the layout of cached files changes so stale entries are ignored
+CACHE_VERSION = 1
+
+
+def default_cache_dir():
+    """Return the per-user cache directory for tilesheet data"""
+    override = os.environ.get("MUT8_TILESHEET_CACHE")
+    if override:
+        return override
+    if os.name == "nt":
+        base = os.environ.get("LOCALAPPDATA", os.path.expanduser("~"))
+    else:
+        base = os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache"))
+    return os.path.join(base, "mut8", "tilesheets")
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """Return a hex content hash of a file"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def config_key(config):
+    """Return a file-name-safe key for a grid configuration"""
+    return (f"t{config.tile_width}x{config.tile_height}_m{config.margin_x}x{config.margin_y}"
+            f"_o{config.offset_x}x{config.offset_y}")
+
+
+def _save_array(path, array):
+    """Write an .npy file atomically so readers never see a partial file"""
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temp_path, 'wb') as f:
+        np.save(f, np.ascontiguousarray(array))
+    os.replace(temp_path, path)
+
+
+class SplitResult:
+    """An atlas with the indexes built over it"""
+
+    def __init__(self, atlas, content_index, feature_index):
+        self.atlas = atlas
+        self.content_index = content_index
+        self.feature_index = feature_index
+
+
+class SplitCache:
+    """Caches decoded sheets on disk and split results both in memory and on disk.
+
+    Sheets are identified by the hash of their file contents, so an edited file
+    never reuses stale pixels. Arrays are loaded with np.load(mmap_mode='r'): the
+    operating system pages in only the parts that are actually read.
+    """
+
+    def __init__(self, cache_dir=None, max_entries=8, max_disk_bytes=2 * 1024 ** 3):
+        self.cache_dir = os.path.join(cache_dir or default_cache_dir(), f"v{CACHE_VERSION}")
+        self.max_entries = max_entries
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()  # (digest, config) -> SplitResult
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def sheet_dir(self, digest):
+        return os.path.join(self.cache_dir, digest)
+
+    def _touch(self, path):
+        """Mark a sheet directory as recently used for disk eviction"""
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def load_pixels(self, path, cancelled=None, progress=None):
+        """Return (digest, RGBA pixels) of an image file, decoding it only on a cache miss.
+
+        A decode reports progress(fraction, image, rows) band by band and returns
+        None once cancelled() returns True.
+        """
+        digest = file_digest(path)
+        pixels = self.cached_pixels(digest)
+        if pixels is not None:
+            return digest, pixels
+
+        image = stream.load_image(path, cancelled, progress)
+        if image is None:
+            return None
+        pixels = engine.image_to_array(image)
+
+        try:
+            os.makedirs(self.sheet_dir(digest), exist_ok=True)
+            _save_array(os.path.join(self.sheet_dir(digest), "pixels.npy"), pixels)
+            self.prune()
+        except OSError as e:
+            print(f"Could not write tilesheet cache: {e}")
+        return digest, pixels
+
+    def cached_pixels(self, digest):
+        """Return the memory-mapped pixels of a sheet already in the disk cache, or None"""
+        try:
+            pixels = np.load(os.path.join(self.sheet_dir(digest), "pixels.npy"), mmap_mode='r')
+        except (OSError, ValueError):
+            return None
+        self._touch(self.sheet_dir(digest))
+        return pixels
+
+    def peek(self, digest, config):
+        """Return the in-memory SplitResult for a config without computing anything, or None"""
+        with self._lock:
+            result = self._memory.get((digest, config))
+            if result is not None:
+                self._memory.move_to_end((digest, config))
+                self.hits += 1
+            return result
+
+    def get_split(self, digest, pixels, config):
+        """Return the SplitResult of a sheet for a config from memory, disk or a fresh split"""
+        key = (digest, config)
+        with self._lock:
+            result = self._memory.get(key)
+            if result is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return result
+
+        result = self._load_split(digest, pixels, config)
+        if result is not None:
+            self.disk_hits += 1
+        else:
+            self.misses += 1
+            atlas = engine.TileAtlas(pixels, config)
+            result = SplitResult(atlas, engine.ContentIndex(atlas), engine.FeatureIndex(atlas))
+            self._save_split(digest, config, result)
+
+        with self._lock:
+            self._memory[key] = result
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+        return result
+
+    def _split_dir(self, digest, config):
+        return os.path.join(self.sheet_dir(digest), config_key(config))
+
+    def _load_split(self, digest, pixels, config):
+        """Rebuild a split from the arrays saved on disk, or return None"""
+        split_dir = self._split_dir(digest, config)
+        try:
+            arrays = {name: np.load(os.path.join(split_dir, f"{name}.npy"), mmap_mode='r')
+                      for name in ('meta', 'hashes', 'blank', 'canonical', 'features')}
+        except (OSError, ValueError):
+            return None
+
+        atlas = engine.TileAtlas(pixels, config, meta=arrays['meta'])
+        if len(atlas.meta) != len(arrays['meta']) or len(arrays['hashes']) != len(atlas):
+            return None
+
+        self._touch(self.sheet_dir(digest))
+        content_index = engine.ContentIndex.from_arrays(arrays['hashes'], arrays['blank'], arrays['canonical'])
+        feature_index = engine.FeatureIndex(None, features=arrays['features'])
+        return SplitResult(atlas, content_index, feature_index)
+
+    def _save_split(self, digest, config, result):
+        """Write the arrays of a split next to the cached pixels"""
+        split_dir = self._split_dir(digest, config)
+        try:
+            os.makedirs(split_dir, exist_ok=True)
+            _save_array(os.path.join(split_dir, "meta.npy"), result.atlas.meta)
+            _save_array(os.path.join(split_dir, "hashes.npy"), result.content_index.hashes)
+            _save_array(os.path.join(split_dir, "blank.npy"), result.content_index.blank)
+            _save_array(os.path.join(split_dir, "canonical.npy"), result.content_index.canonical)
+            # Written last: its presence marks the entry as complete
+            _save_array(os.path.join(split_dir, "features.npy"), result.feature_index.features)
+        except OSError as e:
+            print(f"Could not write tilesheet cache: {e}")
+
+    def disk_usage(self):
+        """Return {digest: bytes} of every sheet in the disk cache"""
+        usage = {}
+        if not os.path.isdir(self.cache_dir):
+            return usage
+        for digest in os.listdir(self.cache_dir):
+            total = 0
+            for folder, _, files in os.walk(self.sheet_dir(digest)):
+                total += sum(os.path.getsize(os.path.join(folder, name)) for name in files)
+            usage[digest] = total
+        return usage
+
+    def prune(self):
+        """Delete the least recently used sheets until the disk cache fits its budget"""
+        usage = self.disk_usage()
+        total = sum(usage.values())
+        by_age = sorted(usage, key=lambda digest: os.path.getmtime(self.sheet_dir(digest)))
+
+        # The newest sheet is always kept, even when it alone exceeds the budget
+        for digest in by_age[:-1]:
+            if total <= self.max_disk_bytes:
+                break
+            shutil.rmtree(self.sheet_dir(digest), ignore_errors=True)
+            total -= usage[digest]
+
+    def forget(self, digest):
+        """Drop the in-memory split results of one sheet"""
+        with self._lock:
+            for key in [key for key in self._memory if key[0] == digest]:
+                del self._memory[key]
+
+    def clear_memory(self):
+        """Drop the in-memory split results"""
+        with self._lock:
+            self._memory.clear()
+
+    def clear_disk(self):
+        """Delete every cached sheet from disk"""
+        self.clear_memory()
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
@@ -0,0 +1,897 @@
+#!/usr/bin/env python3
+"""
+Tilesheet Engine
+GUI-free grid math and pixel operations shared by the tilesheet tools.
+Features:
+- Grid configuration and tile layout math
+- Split a tilesheet into zero-copy tile views over one pixel array
+- Remove margins between tiles
+- Pack a subset of tiles into a compact sheet
+- Save split tiles to disk
+- Cached nearest-neighbour zoom levels for tile grids
+- Bit-packed palette storage of 1-bit and low-colour sheets, expanded only for display
+- Automatic detection of tile size, margins and outer offset
+- Blank and duplicate tile index by content hash
+- Visual similarity search over downsampled tile features
+- Vectorized BitMaskTile neighbour masks and test map generation
+- Batched edge connectivity of every tile and suggested 16-tile BitMaskTile sets
+- Incremental index and zoom level updates when only some tiles of a sheet change
+"""
+
+from collections import namedtuple, OrderedDict
+from PIL import Image
+import numpy as np
+import os
+
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.gif', '.tiff')
+
+
+class GridConfig(namedtuple('GridConfig', ['tile_width', 'tile_height', 'margin_x', 'margin_y',
+                                           'offset_x', 'offset_y'], defaults=(0, 0))):
+    """Tile dimensions, gutter sizes and outer offset of a tilesheet grid"""
+    __slots__ = ()
+
+    @property
+    def pitch_x(self):
+        """Horizontal distance between the left edges of two neighbouring tiles"""
+        return self.tile_width + self.margin_x
+
+    @property
+    def pitch_y(self):
+        """Vertical distance between the top edges of two neighbouring tiles"""
+        return self.tile_height + self.margin_y
+
+    def validate(self):
+        """Raise ValueError if the configuration cannot describe a grid"""
+        if self.tile_width < 1 or self.tile_height < 1:
+            raise ValueError(f"Tile size must be positive, got {self.tile_width}x{self.tile_height}")
+        if self.margin_x < 0 or self.margin_y < 0:
+            raise ValueError(f"Margins cannot be negative, got {self.margin_x}x{self.margin_y}")
+        if self.offset_x < 0 or self.offset_y < 0:
+            raise ValueError(f"Offsets cannot be negative, got {self.offset_x}x{self.offset_y}")
+        return self
+
+
+def grid_dimensions(img_width, img_height, config):
+    """Return (tiles_per_row, tiles_per_col) that fit in an image of the given size"""
+    tiles_per_row = max(img_width - config.offset_x + config.margin_x, 0) // config.pitch_x
+    tiles_per_col = max(img_height - config.offset_y + config.margin_y, 0) // config.pitch_y
+    return tiles_per_row, tiles_per_col
+
+
+def tile_origin(row, col, config):
+    """Return the (x, y) pixel position of a tile in the source sheet"""
+    return config.offset_x + col * config.pitch_x, config.offset_y + row * config.pitch_y
+
+
+# Fixed-field metadata of one tile: grid position and pixel offset in the sheet
+TILE_DTYPE = np.dtype([('row', np.int32), ('col', np.int32), ('x', np.int32), ('y', np.int32)])
+
+
+class TileAtlas:
+    """A tilesheet split into tiles without copying any pixels.
+
+    The sheet is held once as a contiguous RGBA array; tiles are described by
+    a structured metadata array and only become arrays or images when asked
+    for. Tile indices are row-major, matching the glyph indices used by the game.
+    """
+
+    def __init__(self, pixels, config, meta=None):
+        config.validate()
+        self.pixels = pixels
+        self.config = config
+
+        img_height, img_width = pixels.shape[:2]
+        self.tiles_per_row, self.tiles_per_col = grid_dimensions(img_width, img_height, config)
+
+        # Metadata saved by an earlier split of the same sheet can be reused as is
+        if meta is not None and len(meta) == self.tiles_per_row * self.tiles_per_col:
+            self.meta = meta
+            return
+
+        # Build metadata for every tile in one vectorized pass
+        rows, cols = np.divmod(np.arange(self.tiles_per_row * self.tiles_per_col), max(self.tiles_per_row, 1))
+        self.meta = np.empty(rows.size, dtype=TILE_DTYPE)
+        self.meta['row'] = rows
+        self.meta['col'] = cols
+        self.meta['x'] = config.offset_x + cols * config.pitch_x
+        self.meta['y'] = config.offset_y + rows * config.pitch_y
+
+    def __len__(self):
+        return len(self.meta)
+
+    def __getitem__(self, tile_index):
+        """Return the metadata record (row, col, x, y) of a tile"""
+        return self.meta[tile_index]
+
+    @property
+    def size(self):
+        """(width, height) of the underlying sheet"""
+        return self.pixels.shape[1], self.pixels.shape[0]
+
+    def with_config(self, config):
+        """Re-split the same pixels with another grid configuration"""
+        return TileAtlas(self.pixels, config)
+
+    def tile_array(self, tile_index):
+        """Return a (tile_height, tile_width, 4) view of one tile's pixels"""
+        x = int(self.meta['x'][tile_index])
+        y = int(self.meta['y'][tile_index])
+        return self.pixels[y:y + self.config.tile_height, x:x + self.config.tile_width]
+
+    def tile_image(self, tile_index):
+        """Return a copy of one tile as a PIL image"""
+        return Image.fromarray(np.ascontiguousarray(self.tile_array(tile_index)), 'RGBA')
+
+    def tiles_view(self):
+        """Return every tile as one (rows, cols, tile_height, tile_width, 4) strided view"""
+        config = self.config
+        origin = self.pixels[config.offset_y:, config.offset_x:]
+        row_stride, col_stride, channel_stride = origin.strides
+        return np.lib.stride_tricks.as_strided(
+            origin,
+            shape=(self.tiles_per_col, self.tiles_per_row, config.tile_height, config.tile_width, 4),
+            strides=(row_stride * config.pitch_y, col_stride * config.pitch_x,
+                     row_stride, col_stride, channel_stride),
+            writeable=False)
+
+
+def split_tilesheet(image, config):
+    """Split an image into a TileAtlas of tiles"""
+    return TileAtlas(image_to_array(image), config)
+
+
+def remove_margins(image, config):
+    """Return a new RGBA image with the gutters between tiles removed.
+
+    Every tile is gathered by one strided reshape of the sheet array instead of
+    a crop and paste per tile; the result is byte-identical to pasting the
+    tiles one by one into a transparent RGBA image.
+    """
+    atlas = split_tilesheet(image, config)
+    new_width = atlas.tiles_per_row * config.tile_width
+    new_height = atlas.tiles_per_col * config.tile_height
+    if new_width == 0 or new_height == 0:
+        return Image.new('RGBA', (new_width, new_height), (0, 0, 0, 0))
+
+    # (rows, cols, tile_h, tile_w, 4) -> (rows, tile_h, cols, tile_w, 4) -> packed sheet
+    packed = atlas.tiles_view().transpose(0, 2, 1, 3, 4).reshape(new_height, new_width, 4)
+    return Image.fromarray(packed, 'RGBA')
+
+
+def pack_tiles(atlas, tile_indices, columns):
+    """Return a new RGBA image holding the given tiles row-major in a grid of the given width.
+
+    Cells past the last tile in the final row are left transparent.
+    """
+    config = atlas.config
+    tile_indices = np.asarray(tile_indices, dtype=np.int64)
+    columns = max(min(columns, len(tile_indices)), 1)
+    rows = -(-len(tile_indices) // columns)
+    if len(tile_indices) == 0:
+        return Image.new('RGBA', (0, 0), (0, 0, 0, 0))
+
+    # Gather the tiles in one fancy-indexing pass, then lay them out like remove_margins
+    tiles = np.zeros((rows * columns, config.tile_height, config.tile_width, 4), dtype=np.uint8)
+    tiles[:len(tile_indices)] = atlas.tiles_view().reshape(-1, config.tile_height, config.tile_width, 4)[tile_indices]
+    packed = tiles.reshape(rows, columns, config.tile_height, config.tile_width, 4).transpose(0, 2, 1, 3, 4)
+    return Image.fromarray(packed.reshape(rows * config.tile_height, columns * config.tile_width, 4), 'RGBA')
+
+
+def save_tiles(atlas, output_dir, prefix="tile", first_index=0):
+    """Save every tile of an atlas as an individual PNG file named by tile index"""
+    os.makedirs(output_dir, exist_ok=True)
+    paths = []
+    for tile_index in range(len(atlas)):
+        path = os.path.join(output_dir, f"{prefix}_{first_index + tile_index}.png")
+        atlas.tile_image(tile_index).save(path)
+        paths.append(path)
+    return paths
+
+
+def image_to_array(image):
+    """Return the pixels of an image as a contiguous (height, width, 4) RGBA uint8 array.
+
+    Arrays already in that layout are returned unchanged.
+    """
+    if isinstance(image, np.ndarray):
+        return image
+    if image.mode != 'RGBA':
+        image = image.convert('RGBA')
+    return np.ascontiguousarray(np.asarray(image))
+
+
+def nearest_indices(src_size, dst_size):
+    """Return the source pixel index for every destination pixel of a NEAREST resize.
+
+    The map is taken from PIL itself so scaled tiles match Image.resize(..., NEAREST)
+    exactly, including its fixed-point rounding at non-integer scales.
+    """
+    ramp = Image.fromarray(np.arange(src_size, dtype=np.int32).reshape(1, src_size), 'I')
+    return np.asarray(ramp.resize((dst_size, 1), Image.Resampling.NEAREST))[0].astype(np.intp)
+
+
+def pack_indices(indices, bits):
+    """Pack a (height, width) uint8 array of values below 2**bits into bits per value, row by row"""
+    per_byte = 8 // bits
+    height, width = indices.shape
+    padded = -(-width // per_byte) * per_byte
+    if padded != width:
+        indices = np.pad(indices, ((0, 0), (0, padded - width)))
+    shifts = np.arange(per_byte - 1, -1, -1, dtype=np.uint8) * np.uint8(bits)
+    groups = indices.reshape(height, padded // per_byte, per_byte) << shifts
+    return np.bitwise_or.reduce(groups, axis=2).astype(np.uint8)
+
+
+def unpack_indices(packed, bits, width, first=0):
+    """Return width values starting at column first of every row of an array made by pack_indices"""
+    per_byte = 8 // bits
+    start, stop = first // per_byte, -(-(first + width) // per_byte)
+    shifts = np.arange(per_byte - 1, -1, -1, dtype=np.uint8) * np.uint8(bits)
+    values = (packed[:, start:stop, None] >> shifts) & np.uint8((1 << bits) - 1)
+    offset = first - start * per_byte
+    return values.reshape(packed.shape[0], -1)[:, offset:offset + width]
+
+
+class PalettePixels:
+    """A sheet of few colours held as a palette and bit-packed colour indices.
+
+    Indices take 1, 2, 4 or 8 bits per pixel, the fewest that fit the palette, so
+    a two-colour sheet costs 1/32 of its RGBA array. Pixels only become RGBA for
+    the part being displayed.
+    """
+
+    def __init__(self, colors, packed, bits, width):
+        self.colors = colors  # (colours, 4) RGBA palette
+        self.packed = packed  # (height, row bytes) packed palette indices
+        self.bits = bits
+        self.width = width
+
+    @classmethod
+    def from_pixels(cls, pixels, max_colors=256):
+        """Index an RGBA array, or return None if it has more than max_colors colours"""
+        words = np.ascontiguousarray(pixels).view(np.uint32)[..., 0]
+
+        # Most full-colour sheets give themselves away in a sample of their rows
+        if len(np.unique(words[::16])) > max_colors:
+            return None
+        colors, inverse = np.unique(words, return_inverse=True)
+        if len(colors) > max_colors:
+            return None
+
+        bits = next(b for b in (1, 2, 4, 8) if len(colors) <= 1 << b)
+        indices = inverse.reshape(words.shape).astype(np.uint8)
+        return cls(colors.view(np.uint8).reshape(-1, 4), pack_indices(indices, bits), bits, words.shape[1])
+
+    @property
+    def nbytes(self):
+        return self.packed.nbytes + self.colors.nbytes
+
+    @property
+    def rgba_bytes(self):
+        """Size of the same pixels as an RGBA array"""
+        return self.packed.shape[0] * self.width * 4
+
+    def describe(self):
+        """Return a short description such as '1-bit palette (2 colours)'"""
+        return f"{self.bits}-bit palette ({len(self.colors)} colour{'s' if len(self.colors) != 1 else ''})"
+
+    def same_palette(self, other):
+        """True if other indexes colours the same way"""
+        return other is not None and self.bits == other.bits and np.array_equal(self.colors, other.colors)
+
+    def gather(self, row_indices, col_indices):
+        """Return the palette indices at every (row, col) pair of two index arrays as a 2D uint8 array"""
+        per_byte = 8 // self.bits
+        byte_cols, slots = np.divmod(col_indices, per_byte)
+        shifts = ((per_byte - 1 - slots) * self.bits).astype(np.uint8)
+        return (self.packed[np.ix_(row_indices, byte_cols)] >> shifts) & np.uint8((1 << self.bits) - 1)
+
+    def to_rgba(self, indices):
+        """Expand palette indices to RGBA pixels"""
+        return self.colors[indices]
+
+
+class ZoomCache:
+    """Nearest-neighbour scaled copies of a tile grid, cached per zoom level.
+
+    Scaled pixels are kept as one strip per tile row and zoom level, each built
+    with a single vectorized gather over the source array. Strips are evicted
+    least-recently-used once the cache grows past max_bytes, so revisiting a
+    zoom level only costs a slice of an existing strip.
+
+    With a PalettePixels of the sheet, strips hold bit-packed palette indices
+    instead of RGBA and a tile is only expanded when its image is asked for.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.rgba_bytes = 0  # What the cached strips would take as RGBA
+        self._strips = OrderedDict()  # (display_width, display_height, row) -> ndarray
+        self._atlas = None
+        self.palette = None  # PalettePixels of the atlas pixels, if they have few colours
+
+    def set_atlas(self, atlas, palette=None):
+        """Point the cache at a new atlas, dropping every cached strip"""
+        self._atlas = atlas
+        self.palette = palette
+        self.clear()
+
+    def clear(self):
+        """Drop every cached strip"""
+        self._strips.clear()
+        self.total_bytes = 0
+        self.rgba_bytes = 0
+
+    def update_atlas(self, atlas, tile_indices, palette=None):
+        """Point the cache at an edited atlas of the same grid, rescaling only the changed tiles in cached strips"""
+        if (palette is None) != (self.palette is None) or (palette is not None and not palette.same_palette(self.palette)):
+            # Cached indices refer to the old palette
+            self.set_atlas(atlas, palette)
+            return
+
+        self._atlas = atlas
+        self.palette = palette
+        config = atlas.config
+        changed_rows = {}
+        for tile_index in tile_indices:
+            row, col = divmod(int(tile_index), atlas.tiles_per_row)
+            changed_rows.setdefault(row, []).append(col)
+
+        for (display_width, display_height, row), strip in self._strips.items():
+            cols = changed_rows.get(row)
+            if cols is None:
+                continue
+            if palette is not None:
+                # Packed strips are rebuilt whole; a row is cheap to gather
+                strip[...] = self._build_strip(row, display_width, display_height)
+                continue
+            _, y = tile_origin(row, 0, config)
+            row_indices = y + nearest_indices(config.tile_height, display_height)
+            tile_columns = nearest_indices(config.tile_width, display_width)
+            for col in cols:
+                x = config.offset_x + col * config.pitch_x
+                strip[:, col * display_width:(col + 1) * display_width] = atlas.pixels[np.ix_(row_indices, x + tile_columns)]
+
+    def _build_strip(self, row, display_width, display_height):
+        """Scale a whole tile row, as RGBA or as packed palette indices"""
+        atlas = self._atlas
+        config = atlas.config
+        _, y = tile_origin(row, 0, config)
+        row_indices = y + nearest_indices(config.tile_height, display_height)
+
+        # Column map of every tile in the row laid side by side without spacing
+        tile_columns = nearest_indices(config.tile_width, display_width)
+        tile_starts = config.offset_x + np.arange(atlas.tiles_per_row, dtype=np.intp) * config.pitch_x
+        col_indices = (tile_starts[:, None] + tile_columns[None, :]).ravel()
+
+        if self.palette is not None:
+            return pack_indices(self.palette.gather(row_indices, col_indices), self.palette.bits)
+        return atlas.pixels[np.ix_(row_indices, col_indices)]
+
+    def _cached_strip(self, row, display_width, display_height):
+        """Return the stored strip of a tile row, building it on first use"""
+        key = (display_width, display_height, row)
+        strip = self._strips.get(key)
+        if strip is not None:
+            self._strips.move_to_end(key)
+            return strip
+
+        strip = self._build_strip(row, display_width, display_height)
+        self._strips[key] = strip
+        self.total_bytes += strip.nbytes
+        self.rgba_bytes += display_height * display_width * self._atlas.tiles_per_row * 4
+
+        # Evict least recently used strips, always keeping the one just built
+        while self.total_bytes > self.max_bytes and len(self._strips) > 1:
+            (evicted_width, evicted_height, _), evicted = self._strips.popitem(last=False)
+            self.total_bytes -= evicted.nbytes
+            self.rgba_bytes -= evicted_height * evicted_width * self._atlas.tiles_per_row * 4
+
+        return strip
+
+    def get_strip(self, row, display_width, display_height):
+        """Return the scaled pixels of a whole tile row as a (height, tiles * width, 4) array"""
+        strip = self._cached_strip(row, display_width, display_height)
+        if self.palette is None:
+            return strip
+        width = display_width * self._atlas.tiles_per_row
+        return self.palette.to_rgba(unpack_indices(strip, self.palette.bits, width))
+
+    def tile_image(self, tile_index, display_width, display_height):
+        """Return one tile scaled to the display size as a PIL image"""
+        row, col = divmod(tile_index, self._atlas.tiles_per_row)
+        strip = self._cached_strip(row, display_width, display_height)
+        if self.palette is None:
+            return Image.fromarray(strip[:, col * display_width:(col + 1) * display_width], 'RGBA')
+
+        # Only this tile's columns are unpacked
+        indices = unpack_indices(strip, self.palette.bits, display_width, col * display_width)
+        return Image.fromarray(self.palette.to_rgba(indices), 'RGBA')
+
+
+def background_mask(pixels):
+    """Return a boolean (height, width) mask of background pixels.
+
+    Sheets with any transparency use alpha == 0 as background; fully opaque
+    sheets use the most common colour along the top and left edges.
+    """
+    alpha = pixels[..., 3]
+    if (alpha == 0).any():
+        return alpha == 0
+
+    edges = np.concatenate([pixels[0], pixels[:, 0]])
+    colors, counts = np.unique(edges.view(np.uint32).ravel(), return_counts=True)
+    background = colors[np.argmax(counts)]
+    return pixels.view(np.uint32)[..., 0] == background
+
+
+def _border_offset(empty, residue_empty):
+    """Return the offset of a margin-free grid inside an empty border along one axis.
+
+    The grid may start anywhere in the leading empty lines as long as the lines
+    left over at the end are empty too. Empty lines that the padding shared by
+    every tile (residue_empty) does not explain belong to the border, so the
+    offset leaving the fewest of them inside the first and last tile rows wins.
+    """
+    length, pitch = len(empty), len(residue_empty)
+    if empty.all():
+        return 0
+    leading = int(np.argmax(~empty))
+    trailing = int(np.argmax(~empty[::-1]))
+
+    def padding_run(residues):
+        """Number of residues in a row, from the first given, empty in every tile"""
+        return next((count for count, residue in enumerate(residues) if not residue_empty[residue % pitch]),
+                    pitch)
+
+    best, best_key = 0, None
+    for offset in range(min(pitch, leading + 1)):
+        leftover = (length - offset) % pitch
+        if leftover > trailing:
+            continue
+        top = max((leading - offset) % pitch - padding_run(range(offset, offset + pitch)), 0)
+        bottom = max((trailing - leftover) % pitch - padding_run(range(offset - 1, offset - 1 - pitch, -1)), 0)
+        key = (top + bottom, abs(leftover - offset), offset)
+        if best_key is None or key < best_key:
+            best, best_key = offset, key
+    return best
+
+
+def _detect_axis(occupancy, empty, min_tile, max_tile):
+    """Infer (tile_size, margin, offset) along one axis from per-line statistics.
+
+    occupancy is the fraction of foreground pixels on each line and empty marks
+    lines with no foreground at all. The pitch is the strongest autocorrelation
+    lag of the occupancy profile; gutters are residues of that pitch that are
+    empty in every period.
+    """
+    length = len(occupancy)
+    lags = np.arange(max(min_tile, 2), min(max_tile + 1, length // 2 + 1))
+    centered = occupancy - occupancy.mean()
+    if lags.size == 0 or not centered.any():
+        return length, 0, 0
+
+    # Autocorrelation through the FFT, normalized for the shrinking overlap at longer lags
+    spectrum = np.fft.rfft(centered, 2 * length)
+    autocorr = np.fft.irfft(spectrum * np.conj(spectrum))[:length]
+    autocorr = autocorr / autocorr[0] * length / (length - np.arange(length))
+    pitch = int(lags[np.argmax(autocorr[lags])])
+
+    # Multiples of the true pitch correlate just as well, so prefer the smallest divisor that
+    # is itself a correlation peak of similar strength
+    for divisor in range(lags[0], pitch):
+        if (pitch % divisor == 0 and autocorr[divisor] >= 0.9 * autocorr[pitch]
+                and autocorr[divisor] >= autocorr[divisor - 1] and autocorr[divisor] >= autocorr[divisor + 1]):
+            pitch = divisor
+            break
+
+    # Residues (positions modulo the pitch) that are empty in every period
+    periods = -(-length // pitch)
+    padded = np.ones(periods * pitch, dtype=bool)
+    padded[:length] = empty
+    residue_empty = padded.reshape(periods, pitch).all(axis=0)
+    if residue_empty.all() or not residue_empty.any():
+        return pitch, 0, _border_offset(empty, residue_empty)
+
+    # Longest circular run of empty residues is the gutter
+    start = int(np.argmin(residue_empty))
+    rolled = np.roll(residue_empty, -start)
+    edges = np.diff(np.concatenate([[0], rolled.astype(np.int8), [0]]))
+    run_starts = np.flatnonzero(edges == 1)
+    run_lengths = np.flatnonzero(edges == -1) - run_starts
+    longest = int(np.argmax(run_lengths))
+    margin = int(run_lengths[longest])
+    offset = (start + int(run_starts[longest]) + margin) % pitch
+
+    # Gutters that also fit a margin-free grid are transparent padding inside the tiles
+    if length % pitch == 0 and (length - offset + margin) % pitch != 0:
+        return pitch, 0, _border_offset(empty, residue_empty)
+    return pitch - margin, margin, offset
+
+
+def detect_grid(pixels, min_tile=4, max_tile=256):
+    """Infer the GridConfig of a sheet from row and column pixel statistics"""
+    background = background_mask(pixels)
+    tile_width, margin_x, offset_x = _detect_axis(
+        1.0 - background.mean(axis=0), background.all(axis=0), min_tile, max_tile)
+    tile_height, margin_y, offset_y = _detect_axis(
+        1.0 - background.mean(axis=1), background.all(axis=1), min_tile, max_tile)
+    return GridConfig(tile_width, tile_height, margin_x, margin_y, offset_x, offset_y)
+
+
+# Fixed odd multipliers for tile content hashing, seeded so hashes are stable across runs
+_HASH_SEED = 0x4D757438
+_HASH_MIX = np.uint64(0xBF58476D1CE4E5B9)
+
+
+def _tile_rows(atlas, tile_indices=None):
+    """Copy tiles into one (tiles, tile_bytes) array with fully transparent pixels zeroed"""
+    pixel_count = atlas.config.tile_width * atlas.config.tile_height
+    if tile_indices is None:
+        count = len(atlas)
+        tiles = atlas.tiles_view().copy().reshape(count, pixel_count, 4)
+    else:
+        count = len(tile_indices)
+        rows, cols = np.divmod(np.asarray(tile_indices, dtype=np.intp), max(atlas.tiles_per_row, 1))
+        tiles = atlas.tiles_view()[rows, cols].reshape(count, pixel_count, 4)
+    tiles *= (tiles[..., 3:] != 0)
+    return tiles.reshape(count, pixel_count * 4)
+
+
+def changed_tiles(atlas, other):
+    """Return the indices of tiles whose pixels differ between two atlases of the same grid"""
+    differs = np.any(atlas.tiles_view() != other.tiles_view(), axis=(2, 3, 4))
+    return np.flatnonzero(differs.ravel())
+
+
+def tile_hashes(atlas, rows=None):
+    """Return a 64-bit content hash per tile, computed for all tiles at once.
+
+    Pixels with zero alpha hash the same whatever their colour, so tiles that
+    look identical hash identically.
+    """
+    if rows is None:
+        rows = _tile_rows(atlas)
+    count, row_bytes = rows.shape
+    if count == 0:
+        return np.zeros(0, dtype=np.uint64)
+
+    # Treat each tile as 64-bit words and take a random linear combination of them
+    padded_bytes = -(-row_bytes // 8) * 8
+    if padded_bytes != row_bytes:
+        rows = np.pad(rows, ((0, 0), (0, padded_bytes - row_bytes)))
+    words = np.ascontiguousarray(rows).view(np.uint64)
+    coeffs = np.random.default_rng(_HASH_SEED).integers(0, 2**63, size=words.shape[1], dtype=np.uint64) * 2 + 1
+
+    with np.errstate(over='ignore'):
+        hashes = (words * coeffs).sum(axis=1, dtype=np.uint64)
+        hashes ^= hashes >> np.uint64(31)
+        hashes *= _HASH_MIX
+        hashes ^= hashes >> np.uint64(29)
+    return hashes
+
+
+class ContentIndex:
+    """Blank and duplicate tiles of an atlas, found in one vectorized pass.
+
+    blank marks fully transparent tiles. canonical maps every tile to the lowest
+    index with exactly the same content (itself when unique), so tiles sharing a
+    canonical index are duplicates of each other.
+    """
+
+    def __init__(self, atlas=None):
+        if atlas is None:
+            return
+        rows = _tile_rows(atlas)
+        count = len(rows)
+        self.hashes = tile_hashes(atlas, rows)
+        self.blank = ~rows[:, 3::4].any(axis=1)
+
+        # Group by hash; the first occurrence of each hash is the canonical tile
+        _, first_index, inverse = np.unique(self.hashes, return_index=True, return_inverse=True)
+        canonical = first_index[inverse]
+
+        # Confirm every match byte for byte so a hash collision can never merge distinct tiles
+        same = np.all(rows == rows[canonical], axis=1)
+        self.canonical = np.where(same, canonical, np.arange(count))
+
+    @classmethod
+    def from_arrays(cls, hashes, blank, canonical):
+        """Rebuild an index from the arrays of an earlier one"""
+        index = cls()
+        index.hashes, index.blank, index.canonical = hashes, blank, canonical
+        return index
+
+    def updated(self, atlas, tile_indices):
+        """Return the index of an edited atlas in which only the given tiles changed.
+
+        Only the changed tiles are hashed, and only matches that involve them or
+        that moved to another canonical tile are confirmed byte for byte.
+        """
+        tile_indices = np.asarray(tile_indices, dtype=np.intp)
+        rows = _tile_rows(atlas, tile_indices)
+        hashes = np.array(self.hashes)
+        blank = np.array(self.blank)
+        hashes[tile_indices] = tile_hashes(atlas, rows)
+        blank[tile_indices] = ~rows[:, 3::4].any(axis=1)
+
+        _, first_index, inverse = np.unique(hashes, return_index=True, return_inverse=True)
+        canonical = first_index[inverse]
+
+        changed = np.zeros(len(hashes), dtype=bool)
+        changed[tile_indices] = True
+        check = np.flatnonzero((canonical != np.arange(len(hashes)))
+                               & (changed | changed[canonical] | (canonical != self.canonical)))
+        if len(check):
+            same = np.all(_tile_rows(atlas, check) == _tile_rows(atlas, canonical[check]), axis=1)
+            canonical[check[~same]] = check[~same]
+        return ContentIndex.from_arrays(hashes, blank, canonical)
+
+    def __len__(self):
+        return len(self.canonical)
+
+    @property
+    def is_canonical(self):
+        """Boolean mask of tiles that are the first occurrence of their content"""
+        return self.canonical == np.arange(len(self.canonical))
+
+    @property
+    def blank_count(self):
+        return int(self.blank.sum())
+
+    @property
+    def unique_count(self):
+        """Number of distinct non-blank tiles"""
+        return int((self.is_canonical & ~self.blank).sum())
+
+    @property
+    def duplicate_count(self):
+        """Number of non-blank tiles that repeat an earlier tile"""
+        return int((~self.is_canonical & ~self.blank).sum())
+
+    def duplicate_groups(self):
+        """Return lists of tile indices sharing the same non-blank content, largest first"""
+        duplicates = np.flatnonzero(~self.is_canonical & ~self.blank)
+        groups = {}
+        for tile_index in duplicates:
+            groups.setdefault(int(self.canonical[tile_index]), [int(self.canonical[tile_index])]).append(int(tile_index))
+        return sorted(groups.values(), key=len, reverse=True)
+
+    def dedupe_mapping(self):
+        """Return a JSON-serializable description of blank tiles and duplicate remapping"""
+        remap = {int(i): int(self.canonical[i]) for i in np.flatnonzero(~self.is_canonical & ~self.blank)}
+        return {
+            'tile_count': len(self),
+            'unique_count': self.unique_count,
+            'blank': [int(i) for i in np.flatnonzero(self.blank)],
+            'remap': remap,
+            'groups': self.duplicate_groups(),
+        }
+
+
+def _box_filter(src, dst):
+    """Return a (dst, src) matrix that averages src samples into dst equal bins"""
+    weights = np.zeros((dst, src), dtype=np.float32)
+    for b in range(dst):
+        start = b * src // dst
+        stop = max((b + 1) * src // dst, start + 1)
+        weights[b, start:stop] = 1.0 / (stop - start)
+    return weights
+
+
+def tile_features(atlas, size=8, tile_indices=None):
+    """Return a (tiles, size*size*4) float32 array of downsampled, alpha-premultiplied tiles.
+
+    Only the given tiles are processed when tile_indices is passed.
+    """
+    if tile_indices is None:
+        count = len(atlas)
+        tiles = atlas.tiles_view().reshape(count, atlas.config.tile_height, atlas.config.tile_width, 4)
+    else:
+        count = len(tile_indices)
+        rows, cols = np.divmod(np.asarray(tile_indices, dtype=np.intp), max(atlas.tiles_per_row, 1))
+        tiles = atlas.tiles_view()[rows, cols]
+    if count == 0:
+        return np.zeros((0, size * size * 4), dtype=np.float32)
+
+    tiles = tiles.astype(np.float32) / 255.0
+
+    # Premultiply so fully transparent pixels look the same whatever their colour
+    tiles[..., :3] *= tiles[..., 3:]
+
+    # Area-average every tile down to size x size in two matrix products
+    rows = _box_filter(atlas.config.tile_height, size)
+    cols = _box_filter(atlas.config.tile_width, size)
+    small = np.einsum('ay,nyxc,bx->nabc', rows, tiles, cols, optimize=True)
+    return np.ascontiguousarray(small.reshape(count, -1))
+
+
+class FeatureIndex:
+    """Downsampled feature vectors of every tile in one array for nearest-neighbour queries"""
+
+    def __init__(self, atlas, size=8, features=None):
+        # A features array saved from an earlier index can be reused instead of an atlas
+        self.size = size
+        self.features = tile_features(atlas, size) if features is None else features
+        self.sq_norms = np.einsum('ij,ij->i', self.features, self.features)
+
+    def __len__(self):
+        return len(self.features)
+
+    def updated(self, atlas, tile_indices):
+        """Return a copy with the features of some tiles recomputed from an edited atlas"""
+        features = np.array(self.features)
+        features[tile_indices] = tile_features(atlas, self.size, tile_indices)
+        return FeatureIndex(None, self.size, features)
+
+    def distances(self, tile_index):
+        """Squared distance from one tile to every tile, in one batched product"""
+        query = self.features[tile_index]
+        distances = self.sq_norms - 2.0 * (self.features @ query) + self.sq_norms[tile_index]
+        return np.maximum(distances, 0.0)
+
+    def query(self, tile_index, k=12, exclude=None):
+        """Return up to k (tile_index, distance) pairs nearest to a tile, closest first.
+
+        The query tile itself and tiles flagged in the optional exclude mask are skipped.
+        """
+        distances = self.distances(tile_index)
+        candidates = np.ones(len(distances), dtype=bool) if exclude is None else ~exclude
+        candidates[tile_index] = False
+        candidates = np.flatnonzero(candidates)
+        if len(candidates) == 0 or k <= 0:
+            return []
+
+        # Partial sort: only the k best candidates are ordered
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(distances[candidates], k - 1)[:k]]
+        candidates = candidates[np.argsort(distances[candidates], kind='stable')]
+        return [(int(i), float(distances[i])) for i in candidates]
+
+
+# Neighbour bits of BitMaskTile.GetBitmask in the game
+MASK_UP = 1
+MASK_LEFT = 2
+MASK_RIGHT = 4
+MASK_DOWN = 8
+
+
+def neighbour_masks(occupied):
+    """Return the 4-bit BitMaskTile mask of every cell of a boolean map in one pass.
+
+    A bit is set when the neighbour in that direction is also occupied; cells
+    outside the map never match, as in the game.
+    """
+    occupied = np.asarray(occupied, dtype=bool)
+    masks = np.zeros(occupied.shape, dtype=np.uint8)
+    masks[1:, :] |= occupied[:-1, :] * np.uint8(MASK_UP)
+    masks[:, 1:] |= occupied[:, :-1] * np.uint8(MASK_LEFT)
+    masks[:, :-1] |= occupied[:, 1:] * np.uint8(MASK_RIGHT)
+    masks[:-1, :] |= occupied[1:, :] * np.uint8(MASK_DOWN)
+    masks[~occupied] = 0
+    return masks
+
+
+def generate_test_map(width, height, fill=0.45, smooth_steps=4, seed=None):
+    """Return a boolean cave-like map made by smoothing random noise with a cellular automaton"""
+    rng = np.random.default_rng(seed)
+    cells = rng.random((height, width)) < fill
+
+    for _ in range(smooth_steps):
+        # Count the 8 neighbours of every cell at once; the outside counts as empty
+        padded = np.pad(cells, 1).astype(np.uint8)
+        neighbours = sum(padded[1 + dy:1 + dy + height, 1 + dx:1 + dx + width]
+                         for dy in (-1, 0, 1) for dx in (-1, 0, 1) if dy or dx)
+        cells = (neighbours > 4) | (cells & (neighbours == 4))
+    return cells
+
+
+def tile_foreground(atlas):
+    """Return a (rows, cols, tile_height, tile_width) view marking the content pixels of every tile"""
+    config = atlas.config
+    origin = ~background_mask(atlas.pixels)[config.offset_y:, config.offset_x:]
+    row_stride, col_stride = origin.strides
+    return np.lib.stride_tricks.as_strided(
+        origin,
+        shape=(atlas.tiles_per_col, atlas.tiles_per_row, config.tile_height, config.tile_width),
+        strides=(row_stride * config.pitch_y, col_stride * config.pitch_x, row_stride, col_stride),
+        writeable=False)
+
+
+def edge_masks(atlas, min_coverage=0.1, relative_coverage=0.75, foreground=None):
+    """Return the 4-bit edge connectivity mask of every tile in one batched pass.
+
+    A side counts as connected when content covers at least min_coverage of the
+    tile border there and at least relative_coverage of the best covered side, so
+    thin pipes connect while the rounded ends of blob tiles do not. The bits are
+    those of BitMaskTile.GetBitmask, so a tile's edge mask is the neighbour mask
+    it should be drawn for. Corner pixels belong to two sides and are left out.
+    """
+    if foreground is None:
+        foreground = tile_foreground(atlas)
+    height, width = foreground.shape[2:]
+    inner_x = slice(1, -1) if width > 2 else slice(None)
+    inner_y = slice(1, -1) if height > 2 else slice(None)
+
+    # (rows, cols, side) coverage of the four borders, in bit order
+    coverage = np.stack([foreground[:, :, 0, inner_x].mean(axis=-1),
+                         foreground[:, :, inner_y, 0].mean(axis=-1),
+                         foreground[:, :, inner_y, -1].mean(axis=-1),
+                         foreground[:, :, -1, inner_x].mean(axis=-1)], axis=-1)
+    connected = (coverage >= min_coverage) & (coverage >= relative_coverage * coverage.max(axis=-1, keepdims=True))
+    bits = np.array([MASK_UP, MASK_LEFT, MASK_RIGHT, MASK_DOWN], dtype=np.uint8)
+    return (connected * bits).sum(axis=-1, dtype=np.uint8).ravel()
+
+
+def dominant_colors(atlas, foreground=None):
+    """Return the most common content colour of every tile as packed RGBA (0 for blank tiles)"""
+    if foreground is None:
+        foreground = tile_foreground(atlas)
+    count = len(atlas)
+    pixel_count = atlas.config.tile_width * atlas.config.tile_height
+    colors = np.zeros(count, dtype=np.uint32)
+    if count == 0:
+        return colors
+
+    # Count (tile, colour) pairs of all content pixels at once, then keep the top colour of each tile
+    tile_ids, pixel_ids = np.nonzero(foreground.reshape(count, pixel_count))
+    pixels = atlas.tiles_view().reshape(count, pixel_count, 4)[tile_ids, pixel_ids]
+    keys = (tile_ids.astype(np.uint64) << np.uint64(32)) | np.ascontiguousarray(pixels).view(np.uint32).ravel()
+    keys, counts = np.unique(keys, return_counts=True)
+    key_tiles = (keys >> np.uint64(32)).astype(np.intp)
+    order = np.lexsort((-counts, key_tiles))
+    first = order[np.r_[True, key_tiles[order][1:] != key_tiles[order][:-1]]]
+    colors[key_tiles[first]] = (keys[first] & np.uint64(0xFFFFFFFF)).astype(np.uint32)
+    return colors
+
+
+def suggest_bitmask_sets(atlas, masks, colors, exclude=None, max_spread=8):
+    """Return complete 16-tile BitMaskTile sets found across a sheet, tightest first.
+
+    Each set is a list of 16 tile indices whose entry m has edge mask m, the order
+    GetBitmask indexes a set in. Tiles of one set share their dominant colour and
+    are taken as close as possible to a seed tile, since sheets lay sets out in
+    blocks; no set reaches further than max_spread tiles from its seed and no tile
+    is used twice. Returns (spread, tile indices) pairs.
+    """
+    available = colors != 0
+    if exclude is not None:
+        available &= ~exclude
+    indices = np.arange(len(atlas))
+    rows, cols = np.divmod(indices, max(atlas.tiles_per_row, 1))
+
+    sets = []
+    for color in np.unique(colors[available]):
+        members = indices[available & (colors == color)]
+        member_masks = masks[members]
+        by_mask = [np.flatnonzero(member_masks == mask) for mask in range(16)]
+        if min(len(options) for options in by_mask) == 0:
+            continue
+
+        # Seed from the rarest mask, since every set needs one tile of each
+        used = np.zeros(len(members), dtype=bool)
+        seed_mask = min(range(16), key=lambda mask: len(by_mask[mask]))
+        for seed in by_mask[seed_mask]:
+            if used[seed]:
+                continue
+            distance = np.maximum(np.abs(rows[members] - rows[members[seed]]),
+                                  np.abs(cols[members] - cols[members[seed]]))
+            picks = []
+            for options in by_mask:
+                options = options[~used[options]]
+                if len(options) == 0:
+                    break
+                picks.append(options[np.argmin(distance[options])])
+            if len(picks) < 16:
+                break
+            spread = int(distance[picks].max())
+            if spread > max_spread:
+                continue
+            used[picks] = True
+            sets.append((spread, members[picks].tolist()))
+
+    sets.sort(key=lambda item: (item[0], item[1][0]))
+    return sets
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Tilesheet Selection Groups
+Named tile selections of a sheet, kept in a JSON file next to it.
+Features:
+- Any number of named groups, each an ordered list of tile indices
+- Constant-time membership, insertion and removal, keeping the order
+- JSON sidecar (<sheet>.groups.json) saved and loaded with the sheet
+- Bulk export of every group as a C# int[] array, ready for BitMaskTile
+"""
+
+import json
+import os
+import re
+
+
+SIDECAR_SUFFIX = ".groups.json"
+DEFAULT_GROUP_NAME = "Selection"
+
+
+def sidecar_path(sheet_path):
+    """Return the path of the groups file of a sheet"""
+    return os.path.splitext(sheet_path)[0] + SIDECAR_SUFFIX
+
+
+def csharp_identifier(name, fallback="Group"):
+    """Turn a group or file name into a PascalCase C# identifier"""
+    words = re.findall(r"[A-Za-z0-9]+", name)
+    identifier = "".join(word[:1].upper() + word[1:] for word in words) or fallback
+    if identifier[0].isdigit():
+        identifier = "_" + identifier
+    return identifier
+
+
+class SelectionGroup:
+    """An ordered set of tile indices; for BitMaskTile sets the order is the bitmask order"""
+
+    def __init__(self, name, tiles=()):
+        self.name = name
+        self._tiles = dict.fromkeys(int(tile) for tile in tiles)  # Insertion-ordered set
+
+    def __len__(self):
+        return len(self._tiles)
+
+    def __contains__(self, tile_index):
+        return tile_index in self._tiles
+
+    def __iter__(self):
+        return iter(self._tiles)
+
+    @property
+    def tiles(self):
+        """The tile indices in order, as a new list"""
+        return list(self._tiles)
+
+    def add(self, tile_index):
+        """Append a tile; returns False if it was already in the group"""
+        if tile_index in self._tiles:
+            return False
+        self._tiles[tile_index] = None
+        return True
+
+    def remove(self, tile_index):
+        """Remove a tile; returns False if it was not in the group"""
+        return self._tiles.pop(tile_index, False) is None
+
+    def set_tiles(self, tiles):
+        """Replace the tiles, keeping the given order"""
+        self._tiles = dict.fromkeys(int(tile) for tile in tiles)
+
+    def clear(self):
+        self._tiles.clear()
+
+    def swap(self, first, second):
+        """Swap the tiles at two positions"""
+        tiles = self.tiles
+        tiles[first], tiles[second] = tiles[second], tiles[first]
+        self.set_tiles(tiles)
+
+
+class SelectionGroups:
+    """The named selection groups of one sheet, one of which is the active selection"""
+
+    def __init__(self, groups=None, active=None):
+        self.groups = {}  # Name -> SelectionGroup, in creation order
+        for group in groups or [SelectionGroup(DEFAULT_GROUP_NAME)]:
+            self.groups[group.name] = group
+        self.active = self.groups[active] if active in self.groups else next(iter(self.groups.values()))
+        self._saved = self.snapshot()  # Contents when last loaded or saved
+
+    def __len__(self):
+        return len(self.groups)
+
+    def __iter__(self):
+        return iter(self.groups.values())
+
+    def names(self):
+        return list(self.groups)
+
+    def add(self, name):
+        """Create an empty group and make it active; returns it"""
+        name = name.strip()
+        if not name:
+            raise ValueError("Group name cannot be empty")
+        if name in self.groups:
+            raise ValueError(f"A group named '{name}' already exists")
+        self.active = self.groups[name] = SelectionGroup(name)
+        return self.active
+
+    def remove(self, name):
+        """Delete a group; the last group is emptied instead, as there is always an active one"""
+        if len(self.groups) == 1:
+            self.groups[name].clear()
+        else:
+            group = self.groups.pop(name)
+            if self.active is group:
+                self.active = next(iter(self.groups.values()))
+
+    def rename(self, old_name, new_name):
+        """Rename a group, keeping its place in the order"""
+        new_name = new_name.strip()
+        if not new_name:
+            raise ValueError("Group name cannot be empty")
+        if new_name != old_name and new_name in self.groups:
+            raise ValueError(f"A group named '{new_name}' already exists")
+        self.groups = {new_name if name == old_name else name: group for name, group in self.groups.items()}
+        self.groups[new_name].name = new_name
+
+    def activate(self, name):
+        self.active = self.groups[name]
+
+    def snapshot(self):
+        """Return the names and tiles of every group, in order"""
+        return [(group.name, group.tiles) for group in self]
+
+    @property
+    def modified(self):
+        """True if the groups changed since they were loaded or saved"""
+        return self.snapshot() != self._saved
+
+    def count_outside(self, tile_count):
+        """Return how many grouped tiles are past the last of tile_count tiles"""
+        return sum(1 for group in self for tile in group if tile >= tile_count)
+
+    def is_empty(self):
+        """True if no group holds any tile"""
+        return all(len(group) == 0 for group in self)
+
+    def to_json(self, sheet_name=None):
+        """Return the groups as a JSON-serializable dict"""
+        return {
+            'sheet': sheet_name,
+            'active': self.active.name,
+            'groups': [{'name': group.name, 'tiles': group.tiles} for group in self],
+        }
+
+    @classmethod
+    def from_json(cls, data):
+        """Build groups from a dict made by to_json; negative tile indices are dropped"""
+        groups = [SelectionGroup(entry['name'], [tile for tile in entry.get('tiles', []) if int(tile) >= 0])
+                  for entry in data.get('groups', [])]
+        return cls(groups or None, data.get('active'))
+
+    @classmethod
+    def load(cls, path):
+        """Read groups from a JSON file"""
+        with open(path) as f:
+            return cls.from_json(json.load(f))
+
+    def save(self, path, sheet_name=None):
+        """Write the groups to a JSON file"""
+        with open(path, "w") as f:
+            json.dump(self.to_json(sheet_name), f, indent=2)
+        self._saved = self.snapshot()
+
+    def export_csharp(self, class_name, source=None):
+        """Return C# source declaring every non-empty group as a static int[] field"""
+        lines = []
+        if source:
+            lines.append(f"// Tile groups of {source}, exported by tilesheet_splitter.py")
+        lines += [f"internal static class {csharp_identifier(class_name)}", "{"]
+        used = set()
+        for group in self:
+            if len(group) == 0:
+                continue
+            # Names that collide after conversion get a numeric suffix
+            field = base = csharp_identifier(group.name)
+            suffix = 2
+            while field in used:
+                field, suffix = f"{base}{suffix}", suffix + 1
+            used.add(field)
+            lines.append(f"    public static readonly int[] {field} = {{ {', '.join(map(str, group))} }};")
+        lines.append("}")
+        return "\n".join(lines) + "\n"
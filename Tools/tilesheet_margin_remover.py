@@ -6,18 +6,180 @@ Features:
 - Load tilesheet images
 - Configure tile dimensions and margins
 - Remove margins and create a new tilesheet
-- Preview the result
+- Preview the result, quickly from a cached downscale and then at full quality in the background
+- Previews follow window resizes, debounced, with finished renders cached per size
 - Save the processed tilesheet
+- Optimized PNG output: smallest lossless color mode and compression, no metadata
+- Stream huge PNG sheets from disk to disk with bounded memory
 """
 
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 from PIL import Image, ImageTk
+import argparse
 import os
+import time
 
+import tilesheet_engine as engine
+import tilesheet_export as export
+import tilesheet_stream as stream
+from tilesheet_profiler import Profiler, format_report, profiled
+from tilesheet_tasks import BackgroundWorker
 
+
+# Longest side of the cached copy every fast preview is scaled from
+PREVIEW_BASE_SIZE = 1024
+
+# Full-quality renders kept per canvas, so resizing back and forth does not resample again
+RENDER_CACHE_SIZE = 4
+
+# Quiet time after the last <Configure> event before the canvas is rendered again
+RESIZE_DEBOUNCE_MS = 150
+
+
+def preview_base(image):
+    """Return a box-filtered copy of an image no larger than PREVIEW_BASE_SIZE, or the image itself"""
+    factor = -(-max(image.size) // PREVIEW_BASE_SIZE)
+    if factor <= 1:
+        return image
+    if image.mode in ("1", "P"):
+        # Palette images cannot be box-filtered
+        return image.resize((max(image.width // factor, 1), max(image.height // factor, 1)), Image.Resampling.NEAREST)
+    return image.reduce(factor)
+
+
+def fit_to_canvas(image_size, canvas_size):
+    """Return the (width, height) of an image scaled down to fit a canvas"""
+    img_width, img_height = image_size
+    canvas_width, canvas_height = canvas_size
+    
+    # Calculate scale to fit image in canvas
+    scale_x = canvas_width / img_width
+    scale_y = canvas_height / img_height
+    scale = min(scale_x, scale_y, 1.0)  # Don't scale up
+    
+    display_width = max(int(img_width * scale), 1)
+    display_height = max(int(img_height * scale), 1)
+    return display_width, display_height
+
+
+class CanvasPreview:
+    """Shows an image scaled to fit a canvas, quickly first and sharply once rendered.
+    
+    A fast resize of a small cached copy is shown at once; the full-quality
+    resample of the original runs on a worker thread and replaces it when done.
+    Finished renders are cached by size and resizes are debounced.
+    """
+    
+    def __init__(self, root, canvas, profiler, resample):
+        self.root = root
+        self.canvas = canvas
+        self.profiler = profiler
+        self.resample = resample  # Filter of the full-quality render
+        self.image = None
+        self.base = None  # Small copy fast previews are scaled from
+        self.renders = {}  # (width, height) -> full-quality display image
+        self.shown_size = None  # Display size currently on the canvas
+        self.worker = BackgroundWorker(root, delay_ms=0, poll_ms=30)
+        self.pending_resize = None
+        
+        canvas.bind("<Configure>", self.on_configure)
+        
+    def set_image(self, image, base=None, renders=None):
+        """Show a new image; base and renders may come precomputed from a worker thread"""
+        self.worker.cancel()
+        self.image = image
+        self.base = base
+        self.renders = dict(renders or {})
+        self.shown_size = None
+        
+    def clear(self):
+        """Forget the image and empty the canvas"""
+        self.set_image(None)
+        self.canvas.delete("all")
+        
+    def canvas_size(self):
+        return self.canvas.winfo_width(), self.canvas.winfo_height()
+        
+    def on_configure(self, event=None):
+        """Render again once the canvas has stopped changing size"""
+        if self.pending_resize is not None:
+            self.root.after_cancel(self.pending_resize)
+        self.pending_resize = self.root.after(RESIZE_DEBOUNCE_MS, self.refresh)
+        
+    def refresh(self):
+        """Render for the current canvas size unless that size is already shown"""
+        self.pending_resize = None
+        if self.image is not None and fit_to_canvas(self.image.size, self.canvas_size()) != self.shown_size:
+            self.show()
+            
+    def show(self):
+        """Display the image fitted to the canvas"""
+        self.canvas.delete("all")
+        self.shown_size = None
+        canvas_width, canvas_height = self.canvas_size()
+        if self.image is None or canvas_width <= 1 or canvas_height <= 1:
+            # Canvas not mapped yet: its first <Configure> event renders it
+            return
+            
+        size = fit_to_canvas(self.image.size, (canvas_width, canvas_height))
+        render = self.renders.get(size)
+        if render is None and size == self.image.size:
+            render = self.image
+        if render is not None:
+            self.show_image(render)
+            self.shown_size = size
+            return
+            
+        # Fast preview now, full quality from the worker
+        with self.profiler.phase("preview"):
+            if self.base is None:
+                self.base = preview_base(self.image)
+            preview = self.base.resize(size, Image.Resampling.NEAREST if self.resample == Image.Resampling.NEAREST
+                                       else Image.Resampling.BILINEAR)
+        self.show_image(preview)
+        self.shown_size = size
+        self.worker.submit(self.render, self.image, size, on_done=self.on_rendered, on_error=self.on_render_error)
+        
+    def render(self, cancelled, image, size):
+        """Resample the full image to a display size (worker thread)"""
+        start = time.perf_counter()
+        render = image.resize(size, self.resample, reducing_gap=3.0)
+        return image, size, render, time.perf_counter() - start
+        
+    def on_rendered(self, result):
+        """Swap the fast preview for the full-quality render (main thread)"""
+        image, size, render, seconds = result
+        if image is not self.image:
+            return
+        self.renders[size] = render
+        while len(self.renders) > RENDER_CACHE_SIZE:
+            del self.renders[next(iter(self.renders))]
+        if size == self.shown_size:
+            with self.profiler.operation("render_preview", start=time.perf_counter() - seconds):
+                self.profiler.add("resize", seconds)
+                self.show_image(render)
+                
+    def on_render_error(self, error):
+        """Keep the fast preview when the full-quality render fails (main thread)"""
+        print(f"Error rendering preview: {error}")
+        
+    def show_image(self, display_image):
+        """Replace the contents of the canvas with an image centered in it"""
+        with self.profiler.phase("photo"):
+            photo = self.profiler.track_photo(ImageTk.PhotoImage(display_image))
+            
+        self.canvas.delete("all")
+        x = (self.canvas.winfo_width() - display_image.width) // 2
+        y = (self.canvas.winfo_height() - display_image.height) // 2
+        self.canvas.create_image(x, y, anchor=tk.NW, image=photo)
+        
+        # Store reference
+        self.canvas.image_ref = photo
+        
+        
 class TilesheetMarginRemover:
-    def __init__(self, root):
+    def __init__(self, root, profile_log=None):
         self.root = root
         self.root.title("Tilesheet Margin Remover")
         self.root.geometry("1000x700")
@@ -27,6 +189,9 @@ class TilesheetMarginRemover:
         self.tile_height = tk.IntVar(value=16)
         self.margin_x = tk.IntVar(value=1)
         self.margin_y = tk.IntVar(value=1)
+        self.offset_x = tk.IntVar(value=0)
+        self.offset_y = tk.IntVar(value=0)
+        self.optimize_png = tk.BooleanVar(value=False)
         
         # Image data
         self.original_image = None
@@ -34,8 +199,35 @@ class TilesheetMarginRemover:
         self.tiles_per_row = 0
         self.tiles_per_col = 0
         
+        # Streaming jobs run on a worker thread so the window stays responsive
+        self.stream_worker = BackgroundWorker(self.root, delay_ms=0, poll_ms=100)
+        
+        # Images are decoded and scaled for display on a worker thread, with a preview while decoding
+        self.load_worker = BackgroundWorker(self.root, delay_ms=0, poll_ms=50)
+        self.last_preview_time = 0.0
+        self.load_started = None
+        
+        # Phase timings and resource counts of the main operations, shown in the status bar
+        self.profiler = Profiler(log_path=profile_log)
+        self.profiler.add_counter('canvas_items', lambda: len(self.original_canvas.find_all()) + len(self.processed_canvas.find_all()))
+        
         self.setup_ui()
         
+        # Bind cleanup on window close
+        self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
+        
+    def on_closing(self):
+        """Stop background work when closing the application"""
+        try:
+            self.stream_worker.shutdown()
+            self.load_worker.shutdown()
+            self.original_preview.worker.shutdown()
+            self.processed_preview.worker.shutdown()
+        except Exception as e:
+            print(f"Error during cleanup: {e}")
+        finally:
+            self.root.destroy()
+        
     def setup_ui(self):
         """Set up the user interface"""
         # Create main frame
@@ -61,8 +253,11 @@ class TilesheetMarginRemover:
         file_frame.pack(fill=tk.X, pady=(0, 10))
         
         ttk.Button(file_frame, text="Load Tilesheet", command=self.load_tilesheet).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Button(file_frame, text="Auto-detect", command=self.auto_detect_grid).pack(side=tk.LEFT, padx=(0, 5))
         ttk.Button(file_frame, text="Process & Preview", command=self.process_tilesheet).pack(side=tk.LEFT, padx=(0, 5))
         ttk.Button(file_frame, text="Save Processed", command=self.save_processed).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Checkbutton(file_frame, text="Optimize PNG", variable=self.optimize_png).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Button(file_frame, text="Stream Large File...", command=self.stream_process_file).pack(side=tk.LEFT, padx=(0, 5))
         ttk.Button(file_frame, text="Clear", command=self.clear_all).pack(side=tk.LEFT)
         
         # Configuration inputs
@@ -87,6 +282,15 @@ class TilesheetMarginRemover:
         margin_y_spin = ttk.Spinbox(config_frame, from_=0, to=64, width=10, textvariable=self.margin_y)
         margin_y_spin.grid(row=1, column=3, padx=(0, 20), pady=(5, 0))
         
+        # Outer offset before the first tile
+        ttk.Label(config_frame, text="Offset X:").grid(row=2, column=0, sticky=tk.W, padx=(0, 5), pady=(5, 0))
+        offset_x_spin = ttk.Spinbox(config_frame, from_=0, to=512, width=10, textvariable=self.offset_x)
+        offset_x_spin.grid(row=2, column=1, padx=(0, 20), pady=(5, 0))
+        
+        ttk.Label(config_frame, text="Offset Y:").grid(row=2, column=2, sticky=tk.W, padx=(0, 5), pady=(5, 0))
+        offset_y_spin = ttk.Spinbox(config_frame, from_=0, to=512, width=10, textvariable=self.offset_y)
+        offset_y_spin.grid(row=2, column=3, padx=(0, 20), pady=(5, 0))
+        
     def create_preview_area(self, parent):
         """Create the preview area for before/after comparison"""
         preview_frame = ttk.LabelFrame(parent, text="Preview", padding=10)
@@ -110,69 +314,161 @@ class TilesheetMarginRemover:
         self.processed_canvas = tk.Canvas(self.processed_frame, bg="white")
         self.processed_canvas.pack(fill=tk.BOTH, expand=True)
         
+        # Cached, progressively sharpened previews that follow canvas resizes
+        self.original_preview = CanvasPreview(self.root, self.original_canvas, self.profiler, Image.Resampling.LANCZOS)
+        self.processed_preview = CanvasPreview(self.root, self.processed_canvas, self.profiler, Image.Resampling.NEAREST)
+        
     def create_status_bar(self):
         """Create status bar"""
+        status_frame = ttk.Frame(self.root)
+        status_frame.pack(side=tk.BOTTOM, fill=tk.X)
+        
         self.status_var = tk.StringVar(value="Ready")
-        status_bar = ttk.Label(self.root, textvariable=self.status_var, relief=tk.SUNKEN, anchor=tk.W)
-        status_bar.pack(side=tk.BOTTOM, fill=tk.X)
+        status_bar = ttk.Label(status_frame, textvariable=self.status_var, relief=tk.SUNKEN, anchor=tk.W)
+        status_bar.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        
+        # Timing of the last profiled operation
+        self.perf_var = tk.StringVar(value="")
+        perf_bar = ttk.Label(status_frame, textvariable=self.perf_var, relief=tk.SUNKEN, anchor=tk.E)
+        perf_bar.pack(side=tk.RIGHT)
+        self.profiler.on_report = lambda report: self.perf_var.set(format_report(report))
+        
+        # Shown only while an image is loading
+        self.load_progress = ttk.Progressbar(status_frame, length=160, mode='determinate', maximum=1.0)
+        self.load_cancel_button = ttk.Button(status_frame, text="Cancel", command=self.cancel_load)
         
     def load_tilesheet(self):
         """Load a tilesheet image"""
         file_path = filedialog.askopenfilename(
             title="Select Tilesheet Image",
             filetypes=[
-                ("Image files", "*.png *.jpg *.jpeg *.bmp *.gif *.tiff"),
+                ("Image files", " ".join("*" + ext for ext in engine.IMAGE_EXTENSIONS)),
                 ("All files", "*.*")
             ]
         )
         
-        if file_path:
-            try:
-                self.original_image = Image.open(file_path)
-                self.display_original_image()
-                self.status_var.set(f"Loaded: {os.path.basename(file_path)} ({self.original_image.width}x{self.original_image.height})")
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed to load image: {str(e)}")
-                
+        if not file_path:
+            return
+            
+        canvas_size = (self.original_canvas.winfo_width(), self.original_canvas.winfo_height())
+        self.status_var.set(f"Loading {os.path.basename(file_path)}...")
+        self.show_load_progress()
+        self.load_started = time.perf_counter()
+        self.load_worker.submit(self.read_image, file_path, canvas_size,
+                                on_done=self.apply_load, on_error=self.on_load_error,
+                                on_progress=self.on_load_progress)
+        
+    def read_image(self, cancelled, file_path, canvas_size):
+        """Decode an image and scale it to fit the original tab (worker thread)"""
+        timings = {}
+        
+        def progress(fraction, image, rows):
+            # Previews are throttled; the progress bar follows every band
+            preview = None
+            now = time.perf_counter()
+            if fraction < 1.0 and now - self.last_preview_time >= 0.2 and min(canvas_size) > 1:
+                self.last_preview_time = now
+                preview = stream.preview_image(image, rows, *canvas_size)
+            cancelled.progress(fraction, preview)
+            
+        start = time.perf_counter()
+        image = stream.load_image(file_path, cancelled, progress)
+        if image is None:
+            return None
+        timings['decode'] = time.perf_counter() - start
+        
+        # The preview base and the full-quality scaling are done here rather than on the main loop
+        start = time.perf_counter()
+        base = preview_base(image)
+        renders = {}
+        if min(canvas_size) > 1 and not cancelled():
+            display_size = fit_to_canvas(image.size, canvas_size)
+            renders[display_size] = image.resize(display_size, Image.Resampling.LANCZOS, reducing_gap=3.0)
+        timings['resize'] = time.perf_counter() - start
+        return file_path, image, base, renders, timings
+        
+    def apply_load(self, result):
+        """Show an image loaded by the worker (main thread)"""
+        self.hide_load_progress()
+        if result is None:
+            return
+            
+        file_path, image, base, renders, timings = result
+        with self.profiler.operation("load_tilesheet", start=self.load_started):
+            # Phases timed on the worker count towards the load as well
+            for phase, seconds in timings.items():
+                self.profiler.add(phase, seconds)
+            
+            self.original_image = image
+            self.original_preview.set_image(image, base, renders)
+            self.display_original_image()
+            self.status_var.set(f"Loaded: {os.path.basename(file_path)} ({image.width}x{image.height})")
+            
+    def on_load_progress(self, fraction, preview):
+        """Advance the progress bar and show the partially decoded image (main thread)"""
+        self.load_progress['value'] = fraction
+        if preview is not None:
+            self.original_preview.show_image(preview)
+            
+    def on_load_error(self, error):
+        """Report a failed background load (main thread)"""
+        self.hide_load_progress()
+        self.status_var.set("Ready")
+        self.display_original_image()
+        messagebox.showerror("Error", f"Failed to load image: {str(error)}")
+        
+    def cancel_load(self):
+        """Stop loading an image and keep the current one"""
+        self.load_worker.cancel()
+        self.hide_load_progress()
+        self.display_original_image()
+        self.status_var.set("Loading cancelled")
+        
+    def show_load_progress(self):
+        """Show the progress bar and cancel button in the status bar"""
+        self.load_progress['value'] = 0.0
+        self.last_preview_time = 0.0
+        self.load_cancel_button.pack(side=tk.RIGHT)
+        self.load_progress.pack(side=tk.RIGHT, padx=5)
+        
+    def hide_load_progress(self):
+        """Hide the load progress"""
+        self.load_progress.pack_forget()
+        self.load_cancel_button.pack_forget()
+        
+    @profiled("display_original_image")
     def display_original_image(self):
         """Display the original image in the original tab"""
+        self.original_preview.show()
+        
+    def get_grid_config(self):
+        """Build the engine grid configuration from the UI variables"""
+        return engine.GridConfig(self.tile_width.get(), self.tile_height.get(),
+                                 self.margin_x.get(), self.margin_y.get(),
+                                 self.offset_x.get(), self.offset_y.get()).validate()
+            
+    def auto_detect_grid(self):
+        """Infer tile size, margins and offset from the loaded sheet"""
         if not self.original_image:
+            messagebox.showwarning("Warning", "Please load a tilesheet first")
             return
             
-        self.original_canvas.delete("all")
-        
-        # Calculate display size to fit in canvas
-        canvas_width = self.original_canvas.winfo_width()
-        canvas_height = self.original_canvas.winfo_height()
-        
-        if canvas_width <= 1 or canvas_height <= 1:
-            # Canvas not ready, schedule for later
-            self.root.after(100, self.display_original_image)
+        try:
+            config = engine.detect_grid(engine.image_to_array(self.original_image))
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to detect grid: {str(e)}")
             return
             
-        img_width, img_height = self.original_image.size
-        
-        # Calculate scale to fit image in canvas
-        scale_x = canvas_width / img_width
-        scale_y = canvas_height / img_height
-        scale = min(scale_x, scale_y, 1.0)  # Don't scale up
-        
-        display_width = int(img_width * scale)
-        display_height = int(img_height * scale)
-        
-        # Resize image for display
-        display_image = self.original_image.resize((display_width, display_height), Image.Resampling.LANCZOS)
-        photo = ImageTk.PhotoImage(display_image)
-        
-        # Center the image
-        x = (canvas_width - display_width) // 2
-        y = (canvas_height - display_height) // 2
-        
-        self.original_canvas.create_image(x, y, anchor=tk.NW, image=photo)
-        
-        # Store reference
-        self.original_canvas.image_ref = photo
-        
+        self.tile_width.set(config.tile_width)
+        self.tile_height.set(config.tile_height)
+        self.margin_x.set(config.margin_x)
+        self.margin_y.set(config.margin_y)
+        self.offset_x.set(config.offset_x)
+        self.offset_y.set(config.offset_y)
+        self.status_var.set(f"Detected {config.tile_width}x{config.tile_height} tiles, "
+                            f"margin {config.margin_x}x{config.margin_y}, offset {config.offset_x}x{config.offset_y}")
+            
+    @profiled("process_tilesheet")
     def process_tilesheet(self):
         """Process the tilesheet to remove margins"""
         if not self.original_image:
@@ -180,42 +476,16 @@ class TilesheetMarginRemover:
             return
             
         try:
-            tile_w = self.tile_width.get()
-            tile_h = self.tile_height.get()
-            margin_x = self.margin_x.get()
-            margin_y = self.margin_y.get()
-            
+            config = self.get_grid_config()
             img_width, img_height = self.original_image.size
             
             # Calculate how many tiles fit
-            self.tiles_per_row = (img_width + margin_x) // (tile_w + margin_x)
-            self.tiles_per_col = (img_height + margin_y) // (tile_h + margin_y)
-            
-            # Calculate new image dimensions (no margins)
-            new_width = self.tiles_per_row * tile_w
-            new_height = self.tiles_per_col * tile_h
+            self.tiles_per_row, self.tiles_per_col = engine.grid_dimensions(img_width, img_height, config)
             
-            # Create new image
-            self.processed_image = Image.new('RGBA', (new_width, new_height), (0, 0, 0, 0))
-            
-            # Extract tiles and place them without margins
-            for row in range(self.tiles_per_col):
-                for col in range(self.tiles_per_row):
-                    # Source position (with margins)
-                    src_x = col * (tile_w + margin_x)
-                    src_y = row * (tile_h + margin_y)
-                    
-                    # Check if tile is within original image bounds
-                    if src_x + tile_w <= img_width and src_y + tile_h <= img_height:
-                        # Extract tile from original
-                        tile = self.original_image.crop((src_x, src_y, src_x + tile_w, src_y + tile_h))
-                        
-                        # Destination position (no margins)
-                        dst_x = col * tile_w
-                        dst_y = row * tile_h
-                        
-                        # Paste tile into new image
-                        self.processed_image.paste(tile, (dst_x, dst_y))
+            with self.profiler.phase("remove_margins"):
+                self.processed_image = engine.remove_margins(self.original_image, config)
+            self.processed_preview.set_image(self.processed_image)
+            new_width, new_height = self.processed_image.size
             
             self.display_processed_image()
             
@@ -228,44 +498,10 @@ class TilesheetMarginRemover:
         except Exception as e:
             messagebox.showerror("Error", f"Failed to process tilesheet: {str(e)}")
             
+    @profiled("display_processed_image")
     def display_processed_image(self):
         """Display the processed image in the processed tab"""
-        if not self.processed_image:
-            return
-            
-        self.processed_canvas.delete("all")
-        
-        # Calculate display size to fit in canvas
-        canvas_width = self.processed_canvas.winfo_width()
-        canvas_height = self.processed_canvas.winfo_height()
-        
-        if canvas_width <= 1 or canvas_height <= 1:
-            # Canvas not ready, schedule for later
-            self.root.after(100, self.display_processed_image)
-            return
-            
-        img_width, img_height = self.processed_image.size
-        
-        # Calculate scale to fit image in canvas
-        scale_x = canvas_width / img_width
-        scale_y = canvas_height / img_height
-        scale = min(scale_x, scale_y, 1.0)  # Don't scale up
-        
-        display_width = int(img_width * scale)
-        display_height = int(img_height * scale)
-        
-        # Resize image for display
-        display_image = self.processed_image.resize((display_width, display_height), Image.Resampling.NEAREST)
-        photo = ImageTk.PhotoImage(display_image)
-        
-        # Center the image
-        x = (canvas_width - display_width) // 2
-        y = (canvas_height - display_height) // 2
-        
-        self.processed_canvas.create_image(x, y, anchor=tk.NW, image=photo)
-        
-        # Store reference
-        self.processed_canvas.image_ref = photo
+        self.processed_preview.show()
         
     def save_processed(self):
         """Save the processed tilesheet"""
@@ -285,24 +521,84 @@ class TilesheetMarginRemover:
         
         if file_path:
             try:
-                self.processed_image.save(file_path)
-                messagebox.showinfo("Success", f"Processed tilesheet saved to {file_path}")
+                # PNGs are written in the smallest form that keeps every pixel
+                if self.optimize_png.get() and file_path.lower().endswith(".png"):
+                    report = export.save_optimized(self.processed_image, file_path)
+                    self.status_var.set(f"Saved {os.path.basename(file_path)} as {report.summary()}")
+                    messagebox.showinfo("Success", f"Processed tilesheet saved to {file_path}\n\n{report.summary()}")
+                else:
+                    self.processed_image.save(file_path)
+                    messagebox.showinfo("Success", f"Processed tilesheet saved to {file_path}")
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to save image: {str(e)}")
                 
+    def stream_process_file(self):
+        """Remove margins from a PNG on disk band by band, without loading it whole"""
+        if self.stream_worker.busy:
+            messagebox.showwarning("Warning", "A streaming job is already running")
+            return
+            
+        try:
+            config = self.get_grid_config()
+        except Exception as e:
+            messagebox.showerror("Error", f"Invalid configuration: {str(e)}")
+            return
+            
+        src_path = filedialog.askopenfilename(
+            title="Select Large Tilesheet",
+            filetypes=[("PNG files", "*.png"), ("All files", "*.*")]
+        )
+        if not src_path:
+            return
+            
+        if not stream.can_stream(src_path):
+            messagebox.showerror("Error", "Failed to stream tilesheet: only non-interlaced PNGs up to 8 bits per channel can be streamed")
+            return
+            
+        dst_path = filedialog.asksaveasfilename(
+            title="Save Processed Tilesheet",
+            defaultextension=".png",
+            filetypes=[("PNG files", "*.png")]
+        )
+        if not dst_path:
+            return
+            
+        self.status_var.set(f"Streaming {os.path.basename(src_path)}...")
+        self.stream_worker.submit(
+            lambda cancelled: stream.stream_remove_margins(src_path, dst_path, config, cancelled=cancelled),
+            on_done=lambda size: self.on_stream_done(dst_path, size),
+            on_error=self.on_stream_error)
+            
+    def on_stream_done(self, dst_path, size):
+        """Report a finished streaming job (main thread)"""
+        if size is None:
+            self.status_var.set("Streaming cancelled")
+            return
+        self.status_var.set(f"Streamed: {size[0]}x{size[1]} saved to {os.path.basename(dst_path)}")
+        messagebox.showinfo("Success", f"Processed tilesheet saved to {dst_path}")
+        
+    def on_stream_error(self, error):
+        """Report a failed streaming job (main thread)"""
+        self.status_var.set("Ready")
+        messagebox.showerror("Error", f"Failed to stream tilesheet: {str(error)}")
+                
     def clear_all(self):
         """Clear all data and reset"""
         self.original_image = None
         self.processed_image = None
-        self.original_canvas.delete("all")
-        self.processed_canvas.delete("all")
+        self.original_preview.clear()
+        self.processed_preview.clear()
         self.status_var.set("Ready")
 
 
 def main():
     """Main function"""
+    parser = argparse.ArgumentParser(description="Remove the margins between tiles of a tilesheet.")
+    parser.add_argument("--profile-log", help="append a JSON line with phase timings for every profiled operation")
+    args = parser.parse_args()
+    
     root = tk.Tk()
-    app = TilesheetMarginRemover(root)
+    app = TilesheetMarginRemover(root, profile_log=args.profile_log)
     root.mainloop()
 
 
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Tilesheet Profiler
+Lightweight phase timing and resource counters for the tilesheet tools.
+Features:
+- Time named operations and the phases inside them
+- Count live PhotoImage objects and any other registered resources
+- Sample the resident memory of the process
+- Report a one-line summary for the status bar
+- Append every report to a JSON-lines log for offline profiling
+
+Usage:
+    python tilesheet_splitter.py --profile-log splitter.jsonl
+"""
+
+from contextlib import contextmanager
+import functools
+import json
+import os
+import sys
+import time
+import weakref
+
+
+def current_rss_bytes():
+    """Return the resident memory of this process in bytes, or None where it cannot be read"""
+    try:
+        if sys.platform.startswith("linux"):
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+        if sys.platform == "win32":
+            import ctypes
+            from ctypes import wintypes
+
+            class ProcessMemoryCounters(ctypes.Structure):
+                _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                            ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                            ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                            ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                            ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+
+            counters = ProcessMemoryCounters()
+            counters.cb = ctypes.sizeof(counters)
+            process = ctypes.windll.kernel32.GetCurrentProcess()
+            if ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+                return counters.WorkingSetSize
+            return None
+
+        # Elsewhere only the peak is available
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    except Exception:
+        return None
+
+
+class Profiler:
+    """Collects per-phase durations of UI operations and reports them with resource counts.
+
+    Operations started while another is running are folded into it: their phases
+    count towards the outer operation, so a load that triggers a split reports one
+    breakdown instead of two.
+    """
+
+    def __init__(self, log_path=None, on_report=None):
+        self.log_path = log_path
+        self.on_report = on_report
+        self.counters = {}  # Counter name -> callable returning the current count
+        self.photos = weakref.WeakSet()  # Every tracked PhotoImage still alive
+        self.last_report = None
+        self._stack = []
+
+    def track_photo(self, photo):
+        """Count a PhotoImage as live until it is garbage collected; returns the photo"""
+        self.photos.add(photo)
+        return photo
+
+    def add_counter(self, name, func):
+        """Register a callable sampled into every report"""
+        self.counters[name] = func
+
+    @property
+    def active(self):
+        """True while an operation is being timed"""
+        return bool(self._stack)
+
+    def add(self, phase, seconds):
+        """Add time to a phase of the running operation; ignored outside operations"""
+        if self._stack:
+            phases = self._stack[0]['phases']
+            phases[phase] = phases.get(phase, 0.0) + seconds
+
+    @contextmanager
+    def phase(self, name):
+        """Time a block as a phase of the running operation"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    @contextmanager
+    def operation(self, name, start=None):
+        """Time a block as an operation and report it when it ends.
+
+        start is a time.perf_counter() value for operations that began earlier,
+        such as work handed to a background thread.
+        """
+        if self._stack:
+            yield
+            return
+
+        record = {'operation': name, 'phases': {}, 'start': time.perf_counter() if start is None else start}
+        self._stack.append(record)
+        try:
+            yield
+        finally:
+            self._stack.pop()
+            self.report(record, time.perf_counter() - record['start'])
+
+    def report(self, record, total):
+        """Build, publish and log the report of a finished operation"""
+        report = {
+            'time': time.time(),
+            'operation': record['operation'],
+            'total_ms': round(total * 1000, 3),
+            'phases_ms': {name: round(seconds * 1000, 3) for name, seconds in record['phases'].items()},
+            'photos': len(self.photos),
+            'rss_bytes': current_rss_bytes(),
+        }
+        for name, func in self.counters.items():
+            try:
+                report[name] = func()
+            except Exception:
+                report[name] = None
+        self.last_report = report
+
+        if self.on_report is not None:
+            self.on_report(report)
+
+        if self.log_path:
+            try:
+                with open(self.log_path, "a") as f:
+                    f.write(json.dumps(report) + "\n")
+            except OSError as e:
+                print(f"Error writing profile log: {e}")
+        return report
+
+
+def profiled(name):
+    """Decorate a method of an object with a profiler attribute to time it as an operation"""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.profiler.operation(name):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def format_report(report):
+    """Return a one-line status bar summary of a report"""
+    phases = ", ".join(f"{name} {ms:.1f}" for name, ms in
+                       sorted(report['phases_ms'].items(), key=lambda item: -item[1]))
+    text = f"{report['operation']} {report['total_ms']:.1f} ms"
+    if phases:
+        text += f" ({phases})"
+    text += f" | photos {report['photos']}"
+    if report.get('canvas_items') is not None:
+        text += f", items {report['canvas_items']}"
+    if report['rss_bytes']:
+        text += f" | {report['rss_bytes'] / 2**20:.0f} MB"
+    return text
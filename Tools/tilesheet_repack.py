@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Tilesheet Glyph Repacker
+Pack only the glyphs the game references into a compact font atlas.
+Features:
+- Collect glyph indices from entity data ("glyph" values and "...Glyphs" arrays such as bitmaskGlyphs)
+- Pack the referenced tiles into a small sheet in one vectorized gather
+- Write a matching SadConsole .font descriptor
+- Write an old -> new glyph remap table and optionally a remapped copy of the entity data
+
+Examples:
+    python tilesheet_repack.py ../assets/fonts/kenney_combined.font ../assets/Data/Entities.json -o build/font
+    python tilesheet_repack.py ../assets/fonts/kenney_combined.font ../assets/Data/Entities.json -o build/font --entities-out build/Entities.json
+"""
+
+from PIL import Image
+import argparse
+import json
+import math
+import os
+import sys
+
+import tilesheet_engine as engine
+
+
+# Glyphs the game uses without naming them in entity data: 0 is the default cell glyph,
+# 2306 is the MapObjectFactory.GetGlyph fallback
+DEFAULT_EXTRA_GLYPHS = (0, 2306)
+
+
+def load_json(path):
+    """Load a JSON file, tolerating the UTF-8 byte order mark Visual Studio writes"""
+    with open(path, encoding="utf-8-sig") as f:
+        return json.load(f)
+
+
+def is_glyph_key(key):
+    """Return True for keys holding glyph indices: "glyph" and arrays like "bitmaskGlyphs" """
+    return key == "glyph" or key.endswith("Glyphs")
+
+
+def collect_glyphs(data, glyphs=None):
+    """Return the set of glyph indices referenced anywhere in a JSON document"""
+    glyphs = set() if glyphs is None else glyphs
+    if isinstance(data, dict):
+        for key, value in data.items():
+            if is_glyph_key(key) and isinstance(value, int):
+                glyphs.add(value)
+            elif is_glyph_key(key) and isinstance(value, list):
+                glyphs.update(v for v in value if isinstance(v, int))
+            else:
+                collect_glyphs(value, glyphs)
+    elif isinstance(data, list):
+        for value in data:
+            collect_glyphs(value, glyphs)
+    return glyphs
+
+
+def remap_glyphs(data, remap):
+    """Return a copy of a JSON document with every glyph index replaced through remap"""
+    if isinstance(data, dict):
+        result = {}
+        for key, value in data.items():
+            if is_glyph_key(key) and isinstance(value, int):
+                result[key] = remap[value]
+            elif is_glyph_key(key) and isinstance(value, list):
+                result[key] = [remap[v] if isinstance(v, int) else v for v in value]
+            else:
+                result[key] = remap_glyphs(value, remap)
+        return result
+    if isinstance(data, list):
+        return [remap_glyphs(value, remap) for value in data]
+    return data
+
+
+def font_grid_config(font):
+    """Build the grid configuration of a SadConsole .font descriptor"""
+    padding = font.get("GlyphPadding", 0)
+    return engine.GridConfig(font["GlyphWidth"], font["GlyphHeight"], padding, padding, padding, padding).validate()
+
+
+def repack(font_path, glyphs, columns=None):
+    """Pack the given glyphs of a font into a new sheet.
+
+    Returns (image, font descriptor, remap) where remap maps old glyph indices to new ones.
+    Glyphs keep their relative order, so the packed atlas reads like the original.
+    """
+    font = load_json(font_path)
+    image_path = os.path.join(os.path.dirname(font_path), font["FilePath"])
+    with Image.open(image_path) as image:
+        atlas = engine.split_tilesheet(image, font_grid_config(font))
+
+    if font.get("Columns", atlas.tiles_per_row) != atlas.tiles_per_row:
+        raise ValueError(f"Font declares {font['Columns']} columns but the sheet has {atlas.tiles_per_row}")
+
+    # The solid glyph is used by SadConsole itself, so it always comes along
+    used = set(glyphs)
+    if "SolidGlyphIndex" in font:
+        used.add(font["SolidGlyphIndex"])
+    out_of_range = sorted(g for g in used if g < 0 or g >= len(atlas))
+    if out_of_range:
+        raise ValueError(f"Glyphs outside the {len(atlas)}-tile sheet: {', '.join(map(str, out_of_range))}")
+
+    order = sorted(used)
+    remap = {old: new for new, old in enumerate(order)}
+    columns = columns or math.ceil(math.sqrt(len(order)))
+    packed = engine.pack_tiles(atlas, order, columns)
+
+    packed_font = dict(font)
+    packed_font["GlyphPadding"] = 0
+    packed_font["Columns"] = packed.width // atlas.config.tile_width
+    if "SolidGlyphIndex" in font:
+        packed_font["SolidGlyphIndex"] = remap[font["SolidGlyphIndex"]]
+    return packed, packed_font, remap
+
+
+def build_parser():
+    """Create the command-line argument parser"""
+    parser = argparse.ArgumentParser(description="Pack the glyphs referenced by game data into a compact font.")
+    parser.add_argument("font", help="SadConsole .font descriptor of the full sheet")
+    parser.add_argument("data", nargs="+", help="JSON data files referencing glyph indices (e.g. Entities.json)")
+    parser.add_argument("-o", "--output", required=True, help="output directory")
+    parser.add_argument("--name", help="name of the packed font (default: <font name>_packed)")
+    parser.add_argument("--columns", type=int, help="columns of the packed sheet (default: square-ish)")
+    parser.add_argument("--extra", type=int, nargs="*", default=list(DEFAULT_EXTRA_GLYPHS),
+                        help="glyphs to keep that code uses without naming them in data "
+                             f"(default: {' '.join(map(str, DEFAULT_EXTRA_GLYPHS))})")
+    parser.add_argument("--entities-out",
+                        help="write a copy of the first data file with glyph indices remapped to the packed font")
+    return parser
+
+
+def main(argv=None):
+    """Main function"""
+    args = build_parser().parse_args(argv)
+
+    try:
+        documents = [load_json(path) for path in args.data]
+        glyphs = set(args.extra)
+        for document in documents:
+            collect_glyphs(document, glyphs)
+
+        packed, packed_font, remap = repack(args.font, glyphs, args.columns)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+
+    name = args.name or f"{packed_font.get('Name', 'font')}_packed"
+    packed_font["Name"] = name
+    packed_font["FilePath"] = f"{name}.png"
+
+    os.makedirs(args.output, exist_ok=True)
+    packed.save(os.path.join(args.output, f"{name}.png"), optimize=True)
+    with open(os.path.join(args.output, f"{name}.font"), "w") as f:
+        json.dump(packed_font, f, indent=4)
+    with open(os.path.join(args.output, f"{name}_remap.json"), "w") as f:
+        json.dump({"source": os.path.basename(args.font), "glyph_count": len(remap),
+                   "remap": {str(old): new for old, new in remap.items()}}, f, indent=2)
+
+    if args.entities_out:
+        with open(args.entities_out, "w") as f:
+            json.dump(remap_glyphs(documents[0], remap), f, indent=2)
+
+    print(f"Packed {len(remap)} glyphs into {packed.width}x{packed.height} ({packed_font['Columns']} columns)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
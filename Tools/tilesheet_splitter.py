@@ -6,19 +6,41 @@ Features:
 - Load tilesheet images
 - Configure tile dimensions and margins
 - View individual tiles in a pannable grid
+- Flag blank and duplicate tiles, hide them from the grid and export a dedupe map
+- Right-click a tile to highlight the most visually similar tiles
+- Cache decoded sheets and split results so reopening a sheet or a config is instant
+- Keep the display strips of 1-bit and low-colour sheets bit-packed, expanding tiles only when drawn
+- Preview the 16 selected tiles as a BitMaskTile set on a test map
+- Suggest complete 16-tile BitMaskTile sets from the edge connectivity of every tile
+- Keep any number of named selection groups per sheet, saved next to it as JSON
+- Export every selection group as a C# int[] array
 - Save individual tiles
 - Interactive configuration menu
 """
 
 import tkinter as tk
-from tkinter import ttk, filedialog, messagebox
+from tkinter import ttk, filedialog, messagebox, simpledialog
 from PIL import Image, ImageTk
+import argparse
 import os
 import math
+import json
+import time
+
+import numpy as np
+
+import tilesheet_engine as engine
+import tilesheet_stream as stream
+from tilesheet_autotile import AutotilePreview
+from tilesheet_cache import SplitCache, file_digest
+from tilesheet_groups import SelectionGroups, csharp_identifier, sidecar_path
+from tilesheet_profiler import Profiler, format_report, profiled
+from tilesheet_tasks import BackgroundWorker
+from tilesheet_workspace import DEFAULT_BUDGET_BYTES, Sheet, Workspace, file_stamp
 
 
 class TilesheetSplitter:
-    def __init__(self, root):
+    def __init__(self, root, profile_log=None, memory_budget=DEFAULT_BUDGET_BYTES):
         self.root = root
         self.root.title("Tilesheet Splitter & Viewer")
         self.root.geometry("1200x1000")
@@ -28,22 +50,90 @@ class TilesheetSplitter:
         self.tile_height = tk.IntVar(value=16)
         self.margin_x = tk.IntVar(value=0)
         self.margin_y = tk.IntVar(value=0)
+        self.offset_x = tk.IntVar(value=0)
+        self.offset_y = tk.IntVar(value=0)
         self.background_color = tk.StringVar(value="black")
+        self.similar_count = tk.IntVar(value=12)
         
         # Image data
-        self.original_image = None
-        self.tiles = []
+        self.sheet_pixels = None  # RGBA array of the whole sheet, shared by every tile view
+        self.sheet_palette = None  # engine.PalettePixels of sheet_pixels for 1-bit and low-colour sheets
+        self.sheet_digest = None  # Content hash of the loaded file, keys the split cache
+        self.atlas = None  # engine.TileAtlas over sheet_pixels for the current configuration
         self.tiles_per_row = 0
         self.tiles_per_col = 0
-        
-        # Selected tiles data
-        self.selected_tiles = []  # List of selected tile indices
-        self.selected_tile_objects = []  # List of selected tile data objects
+        self.content_index = None  # engine.ContentIndex with blank and duplicate tiles of the atlas
+        self.feature_index = None  # engine.FeatureIndex for visual similarity queries
+        self.similar_query = None  # Tile the similarity highlight was computed for
+        self.similar_tiles = []  # Nearest tiles to similar_query, closest first
+        self.bitmask_sets = None  # (spread, tiles) BitMaskTile sets suggested for the atlas, computed on demand
+        self.bitmask_set_cursor = 0  # Next suggested set to select
+        
+        # Grid filtering: display_order lists the tile shown at each grid slot, None shows every tile
+        self.hide_blank = tk.BooleanVar(value=False)
+        self.hide_duplicates = tk.BooleanVar(value=False)
+        self.display_order = None
+        self.display_slots = None  # Tile index -> grid slot, -1 for hidden tiles
+        self.grid_rows = 0
+        
+        # Selected tiles data: named groups of tiles, the active group is the selection
+        self.groups = SelectionGroups()  # Groups of the active sheet
+        self.group_name = tk.StringVar(value=self.groups.active.name)
+        self.show_groups = tk.BooleanVar(value=True)  # Outline the tiles of the inactive groups too
+        self.group_colors = ("orange", "lime", "deep sky blue", "magenta", "gold", "spring green", "violet", "white")
+        self.selected_thumbnails = {}  # Tile index -> photo shown in the selected panel
+        self.swap_source = None  # Position in the selection picked to swap with another
+        self.autotile_preview = None  # AutotilePreview window while it is open
         
         # Display variables
         self.tile_display_size = 64  # Size to display tiles in the grid
+        self.tile_spacing = 2  # Space between tiles in display
         self.zoom_factor = 1.0
         
+        # Viewport virtualization: only tiles near the visible region are rendered
+        self.render_overscan = 2  # Extra rows/columns rendered around the viewport
+        self.rendered_tiles = {}  # Tile index -> (canvas item id, photo)
+        self.free_tile_items = []  # Hidden canvas items ready to be reused
+        self.photo_pool = []  # Photos of the current display size ready to be reused
+        self.photo_pool_size = 0
+        self.viewport_update_pending = None
+        self.zoom_cache = engine.ZoomCache()  # Scaled tile rows per visited zoom level
+        
+        # Decoded sheets and split results, kept on disk and per config in memory
+        self.split_cache = SplitCache()
+        
+        # Open sheets, one per tab, sharing one memory budget
+        self.workspace = Workspace(self.split_cache, memory_budget)
+        
+        # Re-splits triggered by config changes run debounced on a worker thread
+        self.split_worker = BackgroundWorker(self.root, delay_ms=150)
+        
+        # Sheets are decoded and first split on a worker thread, with a preview while decoding
+        self.load_worker = BackgroundWorker(self.root, delay_ms=0, poll_ms=50)
+        self.load_preview = None  # Photo of the partially decoded sheet
+        self.last_preview_time = 0.0
+        self.load_started = None
+        
+        # Watch mode: edits saved to the active sheet's file are diffed and re-rendered tile by tile
+        self.watch_file = tk.BooleanVar(value=False)
+        self.watch_worker = BackgroundWorker(self.root, delay_ms=0, poll_ms=20)
+        self.watch_poll_ms = 500
+        self.watch_pending = None
+        self.changed_highlight_pending = None
+        
+        # Phase timings and resource counts of the main operations, shown in the status bar
+        self.profiler = Profiler(log_path=profile_log)
+        self.profiler.add_counter('canvas_items', lambda: len(self.canvas.find_all()) + len(self.selected_canvas.find_all()))
+        self.profiler.add_counter('rendered_tiles', lambda: len(self.rendered_tiles))
+        self.profiler.add_counter('pooled_photos', lambda: len(self.photo_pool))
+        self.profiler.add_counter('workspace_bytes', self.workspace.memory_bytes)
+        self.profiler.add_counter('zoom_cache_bytes', lambda: self.zoom_cache.total_bytes)
+        self.profiler.add_counter('zoom_cache_rgba_bytes', lambda: self.zoom_cache.rgba_bytes)
+        
+        # Overlay layer state
+        self.hover_item = None  # Canvas rectangle following the hovered tile
+        self.hovered_tile = None
+        
         self.setup_ui()
         
         # Bind cleanup on window close
@@ -52,19 +142,28 @@ class TilesheetSplitter:
     def on_closing(self):
         """Clean up resources when closing the application"""
         try:
+            # Groups are kept next to their sheets rather than lost
+            self.autosave_groups()
+            
             # Clear all image references
-            if hasattr(self.canvas, 'image_refs'):
-                self.canvas.image_refs.clear()
-            if hasattr(self.selected_canvas, 'image_refs'):
-                self.selected_canvas.image_refs.clear()
+            self.rendered_tiles.clear()
+            self.photo_pool.clear()
+            self.selected_thumbnails.clear()
             if hasattr(self.ruleset_canvas, 'image_ref'):
                 self.ruleset_canvas.image_ref = None
             
             # Clear all data
-            self.tiles.clear()
-            self.selected_tiles.clear()
-            self.selected_tile_objects.clear()
-            self.original_image = None
+            self.atlas = None
+            self.content_index = None
+            self.feature_index = None
+            self.sheet_pixels = None
+            self.sheet_palette = None
+            self.zoom_cache.clear()
+            self.workspace.clear()
+            self.split_cache.clear_memory()
+            self.split_worker.shutdown()
+            self.load_worker.shutdown()
+            self.watch_worker.shutdown()
             
         except Exception as e:
             print(f"Error during cleanup: {e}")
@@ -109,7 +208,7 @@ class TilesheetSplitter:
                 
                 # Resize image for display
                 display_image = ruleset_image.resize((display_width, display_height), Image.Resampling.LANCZOS)
-                photo = ImageTk.PhotoImage(display_image)
+                photo = self.profiler.track_photo(ImageTk.PhotoImage(display_image))
                 
                 # Center the image
                 x = (canvas_width - display_width) // 2
@@ -145,10 +244,31 @@ class TilesheetSplitter:
         selected_frame = ttk.LabelFrame(control_frame, text="Selected Tiles", padding=10)
         selected_frame.pack(side=tk.LEFT, fill=tk.Y, padx=(0, 5))
         
+        # Selection groups: the active group is the selection shown below
+        group_frame = ttk.Frame(selected_frame)
+        group_frame.pack(fill=tk.X, pady=(0, 5))
+        
+        self.group_combo = ttk.Combobox(group_frame, textvariable=self.group_name, state="readonly", width=16)
+        self.group_combo.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        self.group_combo.bind("<<ComboboxSelected>>", self.on_group_selected)
+        ttk.Checkbutton(group_frame, text="All", variable=self.show_groups,
+                        command=self.draw_group_overlays).pack(side=tk.LEFT, padx=(5, 0))
+        
+        group_buttons = ttk.Frame(selected_frame)
+        group_buttons.pack(fill=tk.X, pady=(0, 5))
+        
+        ttk.Button(group_buttons, text="New", width=6, command=self.new_group).pack(side=tk.LEFT)
+        ttk.Button(group_buttons, text="Rename", width=7, command=self.rename_group).pack(side=tk.LEFT, padx=2)
+        ttk.Button(group_buttons, text="Delete", width=6, command=self.delete_group).pack(side=tk.LEFT)
+        self.update_group_choices()
+        
         # Create canvas for selected tiles display
         self.selected_canvas = tk.Canvas(selected_frame, width=200, height=150, bg="lightgray")
         self.selected_canvas.pack()
         
+        # Click two selected tiles to swap their positions (the order is the bitmask order)
+        self.selected_canvas.bind("<Button-1>", self.on_selected_canvas_click)
+        
         # Selected tiles info label
         self.selected_info_label = ttk.Label(selected_frame, text="No tiles selected", 
                                            font=("Arial", 8), foreground="gray")
@@ -158,6 +278,18 @@ class TilesheetSplitter:
         ttk.Button(selected_frame, text="Clear Selection", 
                   command=self.clear_selection).pack(pady=(5, 0))
         
+        # Select similar button
+        ttk.Button(selected_frame, text="Select Similar", 
+                  command=self.select_similar).pack(pady=(5, 0))
+        
+        # Suggested set button
+        ttk.Button(selected_frame, text="Suggest Set", 
+                  command=self.suggest_bitmask_set).pack(pady=(5, 0))
+        
+        # Autotile preview button
+        ttk.Button(selected_frame, text="Autotile Preview", 
+                  command=self.open_autotile_preview).pack(pady=(5, 0))
+        
         # Tile indexes list display
         ttk.Label(selected_frame, text="Tile Indexes:", 
                  font=("Arial", 8, "bold")).pack(anchor=tk.W, pady=(10, 2))
@@ -171,6 +303,13 @@ class TilesheetSplitter:
         ttk.Button(selected_frame, text="Copy Indexes", 
                   command=self.copy_tile_indexes).pack()
         
+        # Group files
+        group_file_frame = ttk.Frame(selected_frame)
+        group_file_frame.pack(pady=(5, 0))
+        
+        ttk.Button(group_file_frame, text="Save Groups", command=self.save_groups).pack(side=tk.LEFT, padx=(0, 2))
+        ttk.Button(group_file_frame, text="Export C#", command=self.export_groups_csharp).pack(side=tk.LEFT)
+        
         # Right side - Ruleset Display
         ruleset_frame = ttk.LabelFrame(control_frame, text="Tile Ruleset Reference", padding=10)
         ruleset_frame.pack(side=tk.RIGHT, fill=tk.Y)
@@ -191,18 +330,33 @@ class TilesheetSplitter:
         self.info_row_count = tk.StringVar(value="Row Count: --")
         self.info_col_count = tk.StringVar(value="Column Count: --")
         self.info_tile_count = tk.StringVar(value="Tile Count: --")
+        self.info_content_count = tk.StringVar(value="Blank: --, Duplicates: --")
+        self.info_storage = tk.StringVar(value="Storage: --")
         
         ttk.Label(info_frame, textvariable=self.info_image_size, font=("Arial", 9)).pack(anchor=tk.W, pady=2)
         ttk.Label(info_frame, textvariable=self.info_row_count, font=("Arial", 9)).pack(anchor=tk.W, pady=2)
         ttk.Label(info_frame, textvariable=self.info_col_count, font=("Arial", 9)).pack(anchor=tk.W, pady=2)
         ttk.Label(info_frame, textvariable=self.info_tile_count, font=("Arial", 9)).pack(anchor=tk.W, pady=2)
+        ttk.Label(info_frame, textvariable=self.info_content_count, font=("Arial", 9)).pack(anchor=tk.W, pady=2)
+        ttk.Label(info_frame, textvariable=self.info_storage, font=("Arial", 9)).pack(anchor=tk.W, pady=2)
+        
+        # Blank and duplicate filtering
+        ttk.Checkbutton(info_frame, text="Hide blank tiles", variable=self.hide_blank,
+                        command=self.on_filter_change).pack(anchor=tk.W, pady=(5, 0))
+        ttk.Checkbutton(info_frame, text="Hide duplicates", variable=self.hide_duplicates,
+                        command=self.on_filter_change).pack(anchor=tk.W)
+        ttk.Button(info_frame, text="Export Dedupe Map", command=self.export_dedupe_map).pack(anchor=tk.W, pady=(5, 0))
         
         # File operations
         file_frame = ttk.Frame(config_frame)
         file_frame.pack(fill=tk.X, pady=(0, 10))
         
         ttk.Button(file_frame, text="Load Tilesheet", command=self.load_tilesheet).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Button(file_frame, text="Auto-detect", command=self.auto_detect_grid).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Button(file_frame, text="Close Sheet", command=self.close_sheet).pack(side=tk.LEFT, padx=(0, 5))
         ttk.Button(file_frame, text="Clear", command=self.clear_tiles).pack(side=tk.LEFT)
+        ttk.Checkbutton(file_frame, text="Watch file", variable=self.watch_file,
+                        command=self.on_watch_change).pack(side=tk.LEFT, padx=(10, 0))
         
         # Configuration inputs
         inputs_frame = ttk.Frame(config_frame)
@@ -230,19 +384,37 @@ class TilesheetSplitter:
         margin_y_spin.grid(row=1, column=3, padx=(0, 20), pady=(5, 0))
         margin_y_spin.bind('<Return>', lambda e: self.on_config_change())
         
+        # Outer offset
+        ttk.Label(inputs_frame, text="Offset X:").grid(row=2, column=0, sticky=tk.W, padx=(0, 5), pady=(5, 0))
+        offset_x_spin = ttk.Spinbox(inputs_frame, from_=0, to=512, width=10, textvariable=self.offset_x, command=self.on_config_change)
+        offset_x_spin.grid(row=2, column=1, padx=(0, 20), pady=(5, 0))
+        offset_x_spin.bind('<Return>', lambda e: self.on_config_change())
+        
+        ttk.Label(inputs_frame, text="Offset Y:").grid(row=2, column=2, sticky=tk.W, padx=(0, 5), pady=(5, 0))
+        offset_y_spin = ttk.Spinbox(inputs_frame, from_=0, to=512, width=10, textvariable=self.offset_y, command=self.on_config_change)
+        offset_y_spin.grid(row=2, column=3, padx=(0, 20), pady=(5, 0))
+        offset_y_spin.bind('<Return>', lambda e: self.on_config_change())
+        
         # Background color
-        ttk.Label(inputs_frame, text="Background:").grid(row=2, column=0, sticky=tk.W, padx=(0, 5), pady=(5, 0))
+        ttk.Label(inputs_frame, text="Background:").grid(row=3, column=0, sticky=tk.W, padx=(0, 5), pady=(5, 0))
         bg_combo = ttk.Combobox(inputs_frame, textvariable=self.background_color, width=8, state="readonly")
         bg_combo['values'] = ('white', 'black', 'gray', 'lightgray', 'darkgray', 'red', 'green', 'blue', 'yellow', 'cyan', 'magenta')
-        bg_combo.grid(row=2, column=1, padx=(0, 20), pady=(5, 0))
+        bg_combo.grid(row=3, column=1, padx=(0, 20), pady=(5, 0))
         bg_combo.bind('<<ComboboxSelected>>', lambda e: self.on_config_change())
         
         # Action buttons
         action_frame = ttk.Frame(inputs_frame)
-        action_frame.grid(row=3, column=0, columnspan=4, pady=(10, 0))
+        action_frame.grid(row=4, column=0, columnspan=4, pady=(10, 0))
         
         ttk.Button(action_frame, text="Reset View", command=self.reset_view).pack(side=tk.LEFT, padx=(0, 5))
         
+        # Number of tiles highlighted by a similarity search
+        ttk.Label(action_frame, text="Similar:").pack(side=tk.LEFT, padx=(5, 5))
+        similar_spin = ttk.Spinbox(action_frame, from_=1, to=64, width=4, textvariable=self.similar_count,
+                                   command=self.refresh_similar)
+        similar_spin.pack(side=tk.LEFT, padx=(0, 5))
+        similar_spin.bind('<Return>', lambda e: self.refresh_similar())
+        
         # Zoom controls
         zoom_frame = ttk.Frame(action_frame)
         zoom_frame.pack(side=tk.RIGHT)
@@ -254,6 +426,11 @@ class TilesheetSplitter:
         
     def create_canvas_frame(self, parent):
         """Create the canvas frame for displaying tiles"""
+        # One tab per open sheet; the tabs only choose which sheet the canvas shows
+        self.sheet_tabs = ttk.Notebook(parent)
+        self.sheet_tabs.pack(fill=tk.X)
+        self.sheet_tabs.bind("<<NotebookTabChanged>>", self.on_sheet_tab_changed)
+        
         canvas_frame = ttk.Frame(parent)
         canvas_frame.pack(fill=tk.BOTH, expand=True)
         
@@ -263,7 +440,18 @@ class TilesheetSplitter:
         v_scrollbar = ttk.Scrollbar(canvas_frame, orient=tk.VERTICAL, command=self.canvas.yview)
         h_scrollbar = ttk.Scrollbar(canvas_frame, orient=tk.HORIZONTAL, command=self.canvas.xview)
         
-        self.canvas.configure(yscrollcommand=v_scrollbar.set, xscrollcommand=h_scrollbar.set)
+        # Every view change (scrollbars, wheel, keys, resize) goes through the scroll commands,
+        # so they are the single place to refresh the rendered region
+        def on_yscroll(first, last):
+            v_scrollbar.set(first, last)
+            self.schedule_viewport_update()
+            
+        def on_xscroll(first, last):
+            h_scrollbar.set(first, last)
+            self.schedule_viewport_update()
+            
+        self.canvas.configure(yscrollcommand=on_yscroll, xscrollcommand=on_xscroll)
+        self.canvas.bind("<Configure>", lambda e: self.schedule_viewport_update())
         
         # Grid layout
         self.canvas.grid(row=0, column=0, sticky="nsew")
@@ -273,6 +461,13 @@ class TilesheetSplitter:
         canvas_frame.grid_rowconfigure(0, weight=1)
         canvas_frame.grid_columnconfigure(0, weight=1)
         
+        # Single set of canvas-level handlers; tiles are hit-tested with the grid math
+        self.canvas.bind("<Button-1>", self.on_canvas_click)
+        self.canvas.bind("<Motion>", self.on_canvas_motion)
+        self.canvas.bind("<Leave>", lambda e: self.on_tile_leave())
+        self.canvas.bind("<Button-3>", self.on_canvas_right_click)
+        self.canvas.bind("<Button-2>", self.on_canvas_right_click)
+        
         # Bind mouse events for scrolling
         self.canvas.bind("<MouseWheel>", self.on_mousewheel)
         self.canvas.bind("<Shift-MouseWheel>", self.on_mousewheel_horizontal)
@@ -290,212 +485,1130 @@ class TilesheetSplitter:
         
     def create_status_bar(self):
         """Create status bar"""
+        status_frame = ttk.Frame(self.root)
+        status_frame.pack(side=tk.BOTTOM, fill=tk.X)
+        
         self.status_var = tk.StringVar(value="Ready")
-        status_bar = ttk.Label(self.root, textvariable=self.status_var, relief=tk.SUNKEN, anchor=tk.W)
-        status_bar.pack(side=tk.BOTTOM, fill=tk.X)
+        status_bar = ttk.Label(status_frame, textvariable=self.status_var, relief=tk.SUNKEN, anchor=tk.W)
+        status_bar.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        
+        # Timing of the last profiled operation
+        self.perf_var = tk.StringVar(value="")
+        perf_bar = ttk.Label(status_frame, textvariable=self.perf_var, relief=tk.SUNKEN, anchor=tk.E)
+        perf_bar.pack(side=tk.RIGHT)
+        self.profiler.on_report = self.on_profile_report
+        
+        # Shown only while a sheet is loading
+        self.load_progress = ttk.Progressbar(status_frame, length=160, mode='determinate', maximum=1.0)
+        self.load_cancel_button = ttk.Button(status_frame, text="Cancel", command=self.cancel_load)
         
     def load_tilesheet(self):
         """Load a tilesheet image"""
         file_path = filedialog.askopenfilename(
             title="Select Tilesheet Image",
             filetypes=[
-                ("Image files", "*.png *.jpg *.jpeg *.bmp *.gif *.tiff"),
+                ("Image files", " ".join("*" + ext for ext in engine.IMAGE_EXTENSIONS)),
                 ("All files", "*.*")
             ]
         )
         
         if file_path:
-            try:
-                self.original_image = Image.open(file_path)
-                self.status_var.set(f"Loaded: {os.path.basename(file_path)} ({self.original_image.width}x{self.original_image.height})")
+            self.start_load(file_path)
+            
+    def start_load(self, file_path):
+        """Decode and split a sheet on the load worker"""
+        # An invalid configuration is reported by the split once the sheet is loaded
+        try:
+            config = self.get_grid_config()
+        except Exception:
+            config = None
+            
+        # Splits of the old sheet are stale from now on
+        self.split_worker.cancel()
+        display_size, _ = self.get_display_metrics()
+        preview_size = (max(self.canvas.winfo_width(), 1), max(self.canvas.winfo_height(), 1))
+        
+        self.status_var.set(f"Loading {os.path.basename(file_path)}...")
+        self.show_load_progress()
+        self.load_started = time.perf_counter()
+        self.load_worker.submit(self.read_sheet, file_path, config, self.get_warm_rows(), display_size, preview_size,
+                                on_done=self.apply_load, on_error=self.on_load_error,
+                                on_progress=self.on_load_progress)
+        
+    def read_sheet(self, cancelled, file_path, config, warm_rows, display_size, preview_size):
+        """Decode a sheet and split it for the current config (worker thread)"""
+        timings = {}
+        
+        def progress(fraction, image, rows):
+            # Previews are throttled; the progress bar follows every band
+            preview = None
+            now = time.perf_counter()
+            if fraction < 1.0 and now - self.last_preview_time >= 0.2:
+                self.last_preview_time = now
+                preview = stream.preview_image(image, rows, *preview_size)
+            cancelled.progress(fraction, preview)
+            
+        # Sheets opened before are memory-mapped from the cache instead of decoded
+        start = time.perf_counter()
+        loaded = self.split_cache.load_pixels(file_path, cancelled, progress)
+        if loaded is None:
+            return None
+        digest, pixels = loaded
+        timings['decode'] = time.perf_counter() - start
+        
+        # 1-bit and low-colour sheets are displayed from bit-packed palette indices
+        start = time.perf_counter()
+        palette = engine.PalettePixels.from_pixels(pixels)
+        timings['palette'] = time.perf_counter() - start
+        
+        split = None
+        if config is not None and not cancelled():
+            start = time.perf_counter()
+            split = self.build_split(cancelled, digest, pixels, palette, config, warm_rows, display_size)
+            timings['split'] = time.perf_counter() - start
+        return file_path, digest, pixels, palette, split, timings
+        
+    def apply_load(self, result):
+        """Show a sheet loaded by the worker (main thread)"""
+        self.hide_load_progress()
+        if result is None:
+            return
+            
+        file_path, digest, pixels, palette, split, timings = result
+        with self.profiler.operation("load_tilesheet", start=self.load_started):
+            # Phases timed on the worker count towards the load as well
+            for phase, seconds in timings.items():
+                self.profiler.add(phase, seconds)
+            
+            # Opening a sheet again reloads its tab; any other file gets a new one
+            self.save_sheet_state()
+            sheet = self.workspace.find(file_path)
+            if sheet is None:
+                sheet = self.workspace.add(Sheet(file_path, digest, pixels, palette))
+                sheet.groups = self.read_groups(file_path)
+                sheet.tab = ttk.Frame(self.sheet_tabs, height=0)
+                self.sheet_tabs.add(sheet.tab, text=sheet.name)
+            else:
+                sheet.reload(digest, pixels, palette)
+            self.workspace.activate(sheet)
+            self.sheet_tabs.select(sheet.tab)
+            
+            self.groups = sheet.groups
+            self.update_group_choices()
+            self.swap_source = None
+            self.sheet_digest, self.sheet_pixels, self.sheet_palette = digest, pixels, palette
+            img_height, img_width = pixels.shape[:2]
+            self.status_var.set(f"Loaded: {os.path.basename(file_path)} ({img_width}x{img_height})")
+            if split is None:
                 self.split_tilesheet()
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed to load image: {str(e)}")
+            else:
+                self.apply_split(split)
+                # The config may have been edited while the sheet was loading
+                self.on_config_change()
+            self.update_selected_tiles_display()
+            
+    def save_sheet_state(self):
+        """Store the view of the active sheet so switching back restores it"""
+        sheet = self.workspace.active
+        if sheet is None:
+            return
+        sheet.zoom_factor = self.zoom_factor
+        sheet.scroll = (self.canvas.xview()[0], self.canvas.yview()[0])
+        sheet.hide_blank = self.hide_blank.get()
+        sheet.hide_duplicates = self.hide_duplicates.get()
+        
+    @profiled("switch_sheet")
+    def show_sheet(self, sheet):
+        """Make an open sheet the active one and show it as it was left"""
+        self.split_worker.cancel()
+        self.save_sheet_state()
+        
+        try:
+            # Unloaded sheets come back memory-mapped from the split cache
+            with self.profiler.phase("restore"):
+                self.workspace.activate(sheet)
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to restore tilesheet: {str(e)}")
+            return
+            
+        self.sheet_tabs.select(sheet.tab)
+        self.sheet_digest, self.sheet_pixels, self.sheet_palette = sheet.digest, sheet.pixels, sheet.palette
+        if sheet.config is not None:
+            self.set_grid_config(sheet.config)
+        self.groups = sheet.groups
+        self.update_group_choices()
+        self.swap_source = None
+        self.zoom_factor = sheet.zoom_factor
+        self.hide_blank.set(sheet.hide_blank)
+        self.hide_duplicates.set(sheet.hide_duplicates)
+        
+        if sheet.atlas is None:
+            self.split_tilesheet()
+        else:
+            self.apply_split((sheet.atlas, sheet.zoom_cache, sheet.content_index, sheet.feature_index))
+        self.canvas.xview_moveto(sheet.scroll[0])
+        self.canvas.yview_moveto(sheet.scroll[1])
+        self.update_selected_tiles_display()
+        
+    def on_watch_change(self):
+        """Start or stop polling the active sheet's file for changes"""
+        if self.watch_pending is not None:
+            self.root.after_cancel(self.watch_pending)
+            self.watch_pending = None
+        if self.watch_file.get():
+            self.watch_pending = self.root.after(self.watch_poll_ms, self.poll_watched_file)
+        else:
+            self.watch_worker.cancel()
+            
+    def poll_watched_file(self):
+        """Re-read the active sheet when its file stamp changed since it was read"""
+        self.watch_pending = self.root.after(self.watch_poll_ms, self.poll_watched_file)
+        sheet = self.workspace.active
+        if sheet is None or self.atlas is None:
+            return
+        if self.load_worker.busy or self.split_worker.busy or self.watch_worker.busy:
+            return
+            
+        stamp = file_stamp(sheet.path)
+        if stamp is None or stamp == sheet.stamp:
+            return
+            
+        # A save that fails to decode is retried after the next one
+        sheet.stamp = stamp
+        self.watch_started = time.perf_counter()
+        self.watch_worker.submit(self.reread_sheet, sheet, self.atlas, self.content_index, self.feature_index,
+                                 on_done=self.apply_sheet_edit, on_error=self.on_watch_error)
+        
+    def reread_sheet(self, cancelled, sheet, atlas, content_index, feature_index):
+        """Decode an edited sheet and find the tiles whose content changed (worker thread)"""
+        timings = {}
+        start = time.perf_counter()
+        digest = file_digest(sheet.path)
+        with Image.open(sheet.path) as image:
+            pixels = engine.image_to_array(image)
+        timings['decode'] = time.perf_counter() - start
+        if cancelled():
+            return None
+        
+        # A resized sheet changes the grid itself and is loaded from scratch
+        if pixels.shape != atlas.pixels.shape:
+            return sheet, atlas, None
+            
+        start = time.perf_counter()
+        new_atlas = engine.TileAtlas(pixels, atlas.config, meta=atlas.meta)
+        changed = engine.changed_tiles(atlas, new_atlas)
+        timings['diff'] = time.perf_counter() - start
+        
+        # Hashes and features are recomputed for the changed tiles only
+        start = time.perf_counter()
+        new_index = content_index.updated(new_atlas, changed)
+        new_features = feature_index.updated(new_atlas, changed)
+        timings['index'] = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        palette = engine.PalettePixels.from_pixels(pixels)
+        timings['palette'] = time.perf_counter() - start
+        return sheet, atlas, (digest, new_atlas, new_index, new_features, palette, changed, timings)
+        
+    def apply_sheet_edit(self, result):
+        """Swap in an edited sheet and re-render only its changed tiles (main thread)"""
+        if result is None:
+            return
+        sheet, base_atlas, edit = result
+        
+        # The diff is against the split shown when the file was read; if the sheet was switched or
+        # re-split since, drop it and let the next poll read the file again against the current split
+        if sheet is not self.workspace.active or self.atlas is not base_atlas:
+            sheet.stamp = None
+            return
+        if edit is None:
+            self.start_load(sheet.path)
+            return
+            
+        # A split started from the config while the file was read holds the old pixels: it is started again
+        resplit = self.split_worker.busy
+        self.split_worker.cancel()
+        self.show_sheet_edit(sheet, edit)
+        if resplit:
+            self.on_config_change()
+            
+    def show_sheet_edit(self, sheet, edit):
+        """Install the edited pixels and split of the active sheet and redraw the changed tiles"""
+        digest, atlas, content_index, feature_index, palette, changed, timings = edit
+        with self.profiler.operation("watch_update", start=self.watch_started):
+            for phase, seconds in timings.items():
+                self.profiler.add(phase, seconds)
+                
+            self.sheet_digest, self.sheet_pixels, self.sheet_palette = digest, atlas.pixels, palette
+            sheet.digest, sheet.pixels, sheet.palette = digest, atlas.pixels, palette
+            self.atlas, self.content_index, self.feature_index = atlas, content_index, feature_index
+            self.bitmask_sets = None
+            self.zoom_cache.update_atlas(atlas, changed, palette)
+            sheet.keep_split(self.atlas, self.zoom_cache, self.content_index, self.feature_index)
+            self.update_info_display()
+            status = f"Reloaded {sheet.name}: {len(changed)} tile{'s' if len(changed) != 1 else ''} changed"
+            self.status_var.set(status)
+            if len(changed) == 0:
+                return
+                
+            # Filters depend on blank and duplicate tiles, so a filtered grid is laid out again
+            if self.hide_blank.get() or self.hide_duplicates.get():
+                self.update_display_order()
+                self.display_tiles()
+            else:
+                with self.profiler.phase("render"):
+                    display_size, _ = self.get_display_metrics()
+                    for tile_index in changed:
+                        rendered = self.rendered_tiles.get(int(tile_index))
+                        if rendered is not None:
+                            rendered[1].paste(self.zoom_cache.tile_image(int(tile_index), display_size, display_size))
+            self.draw_changed_overlay(changed)
+            
+            # Thumbnails, the autotile preview and similarity results may show changed tiles
+            for tile_index in changed:
+                self.selected_thumbnails.pop(int(tile_index), None)
+            if self.selection:
+                self.update_selected_tiles_display()
+            if self.similar_query is not None:
+                self.find_similar(self.similar_query)
+                self.status_var.set(status)
+                
+    def draw_changed_overlay(self, changed):
+        """Briefly outline the tiles changed by the last edit"""
+        self.canvas.delete("changed")
+        if self.changed_highlight_pending is not None:
+            self.root.after_cancel(self.changed_highlight_pending)
+            
+        display_size, _ = self.get_display_metrics()
+        for tile_index in changed:
+            slot = self.tile_slot(int(tile_index))
+            if slot is None:
+                continue
+            x, y = self.slot_origin(slot)
+            self.canvas.create_rectangle(x+1, y+1, x+display_size-1, y+display_size-1,
+                                         outline="magenta", width=2, tags=("overlay", "changed"))
+        self.changed_highlight_pending = self.root.after(1500, self.clear_changed_overlay)
+        
+    def clear_changed_overlay(self):
+        """Remove the changed tile outlines"""
+        self.changed_highlight_pending = None
+        self.canvas.delete("changed")
+        
+    def on_watch_error(self, error):
+        """Report a failed reload of a watched sheet (main thread)"""
+        self.status_var.set(f"Failed to reload watched tilesheet: {str(error)}")
+        
+    def on_sheet_tab_changed(self, event):
+        """Show the sheet of the selected tab"""
+        selected = self.sheet_tabs.select()
+        for sheet in self.workspace.sheets:
+            if str(sheet.tab) == str(selected) and sheet is not self.workspace.active:
+                self.show_sheet(sheet)
+                return
                 
+    def close_sheet(self):
+        """Close the active sheet and show the one used before it"""
+        sheet = self.workspace.active
+        if sheet is None:
+            return
+        if len(self.workspace.sheets) == 1:
+            self.clear_tiles()
+            return
+            
+        self.autosave_groups([sheet])
+        self.sheet_tabs.forget(sheet.tab)
+        self.workspace.remove(sheet)
+        self.show_sheet(max(self.workspace.sheets, key=lambda s: s.last_used))
+            
+    def on_load_progress(self, fraction, preview):
+        """Advance the progress bar and show the partially decoded sheet (main thread)"""
+        self.load_progress['value'] = fraction
+        if preview is None:
+            return
+            
+        # Drawn above the current grid until the loaded sheet replaces it
+        left, top = self.canvas.canvasx(0), self.canvas.canvasy(0)
+        self.canvas.delete("preview")
+        self.load_preview = self.profiler.track_photo(ImageTk.PhotoImage(preview))
+        self.canvas.create_rectangle(left, top, left + self.canvas.winfo_width(), top + self.canvas.winfo_height(),
+                                     fill=self.background_color.get(), outline="", tags="preview")
+        self.canvas.create_image(left, top, anchor=tk.NW, image=self.load_preview, tags="preview")
+        
+    def on_load_error(self, error):
+        """Report a failed background load (main thread)"""
+        self.hide_load_progress()
+        self.status_var.set("Ready")
+        messagebox.showerror("Error", f"Failed to load image: {str(error)}")
+        
+    def cancel_load(self):
+        """Stop loading a sheet and keep the current one"""
+        self.load_worker.cancel()
+        self.hide_load_progress()
+        self.status_var.set("Loading cancelled")
+        
+    def show_load_progress(self):
+        """Show the progress bar and cancel button in the status bar"""
+        self.load_progress['value'] = 0.0
+        self.last_preview_time = 0.0
+        self.load_cancel_button.pack(side=tk.RIGHT)
+        self.load_progress.pack(side=tk.RIGHT, padx=5)
+        
+    def hide_load_progress(self):
+        """Hide the load progress and drop the preview"""
+        self.load_progress.pack_forget()
+        self.load_cancel_button.pack_forget()
+        self.canvas.delete("preview")
+        self.load_preview = None
+        
     def on_config_change(self):
         """Handle configuration changes"""
         # Update background color
         self.canvas.configure(bg=self.background_color.get())
         
-        if self.original_image:
-            self.split_tilesheet()
+        if self.sheet_pixels is None:
+            return
+            
+        try:
+            config = self.get_grid_config()
+        except Exception as e:
+            self.status_var.set(f"Invalid configuration: {str(e)}")
+            return
             
+        # Returning to the displayed configuration only needs to drop pending work
+        if self.atlas is not None and config == self.atlas.config:
+            self.split_worker.cancel()
+            return
+            
+        # Configs already visited are still in memory and are shown right away
+        cached = self.split_cache.peek(self.sheet_digest, config)
+        if cached is not None:
+            self.split_worker.cancel()
+            self.zoom_cache = engine.ZoomCache(self.zoom_cache.max_bytes)
+            self.zoom_cache.set_atlas(cached.atlas, self.sheet_palette)
+            self.apply_split((cached.atlas, self.zoom_cache, cached.content_index, cached.feature_index))
+            return
+            
+        # Pre-render the rows that will be on screen at the current zoom while splitting
+        display_size, _ = self.get_display_metrics()
+        self.status_var.set("Splitting...")
+        self.split_worker.submit(self.build_split, self.sheet_digest, self.sheet_pixels, self.sheet_palette, config,
+                                 self.get_warm_rows(), display_size,
+                                 on_done=self.apply_split, on_error=self.on_split_error)
+            
+    def get_warm_rows(self):
+        """Return the tile rows a new split shows first at the current scroll position and zoom"""
+        _, pitch = self.get_display_metrics()
+        visible_rows = max(self.canvas.winfo_height() // pitch + 1, 1) + self.render_overscan
+        first_row = max(int(self.canvas.canvasy(0) // pitch) - self.render_overscan, 0)
+        return range(first_row, first_row + visible_rows)
+            
+    def build_split(self, cancelled, digest, pixels, palette, config, warm_rows, display_size):
+        """Split the sheet and scale the rows about to be shown (worker thread)"""
+        split = self.split_cache.get_split(digest, pixels, config)
+        zoom_cache = engine.ZoomCache(self.zoom_cache.max_bytes)
+        zoom_cache.set_atlas(split.atlas, palette)
+        
+        for row in warm_rows:
+            if cancelled() or row >= split.atlas.tiles_per_col:
+                break
+            zoom_cache.get_strip(row, display_size, display_size)
+        return split.atlas, zoom_cache, split.content_index, split.feature_index
+        
+    @profiled("apply_split")
+    def apply_split(self, result):
+        """Show a split produced by the worker (main thread)"""
+        self.atlas, self.zoom_cache, self.content_index, self.feature_index = result
+        self.tiles_per_row = self.atlas.tiles_per_row
+        self.tiles_per_col = self.atlas.tiles_per_col
+        self.selected_thumbnails.clear()
+        self.similar_query = None
+        self.similar_tiles = []
+        self.bitmask_sets = None
+        self.update_display_order()
+        
+        # The active sheet keeps its split and caches for when it is switched back to
+        if self.workspace.active is not None:
+            self.workspace.active.keep_split(*result)
+            self.workspace.enforce_budget()
+        
+        # Groups kept from a sidecar or another grid may hold tiles this split does not have
+        status = f"Split into {len(self.atlas)} tiles ({self.tiles_per_row}x{self.tiles_per_col})"
+        outside = self.groups.count_outside(len(self.atlas))
+        if outside:
+            status += f" - {outside} grouped tile{'s are' if outside != 1 else ' is'} past the last tile and not shown"
+        self.status_var.set(status)
+        self.update_info_display()
+        self.display_tiles()
+        
+        # Refreshed last so a failing preview cannot keep the grid from being redrawn
+        self.update_selected_tiles_display()
+        
+    def on_split_error(self, error):
+        """Report a failed background split (main thread)"""
+        self.status_var.set(f"Failed to split tilesheet: {str(error)}")
+            
+    def get_grid_config(self):
+        """Build the engine grid configuration from the UI variables"""
+        return engine.GridConfig(self.tile_width.get(), self.tile_height.get(),
+                                 self.margin_x.get(), self.margin_y.get(),
+                                 self.offset_x.get(), self.offset_y.get()).validate()
+            
+    def set_grid_config(self, config):
+        """Write an engine grid configuration back into the UI variables"""
+        self.tile_width.set(config.tile_width)
+        self.tile_height.set(config.tile_height)
+        self.margin_x.set(config.margin_x)
+        self.margin_y.set(config.margin_y)
+        self.offset_x.set(config.offset_x)
+        self.offset_y.set(config.offset_y)
+            
+    def auto_detect_grid(self):
+        """Infer tile size, margins and offset from the sheet and re-split once"""
+        if self.sheet_pixels is None:
+            messagebox.showwarning("Warning", "Please load a tilesheet first")
+            return
+            
+        try:
+            config = engine.detect_grid(self.sheet_pixels)
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to detect grid: {str(e)}")
+            return
+            
+        self.set_grid_config(config)
+        self.split_tilesheet()
+        self.status_var.set(f"Detected {config.tile_width}x{config.tile_height} tiles, "
+                            f"margin {config.margin_x}x{config.margin_y}, offset {config.offset_x}x{config.offset_y}")
+            
+    @profiled("split_tilesheet")
     def split_tilesheet(self):
         """Split the loaded tilesheet into individual tiles"""
-        if not self.original_image:
+        if self.sheet_pixels is None:
             return
             
+        # Any background split in flight is now stale
+        self.split_worker.cancel()
+        
         try:
-            self.tiles.clear()
-            
-            tile_w = self.tile_width.get()
-            tile_h = self.tile_height.get()
-            margin_x = self.margin_x.get()
-            margin_y = self.margin_y.get()
-            
-            img_width, img_height = self.original_image.size
-            
-            # Calculate how many tiles fit
-            self.tiles_per_row = (img_width + margin_x) // (tile_w + margin_x)
-            self.tiles_per_col = (img_height + margin_y) // (tile_h + margin_y)
-            
-            # Extract tiles
-            for row in range(self.tiles_per_col):
-                for col in range(self.tiles_per_row):
-                    x = col * (tile_w + margin_x)
-                    y = row * (tile_h + margin_y)
-                    
-                    # Check if tile is within image bounds
-                    if x + tile_w <= img_width and y + tile_h <= img_height:
-                        tile = self.original_image.crop((x, y, x + tile_w, y + tile_h))
-                        self.tiles.append({
-                            'image': tile,
-                            'row': row,
-                            'col': col,
-                            'x': x,
-                            'y': y
-                        })
-            
-            self.status_var.set(f"Split into {len(self.tiles)} tiles ({self.tiles_per_row}x{self.tiles_per_col})")
-            
-            # Update information display
-            self.update_info_display()
-            
-            self.display_tiles()
+            # Tiles are views over the shared sheet array, so re-splitting only rebuilds metadata
+            with self.profiler.phase("split"):
+                split = self.split_cache.get_split(self.sheet_digest, self.sheet_pixels, self.get_grid_config())
+            # A new cache: the current one may still belong to the sheet shown before this one
+            self.zoom_cache = engine.ZoomCache(self.zoom_cache.max_bytes)
+            self.zoom_cache.set_atlas(split.atlas, self.sheet_palette)
+            self.apply_split((split.atlas, self.zoom_cache, split.content_index, split.feature_index))
             
         except Exception as e:
             messagebox.showerror("Error", f"Failed to split tilesheet: {str(e)}")
             
     def update_info_display(self):
         """Update the information display panel"""
-        if self.original_image:
-            img_width, img_height = self.original_image.size
+        if self.atlas is not None:
+            img_width, img_height = self.atlas.size
             self.info_image_size.set(f"Image Size: {img_width} x {img_height}")
             self.info_row_count.set(f"Row Count: {self.tiles_per_col}")
             self.info_col_count.set(f"Column Count: {self.tiles_per_row}")
-            self.info_tile_count.set(f"Tile Count: {len(self.tiles)}")
+            self.info_tile_count.set(f"Tile Count: {len(self.atlas)}")
+            if self.content_index is not None:
+                self.info_content_count.set(f"Blank: {self.content_index.blank_count}, "
+                                            f"Duplicates: {self.content_index.duplicate_count}")
+            self.update_storage_display()
         else:
             self.info_image_size.set("Image Size: --")
             self.info_row_count.set("Row Count: --")
             self.info_col_count.set("Column Count: --")
             self.info_tile_count.set("Tile Count: --")
+            self.info_content_count.set("Blank: --, Duplicates: --")
+            self.info_storage.set("Storage: --")
+            
+    def update_storage_display(self):
+        """Show how the active sheet is held in memory, from the sizes of the arrays it holds"""
+        if self.atlas is None:
+            return
+        text = f"Storage: {self.sheet_palette.describe() if self.sheet_palette is not None else 'RGBA'}"
+        if self.workspace.active is not None:
+            text += f"\nHeld: {self.workspace.active.memory_bytes() / 2**20:.1f} MB"
+        # Only the display strips are packed; the sheet itself is still held as RGBA
+        if self.sheet_palette is not None and self.zoom_cache.rgba_bytes:
+            text += (f", strips {self.zoom_cache.total_bytes / 2**20:.1f} MB "
+                     f"({self.zoom_cache.rgba_bytes / 2**20:.1f} MB as RGBA)")
+        self.info_storage.set(text)
+        
+    def on_profile_report(self, report):
+        """Show a finished operation in the status bar and refresh the memory it changed"""
+        self.perf_var.set(format_report(report))
+        self.update_storage_display()
+        
+    def update_display_order(self):
+        """Rebuild the grid slot of every tile from the blank and duplicate filters"""
+        count = len(self.atlas) if self.atlas else 0
+        hidden = np.zeros(count, dtype=bool)
+        if self.content_index is not None:
+            if self.hide_blank.get():
+                hidden |= self.content_index.blank
+            if self.hide_duplicates.get():
+                hidden |= ~self.content_index.is_canonical & ~self.content_index.blank
+                
+        if hidden.any():
+            self.display_order = np.flatnonzero(~hidden)
+            self.display_slots = np.full(count, -1, dtype=np.int64)
+            self.display_slots[self.display_order] = np.arange(len(self.display_order))
+        else:
+            self.display_order = None
+            self.display_slots = None
             
+        shown = count if self.display_order is None else len(self.display_order)
+        self.grid_rows = -(-shown // self.tiles_per_row) if self.tiles_per_row else 0
+        
+    def tile_slot(self, tile_index):
+        """Return the grid slot a tile is shown at, or None when it is hidden"""
+        if self.display_slots is None:
+            return tile_index
+        slot = int(self.display_slots[tile_index])
+        return slot if slot >= 0 else None
+        
+    def slot_tile(self, slot):
+        """Return the tile index shown at a grid slot, or None past the last shown tile"""
+        if self.display_order is None:
+            return slot if slot < len(self.atlas) else None
+        return int(self.display_order[slot]) if slot < len(self.display_order) else None
+        
+    def slot_origin(self, slot):
+        """Return the canvas position of the top-left corner of a grid slot"""
+        display_size, pitch = self.get_display_metrics()
+        row, col = divmod(slot, self.tiles_per_row)
+        return col * pitch, row * pitch
+        
+    def on_filter_change(self):
+        """Re-layout the grid after toggling the blank or duplicate filter"""
+        if not self.atlas:
+            return
+        self.update_display_order()
+        self.display_tiles()
+        shown = len(self.atlas) if self.display_order is None else len(self.display_order)
+        self.status_var.set(f"Showing {shown} of {len(self.atlas)} tiles")
+        
+    def export_dedupe_map(self):
+        """Save blank tiles and the duplicate to canonical tile mapping as JSON"""
+        if self.content_index is None:
+            messagebox.showwarning("Warning", "Please load a tilesheet first")
+            return
+            
+        file_path = filedialog.asksaveasfilename(
+            title="Export Dedupe Map",
+            defaultextension=".json",
+            filetypes=[("JSON files", "*.json"), ("All files", "*.*")]
+        )
+        
+        if file_path:
+            try:
+                mapping = self.content_index.dedupe_mapping()
+                mapping['config'] = self.atlas.config._asdict()
+                with open(file_path, 'w') as f:
+                    json.dump(mapping, f, indent=2)
+                self.status_var.set(f"Exported dedupe map: {mapping['unique_count']} unique tiles, "
+                                    f"{len(mapping['blank'])} blank, {len(mapping['remap'])} duplicates")
+            except Exception as e:
+                messagebox.showerror("Error", f"Failed to export dedupe map: {str(e)}")
+        
+    @property
+    def selection(self):
+        """The active selection group"""
+        return self.groups.active
+        
+    def read_groups(self, sheet_path):
+        """Return the selection groups saved next to a sheet, or a single empty group"""
+        path = sidecar_path(sheet_path)
+        if not os.path.exists(path):
+            return SelectionGroups()
+        try:
+            return SelectionGroups.load(path)
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to load selection groups: {str(e)}")
+            return SelectionGroups()
+        
+    def autosave_groups(self, sheets=None):
+        """Write the changed groups of the given open sheets, or of all of them, to their sidecar files"""
+        for sheet in self.workspace.sheets if sheets is None else sheets:
+            path = sidecar_path(sheet.path)
+            if not sheet.groups.modified or (sheet.groups.is_empty() and not os.path.exists(path)):
+                continue
+            try:
+                sheet.groups.save(path, sheet.name)
+            except Exception as e:
+                print(f"Error saving selection groups: {e}")
+        
+    def save_groups(self):
+        """Save the groups of the active sheet to its sidecar file"""
+        sheet = self.workspace.active
+        if sheet is None:
+            messagebox.showwarning("Warning", "Please load a tilesheet first")
+            return
+        
+        path = sidecar_path(sheet.path)
+        try:
+            self.groups.save(path, sheet.name)
+            self.status_var.set(f"Saved {len(self.groups)} groups to {os.path.basename(path)}")
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to save selection groups: {str(e)}")
+        
+    def export_groups_csharp(self):
+        """Save every non-empty group as a C# int[] array, named after the group"""
+        if self.groups.is_empty():
+            messagebox.showwarning("Warning", "Please select tiles for a group first")
+            return
+        
+        sheet = self.workspace.active
+        source = sheet.name if sheet is not None else None
+        stem = os.path.splitext(source)[0] if source else "Tile"
+        file_path = filedialog.asksaveasfilename(
+            title="Export Groups as C#",
+            defaultextension=".cs",
+            initialfile=f"{csharp_identifier(stem)}Groups.cs",
+            filetypes=[("C# files", "*.cs"), ("All files", "*.*")]
+        )
+        
+        if file_path:
+            try:
+                class_name = os.path.splitext(os.path.basename(file_path))[0]
+                with open(file_path, 'w') as f:
+                    f.write(self.groups.export_csharp(class_name, source))
+                exported = sum(1 for group in self.groups if len(group))
+                self.status_var.set(f"Exported {exported} groups to {os.path.basename(file_path)}")
+            except Exception as e:
+                messagebox.showerror("Error", f"Failed to export groups: {str(e)}")
+        
+    def update_group_choices(self):
+        """Show the group names in the group chooser, with the active group picked"""
+        self.group_combo['values'] = self.groups.names()
+        self.group_name.set(self.selection.name)
+        
+    def on_group_selected(self, event=None):
+        """Make the group picked in the chooser the selection"""
+        self.groups.activate(self.group_name.get())
+        self.show_active_group()
+        
+    def show_active_group(self):
+        """Redraw the overlays and the selected panel after the active group changed"""
+        self.swap_source = None
+        self.draw_group_overlays()
+        self.update_selected_tiles_display()
+        status = f"Group '{self.selection.name}': {len(self.selection)} tiles"
+        outside = sum(1 for tile_index in self.selection if tile_index >= len(self.atlas)) if self.atlas else 0
+        if outside:
+            status += f", {outside} past the last tile"
+        self.status_var.set(status)
+        
+    def new_group(self):
+        """Ask for a name and start an empty group"""
+        name = simpledialog.askstring("New Group", "Group name:", parent=self.root)
+        if name is None:
+            return
+        try:
+            self.groups.add(name)
+        except ValueError as e:
+            messagebox.showwarning("Warning", str(e))
+            return
+        self.update_group_choices()
+        self.show_active_group()
+        
+    def rename_group(self):
+        """Ask for a new name for the active group"""
+        old_name = self.selection.name
+        name = simpledialog.askstring("Rename Group", "Group name:", initialvalue=old_name, parent=self.root)
+        if name is None:
+            return
+        try:
+            self.groups.rename(old_name, name)
+        except ValueError as e:
+            messagebox.showwarning("Warning", str(e))
+            return
+        self.update_group_choices()
+        self.status_var.set(f"Renamed group '{old_name}' to '{self.selection.name}'")
+        
+    def delete_group(self):
+        """Delete the active group; the last group is only emptied"""
+        name = self.selection.name
+        if self.selection and not messagebox.askyesno("Delete Group",
+                                                      f"Delete group '{name}' with {len(self.selection)} tiles?"):
+            return
+        self.groups.remove(name)
+        self.update_group_choices()
+        self.show_active_group()
+        
+    @profiled("display_tiles")
     def display_tiles(self):
-        """Display tiles in the canvas"""
-        if not self.tiles:
+        """Lay out the tile grid and render the tiles in the visible region"""
+        if not self.atlas:
             return
             
-        # Clear canvas and clean up old image references
-        self.canvas.delete("all")
-        if hasattr(self.canvas, 'image_refs'):
-            self.canvas.image_refs.clear()
+        # Photo pool only holds images of the current display size
+        display_size, pitch = self.get_display_metrics()
+        if display_size != self.photo_pool_size:
+            self.photo_pool.clear()
+            self.photo_pool_size = display_size
+        else:
+            self.photo_pool.extend(photo for _, photo in self.rendered_tiles.values())
         
-        # Calculate display size
-        display_size = int(self.tile_display_size * self.zoom_factor)
-        spacing = 2  # Space between tiles in display
+        # Clear canvas and drop every rendered tile
+        self.canvas.delete("all")
+        self.rendered_tiles.clear()
+        self.free_tile_items.clear()
         
         # Calculate total canvas size
-        canvas_width = self.tiles_per_row * (display_size + spacing) - spacing
-        canvas_height = self.tiles_per_col * (display_size + spacing) - spacing
+        canvas_width = self.tiles_per_row * pitch - self.tile_spacing
+        canvas_height = self.grid_rows * pitch - self.tile_spacing
         
         self.canvas.configure(scrollregion=(0, 0, canvas_width, canvas_height))
         
-        # Initialize image references list
-        self.canvas.image_refs = []
+        # Overlay layer drawn above the tiles: one hover marker plus the group and selection borders
+        self.hover_item = self.canvas.create_rectangle(0, 0, 0, 0, outline="yellow", width=2,
+                                                       state=tk.HIDDEN, tags="overlay")
+        self.hovered_tile = None
+        self.draw_group_overlays()
+        self.draw_similar_overlay()
+        
+        self.update_viewport()
+        
+    def draw_group_overlays(self):
+        """Draw the selection borders, then the outlines of every other group in one tagged batch each"""
+        self.canvas.delete("groups")
+        self.draw_selection_overlay()
+        if not self.atlas or not self.show_groups.get():
+            return
+            
+        # Thin outlines inset by group, so tiles shared by several groups show each of them
+        display_size, pitch = self.get_display_metrics()
+        for number, group in enumerate(self.groups):
+            if group is self.selection or not group:
+                continue
+            color = self.group_colors[number % len(self.group_colors)]
+            inset = min(3 + 2 * (number % 4), display_size // 4)
+            tags = ("overlay", "groups", f"group_{number}")
+            for tile_index in group:
+                slot = self.tile_slot(tile_index) if tile_index < len(self.atlas) else None
+                if slot is None:
+                    continue
+                x, y = self.slot_origin(slot)
+                self.canvas.create_rectangle(x+inset, y+inset, x+display_size-inset, y+display_size-inset,
+                                             outline=color, width=1, tags=tags)
+        self.canvas.tag_raise("selection")
+        
+    def draw_selection_overlay(self):
+        """Draw selection borders for every selected tile on the overlay layer"""
+        self.canvas.delete("selection")
+        for tile_index in self.selection:
+            self.add_selection_highlight(tile_index)
+        
+    def add_selection_highlight(self, tile_index):
+        """Draw the selection border of one tile on the overlay layer"""
+        # Groups saved for another grid configuration may hold indices past the last tile
+        if not self.atlas or tile_index >= len(self.atlas):
+            return
+            
+        # Hidden tiles stay selected but have no slot to outline
+        slot = self.tile_slot(tile_index)
+        if slot is None:
+            return
+            
+        display_size, pitch = self.get_display_metrics()
+        x, y = self.slot_origin(slot)
+        self.canvas.create_rectangle(x-2, y-2, x+display_size+2, y+display_size+2, 
+                                   outline="red", width=3,
+                                   tags=("overlay", "selection", f"selection_{tile_index}"))
+        self.canvas.tag_raise("overlay")
+        
+    def remove_selection_highlight(self, tile_index):
+        """Remove the selection border of one tile from the overlay layer"""
+        self.canvas.delete(f"selection_{tile_index}")
+        
+    def draw_similar_overlay(self):
+        """Outline the similarity query tile and its nearest matches on the overlay layer"""
+        self.canvas.delete("similar")
+        if not self.atlas or self.similar_query is None:
+            return
+            
+        display_size, pitch = self.get_display_metrics()
+        for tile_index in [self.similar_query] + self.similar_tiles:
+            slot = self.tile_slot(tile_index)
+            if slot is None:
+                continue
+            x, y = self.slot_origin(slot)
+            dash = (4, 2) if tile_index == self.similar_query else None
+            self.canvas.create_rectangle(x+1, y+1, x+display_size-1, y+display_size-1, 
+                                       outline="cyan", width=2, dash=dash,
+                                       tags=("overlay", "similar"))
+        self.canvas.tag_raise("selection")
+        
+    def find_similar(self, tile_index):
+        """Highlight the tiles that look most like the given tile"""
+        if self.feature_index is None:
+            return
+            
+        # Blank tiles match each other perfectly, so only offer them for a blank query
+        exclude = np.zeros(len(self.feature_index), dtype=bool)
+        if self.content_index is not None and not self.content_index.blank[tile_index]:
+            exclude |= self.content_index.blank
+        if self.display_slots is not None:
+            exclude |= self.display_slots < 0
+            
+        try:
+            count = max(self.similar_count.get(), 1)
+        except Exception:
+            count = 12
+        matches = self.feature_index.query(tile_index, count, exclude)
+        
+        self.similar_query = tile_index
+        self.similar_tiles = [index for index, _ in matches]
+        self.draw_similar_overlay()
+        self.status_var.set(f"{len(matches)} tiles similar to #{tile_index}: "
+                            + ", ".join(map(str, self.similar_tiles)))
+        
+    def refresh_similar(self):
+        """Re-run the current similarity search with the new result count"""
+        if self.similar_query is not None:
+            self.find_similar(self.similar_query)
+        
+    def clear_similar(self):
+        """Remove the similarity highlight"""
+        self.similar_query = None
+        self.similar_tiles = []
+        self.canvas.delete("similar")
+        
+    def select_similar(self):
+        """Add the similarity query and its matches to the selection"""
+        if self.similar_query is None:
+            self.status_var.set("Right-click a tile to find similar tiles first")
+            return
+            
+        for tile_index in [self.similar_query] + self.similar_tiles:
+            if self.selection.add(tile_index):
+                self.add_selection_highlight(tile_index)
+                
+        self.update_selected_tiles_display()
+        self.status_var.set(f"{len(self.selection)} tiles selected in '{self.selection.name}'")
         
-        # Place tiles
-        for tile_data in self.tiles:
-            row = tile_data['row']
-            col = tile_data['col']
+    def get_display_metrics(self):
+        """Return (display_size, pitch) of a tile in the grid at the current zoom"""
+        display_size = int(self.tile_display_size * self.zoom_factor)
+        return display_size, display_size + self.tile_spacing
+        
+    def get_visible_tile_range(self):
+        """Return (first_row, last_row, first_col, last_col) of grid slots in or near the viewport"""
+        display_size, pitch = self.get_display_metrics()
+        
+        left = self.canvas.canvasx(0)
+        top = self.canvas.canvasy(0)
+        right = left + max(self.canvas.winfo_width(), 1)
+        bottom = top + max(self.canvas.winfo_height(), 1)
+        
+        first_col = max(int(left // pitch) - self.render_overscan, 0)
+        last_col = min(int(right // pitch) + self.render_overscan, self.tiles_per_row - 1)
+        first_row = max(int(top // pitch) - self.render_overscan, 0)
+        last_row = min(int(bottom // pitch) + self.render_overscan, self.grid_rows - 1)
+        return first_row, last_row, first_col, last_col
+        
+    def schedule_viewport_update(self):
+        """Coalesce viewport updates from scroll and resize events into one idle callback"""
+        if self.viewport_update_pending is None:
+            self.viewport_update_pending = self.root.after_idle(self.update_viewport)
+            
+    def update_viewport(self):
+        """Render tiles entering the viewport and recycle tiles that left it"""
+        self.viewport_update_pending = None
+        if not self.atlas:
+            return
+            
+        display_size, pitch = self.get_display_metrics()
+        first_row, last_row, first_col, last_col = self.get_visible_tile_range()
+        resize_time = photo_time = item_time = 0.0
+        
+        needed = {}  # Tile index -> grid slot
+        for row in range(first_row, last_row + 1):
+            start = row * self.tiles_per_row
+            for slot in range(start + first_col, start + last_col + 1):
+                tile_index = self.slot_tile(slot)
+                if tile_index is not None:
+                    needed[tile_index] = slot
+        
+        # Recycle canvas items and photos of tiles that scrolled out of view
+        for tile_index in [i for i in self.rendered_tiles if i not in needed]:
+            item_id, photo = self.rendered_tiles.pop(tile_index)
+            self.canvas.itemconfigure(item_id, state=tk.HIDDEN)
+            self.free_tile_items.append(item_id)
+            self.photo_pool.append(photo)
+        
+        # Render tiles that scrolled into view
+        for tile_index, slot in needed.items():
+            if tile_index in self.rendered_tiles:
+                continue
+                
+            row, col = divmod(tile_index, self.tiles_per_row)
             
             try:
-                # Resize tile for display
-                display_tile = tile_data['image'].resize((display_size, display_size), Image.Resampling.NEAREST)
-                photo = ImageTk.PhotoImage(display_tile)
+                # Slice the tile out of the cached zoom level, reusing a pooled photo when possible
+                start = time.perf_counter()
+                display_tile = self.zoom_cache.tile_image(tile_index, display_size, display_size)
+                resize_time += time.perf_counter() - start
                 
-                # Calculate position
-                x = col * (display_size + spacing)
-                y = row * (display_size + spacing)
+                start = time.perf_counter()
+                if self.photo_pool:
+                    photo = self.photo_pool.pop()
+                    photo.paste(display_tile)
+                else:
+                    photo = self.profiler.track_photo(ImageTk.PhotoImage(display_tile))
+                photo_time += time.perf_counter() - start
                 
-                # Create tile on canvas
-                tile_id = self.canvas.create_image(x, y, anchor=tk.NW, image=photo)
+                # Calculate position
+                x, y = self.slot_origin(slot)
                 
-                # Add selection highlighting if tile is selected
-                tile_index = (row * self.tiles_per_row) + col
-                if tile_index in self.selected_tiles:
-                    # Draw selection border
-                    self.canvas.create_rectangle(x-2, y-2, x+display_size+2, y+display_size+2, 
-                                               outline="red", width=3, tags="selection")
+                # Reuse a hidden canvas item or create a new one
+                start = time.perf_counter()
+                if self.free_tile_items:
+                    tile_id = self.free_tile_items.pop()
+                    self.canvas.coords(tile_id, x, y)
+                    self.canvas.itemconfigure(tile_id, image=photo, state=tk.NORMAL)
+                else:
+                    tile_id = self.canvas.create_image(x, y, anchor=tk.NW, image=photo, tags="tile")
+                item_time += time.perf_counter() - start
                 
                 # Store reference to prevent garbage collection
-                self.canvas.image_refs.append(photo)
-                
-                # Add click and hover handlers for individual tiles
-                self.canvas.tag_bind(tile_id, "<Button-1>", lambda e, tile=tile_data: self.on_tile_click(tile))
-                self.canvas.tag_bind(tile_id, "<Enter>", lambda e, tile=tile_data: self.on_tile_hover(tile))
-                self.canvas.tag_bind(tile_id, "<Leave>", lambda e: self.on_tile_leave())
+                self.rendered_tiles[tile_index] = (tile_id, photo)
             except Exception as e:
                 print(f"Error displaying tile at row {row}, col {col}: {e}")
                 continue
+        
+        # Keep the overlay layer above the tiles
+        self.canvas.tag_raise("overlay")
+        
+        # Scrolling is not profiled on its own; these only count inside a profiled operation
+        self.profiler.add("resize", resize_time)
+        self.profiler.add("photo", photo_time)
+        self.profiler.add("canvas", item_time)
+            
+    def tile_index_at(self, event_x, event_y):
+        """Map a pointer position in window coordinates to a tile index, or None outside tiles"""
+        if not self.atlas:
+            return None
+            
+        display_size, pitch = self.get_display_metrics()
+        x = self.canvas.canvasx(event_x)
+        y = self.canvas.canvasy(event_y)
+        if x < 0 or y < 0:
+            return None
+            
+        col, offset_x = divmod(int(x), pitch)
+        row, offset_y = divmod(int(y), pitch)
+        
+        # Ignore the spacing between tiles and positions past the grid
+        if offset_x >= display_size or offset_y >= display_size:
+            return None
+        if col >= self.tiles_per_row or row >= self.grid_rows:
+            return None
+            
+        return self.slot_tile((row * self.tiles_per_row) + col)
+        
+    def on_canvas_click(self, event):
+        """Dispatch a click on the grid canvas to the tile under the pointer"""
+        self.canvas.focus_set()
+        tile_index = self.tile_index_at(event.x, event.y)
+        if tile_index is not None:
+            self.on_tile_click(tile_index)
+            
+    def on_canvas_right_click(self, event):
+        """Find tiles similar to the tile under the pointer, or clear the highlight outside tiles"""
+        self.canvas.focus_set()
+        tile_index = self.tile_index_at(event.x, event.y)
+        if tile_index is None:
+            self.clear_similar()
+        else:
+            self.find_similar(tile_index)
+            
+    def on_canvas_motion(self, event):
+        """Move the hover marker to the tile under the pointer"""
+        tile_index = self.tile_index_at(event.x, event.y)
+        if tile_index == self.hovered_tile:
+            return
+            
+        if tile_index is None:
+            self.on_tile_leave()
+            return
+            
+        self.hovered_tile = tile_index
+        display_size, pitch = self.get_display_metrics()
+        x, y = self.slot_origin(self.tile_slot(tile_index))
+        self.canvas.coords(self.hover_item, x, y, x + display_size, y + display_size)
+        self.canvas.itemconfigure(self.hover_item, state=tk.NORMAL)
+        self.canvas.tag_raise("overlay")
+        self.on_tile_hover(tile_index)
             
-    def on_tile_click(self, tile_data):
+    def on_tile_click(self, tile_index):
         """Handle click on individual tile"""
-        row, col = tile_data['row'], tile_data['col']
-        tile_index = (row * self.tiles_per_row) + col
+        row, col = divmod(tile_index, self.tiles_per_row)
         
-        # Toggle selection
-        if tile_index in self.selected_tiles:
+        # Toggle selection in the active group
+        if tile_index in self.selection:
             # Remove from selection
-            self.selected_tiles.remove(tile_index)
-            self.selected_tile_objects = [t for t in self.selected_tile_objects if t['row'] != row or t['col'] != col]
+            self.selection.remove(tile_index)
+            self.remove_selection_highlight(tile_index)
             self.status_var.set(f"Deselected tile: Row {row}, Col {col}, Index {tile_index}")
         else:
-            # Check selection limit (exactly 16 tiles)
-            max_selections = 16
-            if len(self.selected_tiles) >= max_selections:
-                self.status_var.set(f"Maximum {max_selections} tiles can be selected. Clear selection first.")
-                return
-            
             # Add to selection
-            self.selected_tiles.append(tile_index)
-            self.selected_tile_objects.append(tile_data)
+            self.selection.add(tile_index)
+            self.add_selection_highlight(tile_index)
             self.status_var.set(f"Selected tile: Row {row}, Col {col}, Index {tile_index}")
         
         # Update display
         self.update_selected_tiles_display()
-        self.display_tiles()  # Redraw to show selection highlighting
         
-    def on_tile_hover(self, tile_data):
+    def on_tile_hover(self, tile_index):
         """Handle hover over tile"""
-        row, col = tile_data['row'], tile_data['col']
-        tile_index = (row * self.tiles_per_row) + col
-        self.status_var.set(f"Hovering: Row {row}, Col {col}, Index {tile_index}")
+        row, col = divmod(tile_index, self.tiles_per_row)
+        status = f"Hovering: Row {row}, Col {col}, Index {tile_index}"
+        if self.content_index is not None:
+            if self.content_index.blank[tile_index]:
+                status += " (blank)"
+            elif self.content_index.canonical[tile_index] != tile_index:
+                status += f" (duplicate of {self.content_index.canonical[tile_index]})"
+        self.status_var.set(status)
         
     def on_tile_leave(self):
         """Handle leaving tile hover"""
-        if self.tiles:
-            self.status_var.set(f"Split into {len(self.tiles)} tiles ({self.tiles_per_row}x{self.tiles_per_col})")
+        self.hovered_tile = None
+        if self.hover_item is not None:
+            self.canvas.itemconfigure(self.hover_item, state=tk.HIDDEN)
+        if self.atlas:
+            self.status_var.set(f"Split into {len(self.atlas)} tiles ({self.tiles_per_row}x{self.tiles_per_col})")
         else:
             self.status_var.set("Ready")
     
+    @profiled("update_selected_tiles_display")
     def update_selected_tiles_display(self):
         """Update the selected tiles display panel"""
-        # Clear the canvas and clean up old image references
+        # Clear the canvas; thumbnails of tiles that stay selected are kept in the cache
         self.selected_canvas.delete("all")
-        if hasattr(self.selected_canvas, 'image_refs'):
-            self.selected_canvas.image_refs.clear()
+        for tile_index in [i for i in self.selected_thumbnails if i not in self.selection]:
+            del self.selected_thumbnails[tile_index]
+        if self.swap_source is not None and self.swap_source >= len(self.selection):
+            self.swap_source = None
         
-        if not self.selected_tile_objects:
+        # The preview follows every change of the selection and its order
+        with self.profiler.phase("autotile_preview"):
+            self.update_autotile_preview()
+        
+        if not self.selection:
             self.selected_info_label.config(text="No tiles selected")
             self.tile_indexes_text.delete(1.0, tk.END)
             return
         
-        # Update info label
-        count = len(self.selected_tile_objects)
-        self.selected_info_label.config(text=f"{count} tile{'s' if count != 1 else ''} selected")
+        # Update info label; the panel has room for the first 16 tiles, one BitMaskTile set
+        count = len(self.selection)
+        info = f"{count} tile{'s' if count != 1 else ''} selected"
+        if count > 16:
+            info += ", first 16 shown"
+        self.selected_info_label.config(text=info)
         
         # Update tile indexes list (in selection order, not sorted)
-        indexes_text = ", ".join(map(str, self.selected_tiles))
+        indexes_text = ", ".join(map(str, self.selection))
         self.tile_indexes_text.delete(1.0, tk.END)
         self.tile_indexes_text.insert(1.0, indexes_text)
         
@@ -505,11 +1618,8 @@ class TilesheetSplitter:
         tile_size = 32  # Size for selected tiles display
         tiles_per_row = 4  # Maximum 4 tiles per row
         
-        # Initialize image references list
-        self.selected_canvas.image_refs = []
-        
         # Display selected tiles in a grid
-        for i, tile_data in enumerate(self.selected_tile_objects):
+        for i, tile_index in enumerate(self.selection):
             row = i // tiles_per_row
             col = i % tiles_per_row
             
@@ -520,19 +1630,31 @@ class TilesheetSplitter:
             if y + tile_size > canvas_height:
                 break
             
+            # Tiles past the end of the current split keep their place, drawn as an empty outline
+            if self.atlas is None or tile_index >= len(self.atlas):
+                self.selected_canvas.create_rectangle(x, y, x+tile_size, y+tile_size, outline="red", dash=(2, 2))
+                self.selected_canvas.create_text(x + tile_size//2, y + tile_size + 2, 
+                                               text=f"#{tile_index}", 
+                                               font=("Arial", 6), fill="red")
+                continue
+                
             try:
-                # Resize tile for display
-                display_tile = tile_data['image'].resize((tile_size, tile_size), Image.Resampling.NEAREST)
-                photo = ImageTk.PhotoImage(display_tile)
+                # Resize tile for display only the first time it shows up in the panel
+                photo = self.selected_thumbnails.get(tile_index)
+                if photo is None:
+                    with self.profiler.phase("thumbnails"):
+                        display_tile = self.atlas.tile_image(tile_index).resize((tile_size, tile_size), Image.Resampling.NEAREST)
+                        photo = self.profiler.track_photo(ImageTk.PhotoImage(display_tile))
+                    # Store reference to prevent garbage collection
+                    self.selected_thumbnails[tile_index] = photo
                 
                 # Create tile on canvas
                 self.selected_canvas.create_image(x, y, anchor=tk.NW, image=photo)
-                
-                # Store reference to prevent garbage collection
-                self.selected_canvas.image_refs.append(photo)
+                if i == self.swap_source:
+                    self.selected_canvas.create_rectangle(x-1, y-1, x+tile_size+1, y+tile_size+1, 
+                                                          outline="orange", width=2)
                 
                 # Add tile info text - show tile index
-                tile_index = (tile_data['row'] * self.tiles_per_row) + tile_data['col']
                 self.selected_canvas.create_text(x + tile_size//2, y + tile_size + 2, 
                                                text=f"#{tile_index}", 
                                                font=("Arial", 6), fill="blue")
@@ -540,27 +1662,98 @@ class TilesheetSplitter:
                 print(f"Error displaying selected tile: {e}")
                 continue
     
+    def on_selected_canvas_click(self, event):
+        """Pick a selected tile, then swap it with the next one clicked"""
+        tile_size = 32
+        col = (event.x - 2) // (tile_size + 4)
+        row = (event.y - 2) // (tile_size + 4)
+        if col < 0 or col >= 4 or row < 0:
+            return
+        position = row * 4 + col
+        if position >= len(self.selection):
+            return
+            
+        if self.swap_source is None:
+            self.swap_source = position
+            self.status_var.set(f"Swapping #{self.selection.tiles[position]} (mask {position}): click another selected tile")
+        else:
+            source, self.swap_source = self.swap_source, None
+            self.selection.swap(source, position)
+            tiles = self.selection.tiles
+            self.status_var.set(f"Mask {source} is now #{tiles[source]}, mask {position} is now #{tiles[position]}")
+        self.update_selected_tiles_display()
+        
+    @profiled("suggest_bitmask_set")
+    def suggest_bitmask_set(self):
+        """Select the next complete BitMaskTile set found by edge analysis, in mask order"""
+        if not self.atlas:
+            messagebox.showwarning("Warning", "Please load a tilesheet first")
+            return
+            
+        # Every tile is classified in one pass the first time, then suggestions are cycled through
+        if self.bitmask_sets is None:
+            with self.profiler.phase("edge_analysis"):
+                foreground = engine.tile_foreground(self.atlas)
+                masks = engine.edge_masks(self.atlas, foreground=foreground)
+                colors = engine.dominant_colors(self.atlas, foreground=foreground)
+            exclude = None
+            if self.content_index is not None:
+                exclude = self.content_index.blank | ~self.content_index.is_canonical
+            with self.profiler.phase("suggest"):
+                self.bitmask_sets = engine.suggest_bitmask_sets(self.atlas, masks, colors, exclude)
+            self.bitmask_set_cursor = 0
+            
+        if not self.bitmask_sets:
+            self.status_var.set("No complete 16-tile set found in this sheet")
+            return
+            
+        number = self.bitmask_set_cursor % len(self.bitmask_sets)
+        self.bitmask_set_cursor = number + 1
+        spread, tiles = self.bitmask_sets[number]
+        self.selection.set_tiles(tiles)
+        self.swap_source = None
+        self.draw_selection_overlay()
+        self.update_selected_tiles_display()
+        self.status_var.set(f"Suggested set {number + 1}/{len(self.bitmask_sets)} (within {spread} tiles): "
+                            + ", ".join(map(str, tiles)))
+        
+    def open_autotile_preview(self):
+        """Open the autotile preview window, or bring it forward if it is already open"""
+        if self.autotile_preview is not None and self.autotile_preview.exists():
+            self.autotile_preview.window.lift()
+        else:
+            self.autotile_preview = AutotilePreview(self.root, background=self.background_color.get())
+        self.update_autotile_preview()
+        
+    def update_autotile_preview(self):
+        """Show the current selection, in order, in the autotile preview if it is open"""
+        if self.autotile_preview is None:
+            return
+        if not self.autotile_preview.exists():
+            self.autotile_preview = None
+            return
+        self.autotile_preview.set_tiles(self.atlas, self.selection.tiles)
+    
     def clear_selection(self):
-        """Clear all selected tiles"""
-        self.selected_tiles.clear()
-        self.selected_tile_objects.clear()
+        """Clear all tiles of the active group"""
+        self.selection.clear()
         self.update_selected_tiles_display()
-        self.display_tiles()  # Redraw to remove highlighting
+        self.canvas.delete("selection")
         self.status_var.set("Selection cleared")
     
     def copy_tile_indexes(self):
         """Copy tile indexes to clipboard"""
-        if not self.selected_tiles:
+        if not self.selection:
             self.status_var.set("No tiles selected to copy")
             return
         
         # Copy in selection order, not sorted
-        indexes_text = ", ".join(map(str, self.selected_tiles))
+        indexes_text = ", ".join(map(str, self.selection))
         
         # Copy to clipboard
         self.root.clipboard_clear()
         self.root.clipboard_append(indexes_text)
-        self.status_var.set(f"Copied {len(self.selected_tiles)} tile indexes to clipboard")
+        self.status_var.set(f"Copied {len(self.selection)} tile indexes to clipboard")
         
         
     def on_mousewheel(self, event):
@@ -618,11 +1811,33 @@ class TilesheetSplitter:
             
     def clear_tiles(self):
         """Clear all tiles and reset"""
-        self.tiles.clear()
-        self.selected_tiles.clear()
-        self.selected_tile_objects.clear()
-        self.original_image = None
+        self.split_worker.cancel()
+        self.load_worker.cancel()
+        self.hide_load_progress()
+        self.autosave_groups()
+        for sheet in self.workspace.sheets:
+            self.sheet_tabs.forget(sheet.tab)
+        self.workspace.clear()
+        self.atlas = None
+        self.content_index = None
+        self.feature_index = None
+        self.similar_query = None
+        self.similar_tiles = []
+        self.bitmask_sets = None
+        self.display_order = None
+        self.display_slots = None
+        self.grid_rows = 0
+        self.groups = SelectionGroups()
+        self.update_group_choices()
+        self.swap_source = None
+        self.sheet_pixels = None
+        self.sheet_palette = None
+        self.zoom_cache.clear()
         self.canvas.delete("all")
+        self.rendered_tiles.clear()
+        self.free_tile_items.clear()
+        self.hover_item = None
+        self.hovered_tile = None
         self.status_var.set("Ready")
         self.update_info_display()
         self.update_selected_tiles_display()
@@ -631,8 +1846,14 @@ class TilesheetSplitter:
 
 def main():
     """Main function"""
+    parser = argparse.ArgumentParser(description="Split and browse tilesheets.")
+    parser.add_argument("--profile-log", help="append a JSON line with phase timings for every profiled operation")
+    parser.add_argument("--memory-mb", type=int, default=DEFAULT_BUDGET_BYTES // 2**20,
+                        help="memory shared by the open sheets before background sheets are unloaded")
+    args = parser.parse_args()
+    
     root = tk.Tk()
-    app = TilesheetSplitter(root)
+    app = TilesheetSplitter(root, profile_log=args.profile_log, memory_budget=args.memory_mb * 2**20)
     root.mainloop()
 
 
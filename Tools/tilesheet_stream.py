@@ -0,0 +1,425 @@
+#!/usr/bin/env python3
+"""
+Tilesheet Streaming
+Memory-bounded processing of tilesheets too large to decode at once.
+Features:
+- Decode non-interlaced PNGs sequentially, a band of rows at a time
+- Write RGBA PNGs band by band
+- Load images progressively with cancellation and low-resolution previews
+- Remove margins and split tiles one band of tile rows at a time
+- Peak memory bounded by the band size instead of the sheet size
+"""
+
+from PIL import Image
+import os
+import struct
+import zlib
+
+import numpy as np
+
+import tilesheet_engine as engine
+
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+# Default amount of decoded RGBA pixels held per band
+DEFAULT_BAND_BYTES = 64 * 1024 * 1024
+
+# Band size of progressive loads: small enough for frequent progress reports
+PROGRESS_BAND_BYTES = 4 * 1024 * 1024
+
+# (bit depth, colour type) -> (PIL mode, PIL raw mode) of the PNG layouts that can be streamed
+_PNG_MODES = {
+    (1, 0): ('1', '1'),
+    (2, 0): ('L', 'L;2'),
+    (4, 0): ('L', 'L;4'),
+    (8, 0): ('L', 'L'),
+    (16, 0): ('I;16', 'I;16B'),
+    (8, 2): ('RGB', 'RGB'),
+    (1, 3): ('P', 'P;1'),
+    (2, 3): ('P', 'P;2'),
+    (4, 3): ('P', 'P;4'),
+    (8, 3): ('P', 'P'),
+    (8, 4): ('LA', 'LA'),
+    (16, 4): ('RGBA', 'LA;16B'),
+    (8, 6): ('RGBA', 'RGBA'),
+}
+
+_CHANNELS = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}
+
+# Byte-preserving PIL modes used to undo PNG row filters, by filter unit in bytes
+_FILTER_MODES = {1: 'L', 2: 'LA', 3: 'RGB', 4: 'RGBA'}
+
+
+def can_stream(path):
+    """Return True if a file is a PNG layout PngBandReader can decode"""
+    try:
+        with PngBandReader(path):
+            return True
+    except (OSError, ValueError):
+        return False
+
+
+class PngBandReader:
+    """Decodes a non-interlaced PNG from top to bottom, holding only the rows asked for.
+
+    Row filters are undone by Pillow's PNG decoder one band at a time: the band's
+    filtered rows are fed to it behind the previous unfiltered row, so memory use is
+    bounded by the band instead of the image.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        try:
+            self._read_header()
+        except Exception:
+            self.file.close()
+            raise
+
+        self._decompressor = zlib.decompressobj()
+        self._idat_remaining = 0
+        self._compressed = b''
+        self._filtered = bytearray()
+        self._previous = bytes(self.stride)  # The row above the first row is all zeros
+        self._idat_done = False
+        self.row = 0
+
+    def _read_chunk_header(self):
+        """Return (length, type) of the next chunk"""
+        header = self.file.read(8)
+        if len(header) < 8:
+            raise ValueError(f"Truncated PNG: {self.path}")
+        return struct.unpack('>I4s', header)
+
+    def _read_header(self):
+        """Parse the chunks before the image data and stop at the first IDAT"""
+        if self.file.read(8) != PNG_SIGNATURE:
+            raise ValueError(f"Not a PNG file: {self.path}")
+
+        self.palette = None
+        self.transparency = None
+        self._first_idat_length = None
+        while True:
+            length, chunk_type = self._read_chunk_header()
+            if chunk_type == b'IDAT':
+                self._first_idat_length = length
+                break
+
+            data = self.file.read(length)
+            self.file.read(4)  # CRC
+            if chunk_type == b'IHDR':
+                (self.width, self.height, self.bit_depth, self.color_type,
+                 _, _, interlace) = struct.unpack('>IIBBBBB', data)
+                if interlace:
+                    raise ValueError("Interlaced PNGs cannot be streamed")
+                if (self.bit_depth, self.color_type) not in _PNG_MODES:
+                    raise ValueError(f"Unsupported PNG layout: {self.bit_depth}-bit colour type {self.color_type}")
+            elif chunk_type == b'PLTE':
+                self.palette = data
+            elif chunk_type == b'tRNS':
+                self.transparency = data
+            elif chunk_type == b'IEND':
+                raise ValueError(f"PNG has no image data: {self.path}")
+
+        self.mode, self.rawmode = _PNG_MODES[(self.bit_depth, self.color_type)]
+        bits_per_pixel = self.bit_depth * _CHANNELS[self.color_type]
+        self.stride = (self.width * bits_per_pixel + 7) // 8
+        self.filter_unit = max(bits_per_pixel // 8, 1)
+
+    @property
+    def size(self):
+        return self.width, self.height
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Close the underlying file"""
+        self.file.close()
+
+    def _next_compressed(self):
+        """Return the next piece of IDAT payload, or b'' after the last IDAT chunk"""
+        if self._idat_done:
+            return b''
+
+        if self._idat_remaining == 0:
+            if self._first_idat_length is not None:
+                self._idat_remaining = self._first_idat_length
+                self._first_idat_length = None
+            else:
+                self.file.read(4)  # CRC of the previous IDAT
+                length, chunk_type = self._read_chunk_header()
+                if chunk_type != b'IDAT':
+                    self._idat_done = True
+                    return b''
+                self._idat_remaining = length
+
+        data = self.file.read(min(self._idat_remaining, 1 << 16))
+        if not data:
+            raise ValueError(f"Truncated PNG: {self.path}")
+        self._idat_remaining -= len(data)
+        return data
+
+    def _read_filtered(self, count):
+        """Return the next count filtered scanlines, each with its leading filter byte"""
+        needed = count * (self.stride + 1)
+        while len(self._filtered) < needed:
+            if not self._compressed:
+                self._compressed = self._next_compressed()
+                if not self._compressed:
+                    raise ValueError(f"PNG image data ends early: {self.path}")
+
+            # Bound the decompressed output so a highly compressed stream cannot balloon
+            self._filtered += self._decompressor.decompress(self._compressed, needed - len(self._filtered))
+            self._compressed = self._decompressor.unconsumed_tail
+
+        data = bytes(self._filtered[:needed])
+        del self._filtered[:needed]
+        return data
+
+    def read_raw(self, count):
+        """Return the next count rows as unfiltered scanline bytes"""
+        count = min(count, self.height - self.row)
+        if count <= 0:
+            return b''
+
+        # Decode [previous row with filter None] + band so Up/Avg/Paeth see the real row above
+        filter_mode = _FILTER_MODES[self.filter_unit]
+        stream = zlib.compress(b'\0' + self._previous + self._read_filtered(count), 0)
+        band = Image.frombytes(filter_mode, (self.stride // self.filter_unit, count + 1), stream, 'zip', filter_mode)
+
+        raw = band.tobytes()[self.stride:]
+        self._previous = raw[-self.stride:]
+        self.row += count
+        return raw
+
+    def read_image(self, count):
+        """Return the next count rows as a PIL image in the PNG's own mode"""
+        raw = self.read_raw(count)
+        image = Image.frombytes(self.mode, (self.width, len(raw) // self.stride), raw, 'raw', self.rawmode)
+
+        # Palette and transparency are applied the way Pillow's PNG plugin does
+        if self.palette is not None and self.mode == 'P':
+            image.putpalette(self.palette)
+        if self.transparency is not None:
+            if self.mode == 'P':
+                image.info['transparency'] = self.transparency
+            elif self.mode in ('1', 'L', 'I;16'):
+                image.info['transparency'] = struct.unpack('>H', self.transparency[:2])[0]
+            elif self.mode == 'RGB':
+                image.info['transparency'] = struct.unpack('>HHH', self.transparency[:6])
+        return image
+
+    def read_rows(self, count):
+        """Return the next count rows as a (rows, width, 4) RGBA array"""
+        return engine.image_to_array(self.read_image(count))
+
+    def skip_rows(self, count, band_bytes=DEFAULT_BAND_BYTES):
+        """Decode and drop the next count rows without holding them all at once"""
+        step = max(band_bytes // max(self.stride, 1), 1)
+        while count > 0 and self.row < self.height:
+            count -= len(self.read_raw(min(step, count))) // self.stride
+
+    def bands(self, band_height):
+        """Yield (first_row, RGBA array) for consecutive bands down to the bottom of the image"""
+        while self.row < self.height:
+            first_row = self.row
+            yield first_row, self.read_rows(band_height)
+
+
+class PngBandWriter:
+    """Writes an 8-bit RGBA PNG from consecutive bands of rows"""
+
+    def __init__(self, path, width, height, compress_level=6):
+        if width <= 0 or height <= 0:
+            raise ValueError(f"Cannot write an empty {width}x{height} image")
+
+        self.path = path
+        self.width = width
+        self.height = height
+        self.row = 0
+        self._compressor = zlib.compressobj(compress_level)
+        self._pending = []
+        self._pending_bytes = 0
+        self.file = open(path, 'wb')
+        self.file.write(PNG_SIGNATURE)
+        self._write_chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def _write_chunk(self, chunk_type, data):
+        """Write one PNG chunk with its length and CRC"""
+        self.file.write(struct.pack('>I', len(data)))
+        self.file.write(chunk_type)
+        self.file.write(data)
+        self.file.write(struct.pack('>I', zlib.crc32(data, zlib.crc32(chunk_type)) & 0xFFFFFFFF))
+
+    def _emit(self, data, flush=False):
+        """Buffer compressed output and write it as IDAT chunks of a reasonable size"""
+        if data:
+            self._pending.append(data)
+            self._pending_bytes += len(data)
+        if self._pending_bytes >= (1 << 18) or (flush and self._pending_bytes):
+            self._write_chunk(b'IDAT', b''.join(self._pending))
+            self._pending = []
+            self._pending_bytes = 0
+
+    def write_rows(self, pixels):
+        """Append a (rows, width, 4) RGBA array below the rows written so far"""
+        pixels = np.asarray(pixels, dtype=np.uint8)
+        if pixels.ndim != 3 or pixels.shape[1:] != (self.width, 4):
+            raise ValueError(f"Expected rows of shape (n, {self.width}, 4), got {pixels.shape}")
+        if self.row + len(pixels) > self.height:
+            raise ValueError("More rows written than the image height")
+
+        # Sub filter: each byte minus the same channel of the pixel to its left
+        rows = np.empty((len(pixels), self.width * 4 + 1), dtype=np.uint8)
+        rows[:, 0] = 1
+        filtered = rows[:, 1:].reshape(len(pixels), self.width, 4)
+        filtered[:, 0] = pixels[:, 0]
+        np.subtract(pixels[:, 1:], pixels[:, :-1], out=filtered[:, 1:])
+
+        self._emit(self._compressor.compress(rows.tobytes()))
+        self.row += len(pixels)
+
+    def close(self):
+        """Finish the image data and close the file"""
+        if self.file.closed:
+            return
+        try:
+            if self.row != self.height:
+                raise ValueError(f"Only {self.row} of {self.height} rows were written")
+            self._emit(self._compressor.flush(), flush=True)
+            self._write_chunk(b'IEND', b'')
+        finally:
+            self.file.close()
+
+    def abort(self):
+        """Close and delete a partially written file"""
+        self.file.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def load_image(path, cancelled=None, progress=None, band_bytes=PROGRESS_BAND_BYTES):
+    """Decode an image file completely, band by band where the format allows it.
+
+    progress(fraction, image, rows) is called after each band with the image
+    decoded so far, of which the first rows are filled in. Formats that cannot be
+    streamed are decoded in one step. Returns the image in its own mode, or None
+    once cancelled() returns True.
+    """
+    try:
+        reader = PngBandReader(path)
+    except (OSError, ValueError):
+        reader = None
+
+    if reader is None:
+        image = Image.open(path)
+        image.load()
+        if progress is not None:
+            progress(1.0, image, image.height)
+        return image
+
+    with reader:
+        image = Image.new(reader.mode, reader.size)
+        band_height = max(band_bytes // max(reader.width * 4, 1), 1)
+        while reader.row < reader.height:
+            if cancelled is not None and cancelled():
+                return None
+
+            first_row = reader.row
+            band = reader.read_image(band_height)
+            if first_row == 0:
+                # Palette and transparency come with the first band
+                if band.mode == 'P':
+                    image.putpalette(band.getpalette())
+                image.info.update(band.info)
+            image.paste(band, (0, first_row))
+
+            if progress is not None:
+                progress(reader.row / reader.height, image, reader.row)
+    return image
+
+
+def preview_image(image, rows, max_width, max_height):
+    """Return an RGBA nearest-neighbour thumbnail of the first rows of an image.
+
+    The scale is that of the whole image fitted into max_width x max_height, so
+    successive previews of a progressive load line up.
+    """
+    scale = min(max_width / image.width, max_height / image.height, 1.0)
+    width = max(int(image.width * scale), 1)
+    height = max(int(rows * scale), 1)
+    preview = image.resize((width, height), Image.Resampling.NEAREST, box=(0, 0, image.width, rows))
+    return preview.convert('RGBA')
+
+
+def tile_rows_per_band(reader, config, band_bytes=DEFAULT_BAND_BYTES):
+    """Return how many tile rows of a sheet fit into one band of decoded pixels"""
+    return max(band_bytes // max(config.pitch_y * reader.width * 4, 1), 1)
+
+
+def iter_tile_bands(reader, config, band_bytes=DEFAULT_BAND_BYTES):
+    """Yield (first_tile_row, TileAtlas) over consecutive bands of whole tile rows.
+
+    Each atlas only covers the tile rows of its band; the vertical offset and the
+    gutters between bands are skipped without being kept.
+    """
+    tiles_per_row, tiles_per_col = engine.grid_dimensions(reader.width, reader.height, config)
+    band_config = config._replace(offset_y=0)
+    step = tile_rows_per_band(reader, config, band_bytes)
+
+    reader.skip_rows(config.offset_y, band_bytes)
+    for first in range(0, tiles_per_col, step):
+        count = min(step, tiles_per_col - first)
+        band = reader.read_rows(count * config.pitch_y - config.margin_y)
+        yield first, engine.TileAtlas(band, band_config)
+        if first + count < tiles_per_col:
+            reader.skip_rows(config.margin_y, band_bytes)
+
+
+def stream_remove_margins(src_path, dst_path, config, band_bytes=DEFAULT_BAND_BYTES, cancelled=None):
+    """Remove margins from a PNG sheet band by band into a new PNG.
+
+    Returns the output size, or None if cancelled() turned True (the partial output is deleted).
+    """
+    config.validate()
+    with PngBandReader(src_path) as reader:
+        tiles_per_row, tiles_per_col = engine.grid_dimensions(reader.width, reader.height, config)
+        size = (tiles_per_row * config.tile_width, tiles_per_col * config.tile_height)
+
+        with PngBandWriter(dst_path, *size) as writer:
+            for _, atlas in iter_tile_bands(reader, config, band_bytes):
+                if cancelled is not None and cancelled():
+                    writer.abort()
+                    return None
+                writer.write_rows(np.asarray(engine.remove_margins(atlas.pixels, atlas.config)))
+    return size
+
+
+def stream_split(src_path, output_dir, config, prefix="tile", band_bytes=DEFAULT_BAND_BYTES, cancelled=None):
+    """Save every tile of a PNG sheet as its own file, decoding one band at a time.
+
+    Returns the number of tiles written, stopping early if cancelled() turns True.
+    """
+    config.validate()
+    written = 0
+    with PngBandReader(src_path) as reader:
+        for first_row, atlas in iter_tile_bands(reader, config, band_bytes):
+            if cancelled is not None and cancelled():
+                break
+            engine.save_tiles(atlas, output_dir, prefix, first_index=first_row * atlas.tiles_per_row)
+            written += len(atlas)
+    return written
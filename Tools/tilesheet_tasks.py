@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Tilesheet Background Tasks
+Helpers to run slow tilesheet work off the Tk main thread.
+Features:
+- Debounce bursts of requests into a single job
+- Run jobs on a worker thread
+- Drop results of jobs superseded by a newer request
+- Hand progress reports and results back to the Tk main loop
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import queue
+import threading
+
+
+class BackgroundWorker:
+    """Runs the latest submitted job on a worker thread and delivers its result on the Tk main loop.
+
+    Jobs are called as func(cancelled, *args) where cancelled() returns True once a
+    newer job has been submitted, so long jobs can stop early, and
+    cancelled.progress(*values) delivers on_progress(*values) while the job runs.
+    Callbacks always run on the main thread and only for the most recent submission.
+    """
+
+    def __init__(self, root, delay_ms=150, poll_ms=20):
+        self.root = root
+        self.delay_ms = delay_ms
+        self.poll_ms = poll_ms
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._results = queue.Queue()
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._pending_start = None
+        self._poll_scheduled = None
+        self._running = 0
+
+    @property
+    def busy(self):
+        """True while a job is waiting for its debounce delay or running"""
+        return self._pending_start is not None or self._running > 0
+
+    def submit(self, func, *args, on_done=None, on_error=None, on_progress=None, delay_ms=None):
+        """Schedule func(cancelled, *args), replacing any job that has not produced a result yet"""
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+
+        if self._pending_start is not None:
+            self.root.after_cancel(self._pending_start)
+
+        delay = self.delay_ms if delay_ms is None else delay_ms
+        self._pending_start = self.root.after(delay, self._start, generation, func, args,
+                                              on_done, on_error, on_progress)
+        return generation
+
+    def cancel(self):
+        """Cancel the pending job and discard the result of any running one"""
+        with self._lock:
+            self._generation += 1
+        if self._pending_start is not None:
+            self.root.after_cancel(self._pending_start)
+            self._pending_start = None
+
+    def shutdown(self):
+        """Cancel outstanding work and stop the worker thread"""
+        self.cancel()
+        if self._poll_scheduled is not None:
+            self.root.after_cancel(self._poll_scheduled)
+            self._poll_scheduled = None
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def is_current(self, generation):
+        """Return True if no job has been submitted since the given one"""
+        with self._lock:
+            return generation == self._generation
+
+    def _start(self, generation, func, args, on_done, on_error, on_progress):
+        """Hand a debounced job to the worker thread (main thread)"""
+        self._pending_start = None
+        if not self.is_current(generation):
+            return
+
+        def cancelled():
+            return not self.is_current(generation)
+
+        def progress(*values):
+            if on_progress is not None and not cancelled():
+                self._results.put((generation, 'progress', values, on_progress))
+
+        cancelled.progress = progress
+
+        def run():
+            try:
+                result = func(cancelled, *args)
+            except Exception as e:
+                self._results.put((generation, 'error', e, on_error))
+            else:
+                self._results.put((generation, 'done', result, on_done))
+
+        self._running += 1
+        self._executor.submit(run)
+        self._schedule_poll()
+
+    def _schedule_poll(self):
+        """Poll the result queue from the main loop while jobs are running"""
+        if self._poll_scheduled is None:
+            self._poll_scheduled = self.root.after(self.poll_ms, self._poll)
+
+    def _poll(self):
+        """Deliver finished results for the current generation (main thread)"""
+        self._poll_scheduled = None
+        while True:
+            try:
+                generation, kind, value, callback = self._results.get_nowait()
+            except queue.Empty:
+                break
+
+            if kind != 'progress':
+                self._running -= 1
+            if not self.is_current(generation) or callback is None:
+                continue
+            if kind == 'progress':
+                callback(*value)
+            else:
+                callback(value)
+
+        if self._running > 0:
+            self._schedule_poll()
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Tilesheet Workspace
+Several open tilesheets sharing one memory budget.
+Features:
+- One state object per open sheet: pixels, split, zoom cache, view and selection groups
+- Memory use of each sheet measured from the arrays it holds in RAM
+- Low-colour sheets keep a bit-packed palette copy that survives unloading
+- Least recently used background sheets unloaded once the budget is exceeded
+- Unloaded sheets restored from the memory-mapped split cache when shown again
+- File stamps to notice when an open sheet is changed on disk
+"""
+
+import itertools
+import os
+
+import numpy as np
+
+from tilesheet_groups import SelectionGroups
+
+
+# Memory shared by every open sheet
+DEFAULT_BUDGET_BYTES = 1024 * 1024 * 1024
+
+
+def file_stamp(path):
+    """Return (modification time, size) of a file, or None if it cannot be read"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def array_bytes(array):
+    """Return the RAM held by an array; memory-mapped arrays are paged by the OS and count as 0"""
+    if array is None or isinstance(array, np.memmap):
+        return 0
+    return array.nbytes
+
+
+class Sheet:
+    """An open tilesheet with the split and view state it had when last shown"""
+
+    def __init__(self, path, digest, pixels, palette=None):
+        self.path = path
+        self.digest = digest
+        self.pixels = pixels
+        self.palette = palette  # engine.PalettePixels of the pixels, None for full-colour sheets
+        self.stamp = file_stamp(path)  # File stamp of the pixels held
+        self.tab = None  # Tab widget showing the sheet
+
+        # Split and caches, dropped when the sheet is unloaded
+        self.atlas = None
+        self.zoom_cache = None
+        self.content_index = None
+        self.feature_index = None
+
+        # View state restored when switching back to the sheet
+        self.config = None
+        self.groups = SelectionGroups()  # Named tile selections, saved to the sheet's sidecar
+        self.zoom_factor = 1.0
+        self.scroll = (0.0, 0.0)
+        self.hide_blank = False
+        self.hide_duplicates = False
+        self.last_used = 0
+
+    @property
+    def name(self):
+        return os.path.basename(self.path)
+
+    @property
+    def loaded(self):
+        """True while the pixels are held"""
+        return self.pixels is not None
+
+    def keep_split(self, atlas, zoom_cache, content_index, feature_index):
+        """Remember the split currently shown for the sheet"""
+        self.atlas = atlas
+        self.zoom_cache = zoom_cache
+        self.content_index = content_index
+        self.feature_index = feature_index
+        self.config = atlas.config
+
+    def reload(self, digest, pixels, palette=None):
+        """Replace the pixels after the file was opened again, dropping the stale split"""
+        self.unload()
+        self.digest = digest
+        self.pixels = pixels
+        self.palette = palette
+        self.stamp = file_stamp(self.path)
+
+    def memory_bytes(self):
+        """Return the RAM held by the pixels, palette copy, split and zoom cache of the sheet"""
+        total = array_bytes(self.pixels)
+        if self.palette is not None:
+            total += self.palette.nbytes
+        if self.atlas is not None:
+            total += array_bytes(self.atlas.meta)
+        if self.content_index is not None:
+            total += sum(array_bytes(a) for a in (self.content_index.hashes, self.content_index.blank,
+                                                  self.content_index.canonical))
+        if self.feature_index is not None:
+            total += array_bytes(self.feature_index.features)
+        if self.zoom_cache is not None:
+            total += self.zoom_cache.total_bytes
+        return total
+
+    def unload(self):
+        """Drop the pixels, split and zoom cache; the view state and the small palette copy are kept"""
+        self.pixels = None
+        self.atlas = None
+        self.zoom_cache = None
+        self.content_index = None
+        self.feature_index = None
+
+
+class Workspace:
+    """The open sheets, of which one is active, kept within a shared memory budget.
+
+    Background sheets are unloaded least recently used first. Their pixels come
+    back from the split cache as a memory map, so switching back costs a file
+    map and a cached split instead of a decode.
+    """
+
+    def __init__(self, split_cache, max_bytes=DEFAULT_BUDGET_BYTES):
+        self.split_cache = split_cache
+        self.max_bytes = max_bytes
+        self.sheets = []  # In tab order
+        self.active = None
+        self._clock = itertools.count(1)
+
+    def find(self, path):
+        """Return the open sheet of a file, or None"""
+        key = os.path.normcase(os.path.abspath(path))
+        for sheet in self.sheets:
+            if os.path.normcase(os.path.abspath(sheet.path)) == key:
+                return sheet
+        return None
+
+    def add(self, sheet):
+        """Open a sheet; returns it"""
+        self.sheets.append(sheet)
+        return sheet
+
+    def remove(self, sheet):
+        """Close a sheet and drop its cached splits from memory"""
+        self.sheets.remove(sheet)
+        if self.active is sheet:
+            self.active = None
+        if all(other.digest != sheet.digest for other in self.sheets):
+            self.split_cache.forget(sheet.digest)
+        sheet.unload()
+
+    def clear(self):
+        """Close every sheet"""
+        for sheet in list(self.sheets):
+            self.remove(sheet)
+
+    def activate(self, sheet):
+        """Make a sheet the active one, restoring its pixels if they were unloaded"""
+        self.active = sheet
+        sheet.last_used = next(self._clock)
+        self.restore(sheet)
+        self.enforce_budget()
+
+    def restore(self, sheet):
+        """Bring back the pixels of an unloaded sheet"""
+        if sheet.loaded:
+            return
+        sheet.pixels = self.split_cache.cached_pixels(sheet.digest)
+        if sheet.pixels is None:
+            # The cache entry was pruned: decode the file again
+            sheet.digest, sheet.pixels = self.split_cache.load_pixels(sheet.path)
+
+    def memory_bytes(self):
+        """Return the RAM held by every open sheet"""
+        return sum(sheet.memory_bytes() for sheet in self.sheets)
+
+    def enforce_budget(self):
+        """Unload least recently used background sheets until the workspace fits its budget"""
+        total = self.memory_bytes()
+        for sheet in sorted(self.sheets, key=lambda s: s.last_used):
+            if total <= self.max_bytes:
+                break
+            if sheet is self.active or not sheet.loaded:
+                continue
+            held = sheet.memory_bytes()
+            sheet.unload()
+            total -= held - sheet.memory_bytes()
+            self.split_cache.forget(sheet.digest)
+        return total